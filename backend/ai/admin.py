@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin
-from .models import UserProfile, Template, Project, Slide, SharedProject
+from .models import UserProfile, Template, Project, Slide, SharedProject, CacheEntry, GenerationJob
 
 # Inline UserProfile Admin
 class UserProfileInline(admin.StackedInline):
@@ -22,3 +22,5 @@ admin.site.register(Template)
 admin.site.register(Project)
 admin.site.register(Slide)
 admin.site.register(SharedProject)
+admin.site.register(CacheEntry)
+admin.site.register(GenerationJob)
@@ -0,0 +1,283 @@
+import math
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+from .models import GenerationJob
+
+# Admission control for the endpoints that spend Gemini and Pexels quota.
+# Each user gets a token bucket per throttle scope (rates in
+# REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]) and at most
+# MAX_IN_FLIGHT_PER_USER generations running at once. Rejections are 429s
+# with Retry-After. State lives in this process ("locmem") or in a Django
+# cache shared by every process ("django").
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class LocMemStore:
+    """
+    Buckets and in-flight counters in this process
+    """
+
+    def __init__(self, **options):
+        self._buckets = {}
+        self._slots = {}  # key -> expiry times of the slots held
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate):
+        """
+        Take a token from a bucket; returns 0 or the seconds until one is free
+        """
+        with self._lock:
+            tokens, wait = refill(self._buckets.get(key), capacity, refill_rate)
+            self._buckets[key] = (tokens, time.time())
+        return wait
+
+    def acquire(self, key, limit, ttl):
+        current = time.time()
+        with self._lock:
+            # Slots older than ttl were never released; drop them
+            slots = [expiry for expiry in self._slots.get(key, []) if expiry > current]
+            if len(slots) >= limit:
+                self._slots[key] = slots
+                return False
+            self._slots[key] = sorted(slots + [current + ttl])
+            return True
+
+    def release(self, key):
+        # Give back the newest slot; a leaked one is the oldest and expires first
+        with self._lock:
+            slots = self._slots.get(key, [])[:-1]
+            if slots:
+                self._slots[key] = slots
+            else:
+                self._slots.pop(key, None)
+
+
+class DjangoCacheStore:
+    """
+    Buckets and in-flight counters in a Django cache (CACHES setting), so
+    every process behind the load balancer shares the limits
+    """
+
+    # How long a bucket update may hold its lock before it expires anyway
+    LOCK_TIMEOUT = 2
+
+    def __init__(self, cache_alias="default", **options):
+        self.cache = caches[cache_alias]
+
+    def _cache_key(self, key):
+        return f"ai:admission:{key}"
+
+    @contextmanager
+    def _locked(self, key):
+        # cache.add is atomic on every backend; spin briefly on contention
+        lock_key = self._cache_key(f"{key}:lock")
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        locked = self.cache.add(lock_key, 1, timeout=self.LOCK_TIMEOUT)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(0.005)
+            locked = self.cache.add(lock_key, 1, timeout=self.LOCK_TIMEOUT)
+        try:
+            yield
+        finally:
+            if locked:
+                self.cache.delete(lock_key)
+
+    def take(self, key, capacity, refill_rate):
+        cache_key = self._cache_key(key)
+        with self._locked(key):
+            tokens, wait = refill(self.cache.get(cache_key), capacity, refill_rate)
+            # An untouched bucket is full again after capacity / refill_rate
+            timeout = math.ceil(capacity / refill_rate) + 1
+            self.cache.set(cache_key, (tokens, time.time()), timeout=timeout)
+        return wait
+
+    def _save_slots(self, cache_key, slots, current):
+        if slots:
+            # Kept until the last slot expires
+            self.cache.set(cache_key, slots, timeout=math.ceil(slots[-1] - current) + 1)
+        else:
+            self.cache.delete(cache_key)
+
+    def acquire(self, key, limit, ttl):
+        # Each slot carries its own expiry, as in LocMemStore, so a slot of a
+        # process that died while holding it frees up after ttl however busy
+        # the user's other slots are
+        cache_key = self._cache_key(key)
+        current = time.time()
+        with self._locked(key):
+            slots = [expiry for expiry in self.cache.get(cache_key, []) if expiry > current]
+            if len(slots) >= limit:
+                self._save_slots(cache_key, slots, current)
+                return False
+            self._save_slots(cache_key, sorted(slots + [current + ttl]), current)
+        return True
+
+    def release(self, key):
+        cache_key = self._cache_key(key)
+        with self._locked(key):
+            self._save_slots(cache_key, self.cache.get(cache_key, [])[:-1], time.time())
+
+
+STORES = {"locmem": LocMemStore, "django": DjangoCacheStore}
+
+
+def refill(bucket, capacity, refill_rate):
+    """
+    Refill a (tokens, updated) bucket for the time elapsed and take a token.
+    Returns (tokens left, 0) or, if the bucket is empty, (tokens, seconds
+    until the next token).
+    """
+    current = time.time()
+    if bucket is None:
+        tokens = capacity
+    else:
+        tokens, updated = bucket
+        tokens = min(capacity, tokens + (current - updated) * refill_rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / refill_rate
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = settings.ADMISSION_CONTROL
+                _store = STORES[config["STORE"]](cache_alias=config["CACHE_ALIAS"])
+    return _store
+
+
+def scope_rate(scope):
+    """
+    (capacity, tokens per second) for a throttle scope, or None if unlimited
+    """
+    rate = settings.REST_FRAMEWORK.get("DEFAULT_THROTTLE_RATES", {}).get(scope)
+    if rate is None:
+        return None
+    # Same "<requests>/<s|m|h|d>" format as DRF's rate throttles
+    num, period = rate.split("/")
+    duration = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+    return int(num), int(num) / duration
+
+
+def check_rate(user, scope):
+    """
+    Take one token from the user's bucket for scope; returns 0 or the
+    seconds until the request would be admitted
+    """
+    rate = scope_rate(scope)
+    if rate is None or not user.is_authenticated:
+        return 0
+    capacity, refill_rate = rate
+    return get_store().take(f"bucket:{scope}:{user.pk}", capacity, refill_rate)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Per-user token bucket for the view's throttle_scope. Unlike DRF's
+    ScopedRateThrottle the budget refills evenly instead of per window,
+    so a user can't spend a whole period's quota in one burst at the
+    boundary of two windows.
+    """
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        self.wait_seconds = check_rate(request.user, scope) if scope else 0
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def in_flight_key(user):
+    return f"in-flight:{user.pk}"
+
+
+def acquire_generation_slot(user):
+    """
+    Count a generation against the user's in-flight cap, or raise Throttled.
+    Pair with release_generation_slot.
+    """
+    config = settings.ADMISSION_CONTROL
+    if not get_store().acquire(
+        in_flight_key(user), config["MAX_IN_FLIGHT_PER_USER"], config["IN_FLIGHT_TTL"]
+    ):
+        raise Throttled(
+            wait=config["IN_FLIGHT_RETRY_AFTER"],
+            detail="Too many generations in progress. Wait for one to finish.",
+        )
+
+
+def release_generation_slot(user):
+    get_store().release(in_flight_key(user))
+
+
+def hold_generation_slot(user):
+    """
+    acquire_generation_slot for slots that outlive the view (streamed
+    responses). Returns a function that gives the slot back; only its
+    first call releases it, so every way the response can end may call it.
+    """
+    acquire_generation_slot(user)
+    lock = threading.Lock()
+    released = False
+
+    def release():
+        nonlocal released
+        with lock:
+            if released:
+                return
+            released = True
+        release_generation_slot(user)
+
+    return release
+
+
+@contextmanager
+def generation_slot(user):
+    """
+    Hold one of the user's in-flight generation slots for the block
+    """
+    acquire_generation_slot(user)
+    try:
+        yield
+    finally:
+        release_generation_slot(user)
+
+
+@asynccontextmanager
+async def generation_slot_async(user):
+    """
+    generation_slot for async views
+    """
+    await sync_to_async(acquire_generation_slot)(user)
+    try:
+        yield
+    finally:
+        await sync_to_async(release_generation_slot)(user)
+
+
+def check_job_capacity(user):
+    """
+    Queued jobs hold no slot while they wait for a runner (possibly in
+    another process), so cap the user's unfinished jobs instead
+    """
+    config = settings.ADMISSION_CONTROL
+    active = GenerationJob.objects.filter(
+        user=user,
+        status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING],
+    ).count()
+    if active >= config["MAX_IN_FLIGHT_PER_USER"]:
+        raise Throttled(
+            wait=config["IN_FLIGHT_RETRY_AFTER"],
+            detail="Too many generation jobs in progress. Wait for one to finish.",
+        )
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai'
+
+    def ready(self):
+        from .prompts import load_prompts
+
+        # Read and validate prompt templates once at startup
+        load_prompts()
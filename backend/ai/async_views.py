@@ -0,0 +1,344 @@
+import json
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from . import llm
+from .admission import check_rate, generation_slot_async
+from .enrichment import DEFAULT_COLOR
+from .gemini import (
+    generate_ai_outline_async,
+    generate_single_slide_xml_async,
+    generate_slide_title_suggestions_async,
+)
+from .generation import (
+    ENGINES,
+    SAVE_MODES,
+    GenerationError,
+    busy_error,
+    generate_deck_once_async,
+)
+from .getImgColor import get_dominant_color_async
+from .jobs import enqueue_generation
+from .models import Project, Slide
+from .pexel import get_img_link_async
+from .serializers import GenerationJobSerializer
+from .shaping import parse_since, shape_deck_payload
+from .views import (
+    added_slide_placeholder,
+    fallback_slide_title_suggestions,
+    new_slide_number,
+    parse_added_slide,
+    save_added_slide,
+    slide_title_context,
+)
+from .xml_parser import get_fallback_image_query
+
+# Async variants of the endpoints that wait on Gemini, Pexels and image
+# downloads. Served from slides/asgi.py they hold no thread while a request
+# is in flight; ORM access goes through the async ORM or sync_to_async.
+
+
+def json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    return JsonResponse(
+        data, status=status_code, headers=headers, encoder=DjangoJSONEncoder
+    )
+
+
+def exception_response(exc):
+    # Same body, status and headers (WWW-Authenticate, Retry-After) as DRF
+    response = exception_handler(exc, {})
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name in ("WWW-Authenticate", "Retry-After")
+    }
+    return json_response(response.data, response.status_code, headers)
+
+
+def jwt_required(view, throttle_scope=None):
+    """
+    Authenticate an async view with the JWT in the Authorization header,
+    like the APIViews' IsAuthenticated, then apply the throttle_scope token
+    bucket. The view gets a DRF Request, so request.data,
+    request.query_params and request.user work as usual, and raised DRF
+    exceptions become the same responses as in the APIViews.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        drf_request = Request(
+            request, parsers=[JSONParser()], authenticators=[JWTAuthentication()]
+        )
+        try:
+            # Authentication looks the user up in the database
+            user = await sync_to_async(lambda: drf_request.user)()
+            if not user or not user.is_authenticated:
+                return json_response(
+                    {"detail": "Authentication credentials were not provided."},
+                    status.HTTP_401_UNAUTHORIZED,
+                )
+            if throttle_scope:
+                wait = await sync_to_async(check_rate)(user, throttle_scope)
+                if wait:
+                    raise Throttled(wait=wait)
+
+            return await view(drf_request, *args, **kwargs)
+        except APIException as e:
+            return exception_response(e)
+
+    return wrapper
+
+
+def async_view(throttle_scope):
+    def decorator(view):
+        return csrf_exempt(require_POST(jwt_required(view, throttle_scope)))
+
+    return decorator
+
+
+@async_view("generation")
+async def generate_xml_presentation(request, pk):
+    """
+    GenerateXMLPresentationView for ASGI
+    """
+    slide_titles = request.data.get("slide_titles", [])
+    engine = request.data.get("engine")
+    mode = request.data.get("mode")
+
+    try:
+        project = await Project.objects.aget(id=pk, user=request.user)
+    except Project.DoesNotExist:
+        return json_response(
+            {"error": "Project not found or access denied."},
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    if engine and engine not in ENGINES:
+        return json_response(
+            {"error": f"engine must be one of {ENGINES}."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+    if mode and mode not in SAVE_MODES:
+        return json_response(
+            {"error": f"mode must be one of {SAVE_MODES}."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    # Job mode: queue the pipeline and let the client poll for progress
+    if request.data.get("async"):
+        job = await sync_to_async(enqueue_generation)(
+            project, request.user, slide_titles, engine, mode
+        )
+        return json_response(
+            GenerationJobSerializer(job).data, status.HTTP_202_ACCEPTED
+        )
+
+    try:
+        async with generation_slot_async(request.user):
+            response_data = await generate_deck_once_async(
+                project, slide_titles, engine=engine, mode=mode
+            )
+    except GenerationError as e:
+        return json_response({"error": e.message}, e.status_code, e.headers)
+
+    return json_response(shape_deck_payload(response_data, request))
+
+
+@async_view("outline")
+async def generate_outline(request):
+    """
+    ProjectOutlineView for ASGI
+    """
+    prompt = request.data.get("prompt")
+    num_pages = request.data.get("num_pages")
+    if not prompt or not num_pages:
+        return json_response(
+            {"error": "Both 'prompt' and 'num_pages' are required."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+    project_id = request.data.get("project_id")
+
+    try:
+        response = await generate_ai_outline_async(prompt, num_pages)
+    except llm.LLMBusyError as e:
+        error = busy_error(e)
+        return json_response({"error": error.message}, error.status_code, error.headers)
+    try:
+        outline_data = json.loads(response)
+    except json.JSONDecodeError:
+        return json_response(
+            {"error": "Failed to decode JSON response."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    if project_id:
+        try:
+            project = await Project.objects.aget(id=project_id, user=request.user)
+        except Project.DoesNotExist:
+            return json_response(
+                {"error": "Project not found or access denied."},
+                status.HTTP_404_NOT_FOUND,
+            )
+        project.title = outline_data.get("title", "Untitled")
+        project.description = prompt
+        await project.asave()
+    else:
+        try:
+            project = await Project.objects.acreate(
+                user=request.user,
+                title=outline_data.get("title", "Untitled"),
+                description=prompt,
+            )
+        except Exception as e:
+            return json_response(
+                {"error": f"Failed to create project: {str(e)}"},
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+    return json_response(
+        {
+            "project_id": project.id,
+            "title": project.title,
+            "slide_titles": outline_data.get("slide_titles", []),
+        }
+    )
+
+
+@async_view("slide_titles")
+async def suggest_slide_title(request, pk):
+    """
+    GenerateSlideTitleView for ASGI
+    """
+    try:
+        project = await Project.objects.aget(id=pk, user=request.user)
+    except Project.DoesNotExist:
+        return json_response(
+            {"error": "Project not found or access denied."},
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    context_info = await sync_to_async(slide_title_context)(project)
+    async with generation_slot_async(request.user):
+        try:
+            slide_titles = await generate_slide_title_suggestions_async(
+                project.title, project.description, context_info
+            )
+        except llm.LLMBusyError as e:
+            error = busy_error(e)
+            return json_response({"error": error.message}, error.status_code, error.headers)
+        except Exception as e:
+            print(f"Error generating slide titles: {str(e)}")
+            slide_titles = fallback_slide_title_suggestions(project)
+
+    return json_response({"slide_titles": slide_titles})
+
+
+async def added_slide_enrichment(slide_data, project_title):
+    """
+    Image, dominant color and image query for an added slide, as
+    AddSlideView picks them
+    """
+    enrichment = added_slide_placeholder(slide_data, project_title)
+    if enrichment is not None:
+        return enrichment
+
+    if slide_data["has_images"] and slide_data["img_queries"]:
+        img_query = slide_data["img_queries"][0]
+    else:
+        img_query = get_fallback_image_query(
+            slide_data["content"], slide_data["layout_type"], project_title
+        )
+    img_url = await get_img_link_async(img_query)
+
+    # Extract dominant color if we have an image
+    dominant_color = DEFAULT_COLOR
+    if img_url and settings.DEBUG:
+        try:
+            dominant_color = await get_dominant_color_async(img_url) or DEFAULT_COLOR
+        except Exception as e:
+            print(f"Failed to extract dominant color: {e}")
+    return {
+        "img_url": img_url,
+        "dominant_color": dominant_color,
+        "img_query": img_query,
+        "img_pending": False,
+    }
+
+
+@async_view("add_slide")
+async def add_slide(request, pk):
+    """
+    AddSlideView for ASGI
+    """
+    try:
+        project = await Project.objects.aget(id=pk, user=request.user)
+    except Project.DoesNotExist:
+        return json_response(
+            {"error": "Project not found or access denied."},
+            status.HTTP_404_NOT_FOUND,
+        )
+
+    slide_title = request.data.get("title")
+    if not slide_title:
+        return json_response(
+            {"error": "Slide title is required."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+    since = parse_since(request)
+
+    async with generation_slot_async(request.user):
+        return await add_slide_in_slot(request, project, slide_title, since)
+
+
+async def add_slide_in_slot(request, project, slide_title, since):
+    try:
+        # Append by default, or insert at a 1-based "position"
+        existing_slides_count = await Slide.objects.filter(project=project).acount()
+        next_slide_number = new_slide_number(
+            existing_slides_count, request.data.get("position")
+        )
+        if next_slide_number is None:
+            return json_response(
+                {"error": f"position must be between 1 and {existing_slides_count + 1}."},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        context = {
+            "project_title": project.title,
+            "project_description": project.description,
+            "slide_title": slide_title,
+            "existing_slides_count": existing_slides_count,
+        }
+        xml_content = await generate_single_slide_xml_async(slide_title, context)
+        slide_data = parse_added_slide(xml_content, next_slide_number, slide_title)
+        enrichment = await added_slide_enrichment(slide_data, project.title)
+
+        response_data = await sync_to_async(save_added_slide)(
+            request,
+            project,
+            slide_data,
+            enrichment,
+            existing_slides_count,
+            since,
+        )
+        return json_response(response_data, status.HTTP_201_CREATED)
+
+    except llm.LLMBusyError as e:
+        error = busy_error(e)
+        return json_response({"error": error.message}, error.status_code, error.headers)
+    except Exception as e:
+        print(f"Error adding slide: {str(e)}")
+        return json_response(
+            {"error": f"Failed to add slide: {str(e)}"},
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
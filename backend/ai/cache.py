@@ -0,0 +1,318 @@
+import asyncio
+import hashlib
+import threading
+import weakref
+from concurrent.futures import Future
+from datetime import timedelta
+from cachetools import TLRUCache
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.timezone import now
+
+# Stored in place of a value to remember that a lookup came back empty
+NEGATIVE = ""
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class LocMemBackend:
+    """
+    In-process LRU store with per-entry expiry
+    """
+
+    def __init__(self, namespace, max_entries, **options):
+        self._data = TLRUCache(
+            maxsize=max_entries, ttu=lambda key, value, now: now + value[1]
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+        return None if entry is None else entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, ttl)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    """
+    Store entries in one of the configured Django caches (CACHES setting)
+    """
+
+    def __init__(self, namespace, max_entries, cache_alias="default", **options):
+        self.namespace = namespace
+        self.cache = caches[cache_alias]
+
+    def _cache_key(self, key):
+        return f"ai:{self.namespace}:{key}"
+
+    def get(self, key):
+        return self.cache.get(self._cache_key(key))
+
+    def set(self, key, value, ttl):
+        self.cache.set(self._cache_key(key), value, timeout=ttl)
+
+    def clear(self):
+        # Entries expire on their own; Django caches can't drop a key prefix
+        pass
+
+
+class DatabaseBackend:
+    """
+    Store entries in the CacheEntry table, trimming least recently used rows
+    """
+
+    # Only count rows every N writes to keep the trim off the common path
+    TRIM_EVERY = 50
+
+    def __init__(self, namespace, max_entries, **options):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def get(self, key):
+        from .models import CacheEntry
+
+        entries = CacheEntry.objects.filter(
+            namespace=self.namespace, key=key, expires_at__gt=now()
+        )
+        rows = list(entries.values_list("value", flat=True)[:1])
+        if not rows:
+            return None
+        entries.update(last_used_at=now())
+        return rows[0] or NEGATIVE
+
+    def set(self, key, value, ttl):
+        from .models import CacheEntry
+
+        CacheEntry.objects.update_or_create(
+            namespace=self.namespace,
+            key=key,
+            defaults={
+                "value": value or None,
+                "expires_at": now() + timedelta(seconds=ttl),
+                "last_used_at": now(),
+            },
+        )
+        self._writes += 1
+        if self._writes % self.TRIM_EVERY == 0:
+            self.trim()
+
+    def trim(self):
+        from .models import CacheEntry
+
+        entries = CacheEntry.objects.filter(namespace=self.namespace)
+        entries.filter(expires_at__lte=now()).delete()
+        stale_ids = entries.order_by("-last_used_at").values_list("id", flat=True)[
+            self.max_entries :
+        ]
+        entries.filter(id__in=list(stale_ids)).delete()
+
+    def clear(self):
+        from .models import CacheEntry
+
+        CacheEntry.objects.filter(namespace=self.namespace).delete()
+
+
+class TieredBackend:
+    """
+    In-process LRU in front of the CacheEntry table
+    """
+
+    def __init__(self, namespace, max_entries, front_entries=1000, **options):
+        self.front = LocMemBackend(namespace, front_entries)
+        self.back = DatabaseBackend(namespace, max_entries)
+        # Memory entries are only a copy of the DB row, keep them briefly
+        self.front_ttl = options.get("front_ttl", 600)
+
+    def get(self, key):
+        value = self.front.get(key)
+        if value is None:
+            value = self.back.get(key)
+            if value is not None:
+                self.front.set(key, value, self.front_ttl)
+        return value
+
+    def set(self, key, value, ttl):
+        self.back.set(key, value, ttl)
+        self.front.set(key, value, min(ttl, self.front_ttl))
+
+    def clear(self):
+        self.front.clear()
+        self.back.clear()
+
+
+BACKENDS = {
+    "locmem": LocMemBackend,
+    "django": DjangoCacheBackend,
+    "db": DatabaseBackend,
+    "tiered": TieredBackend,
+}
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in
+    flight block and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = Future()
+                self._calls[key] = call
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines: the first caller's coroutine runs as a task
+    on the event loop and later callers await the same task. A caller that
+    goes away (client disconnect) doesn't cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()  # event loop -> {key: task}
+
+    async def do(self, key, fn, *args, **kwargs):
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            calls[key] = task
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class LookupCache:
+    """
+    Cache for slow external lookups keyed on normalized text.
+
+    Empty results are cached too (for a shorter TTL) so repeated misses
+    don't hit the upstream API again. Values must be non-empty strings.
+    """
+
+    def __init__(self, namespace, backend="locmem", ttl=86400, negative_ttl=3600,
+                 max_entries=10000, **options):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.backend = BACKENDS[backend](namespace, max_entries, **options)
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._flight = SingleFlight()
+
+    def get(self, key):
+        """
+        Return (hit, value); value is None for a cached negative result
+        """
+        try:
+            value = self.backend.get(hash_key(key))
+        except Exception as e:
+            print(f"Cache lookup failed for {self.namespace}: {e}")
+            self.errors += 1
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return False, None
+        if value == NEGATIVE:
+            self.negative_hits += 1
+            return True, None
+        self.hits += 1
+        return True, value
+
+    def set(self, key, value):
+        ttl = self.ttl if value else self.negative_ttl
+        try:
+            self.backend.set(hash_key(key), value or NEGATIVE, ttl)
+        except Exception as e:
+            print(f"Cache write failed for {self.namespace}: {e}")
+            self.errors += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        Concurrent misses for the same key share a single compute() call.
+        """
+        hit, value = self.get(key)
+        if hit:
+            return value
+        return self._flight.do(key, self._compute_and_set, key, compute)
+
+    def _compute_and_set(self, key, compute):
+        value = compute()
+        self.set(key, value)
+        return value
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
+
+
+def get_lookup_cache(namespace):
+    """
+    Return the shared LookupCache configured under LOOKUP_CACHES[namespace]
+    """
+    cache = _registry.get(namespace)
+    if cache is None:
+        with _registry_lock:
+            cache = _registry.get(namespace)
+            if cache is None:
+                options = {
+                    key.lower(): value
+                    for key, value in settings.LOOKUP_CACHES.get(namespace, {}).items()
+                }
+                cache = LookupCache(namespace, **options)
+                _registry[namespace] = cache
+    return cache
+
+
+def get_cache_stats():
+    return {namespace: cache.stats() for namespace, cache in _registry.items()}
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import caches
+
+# Serialized ProjectsView payloads, keyed by project and stored with the
+# project's updated_at so an entry from before any change is never served
+
+
+def _cache():
+    return caches[settings.DECK_CACHE["CACHE_ALIAS"]]
+
+
+def deck_key(project_id):
+    return f"deck:{project_id}"
+
+
+def get_deck(project_id, version):
+    entry = _cache().get(deck_key(project_id))
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    return None
+
+
+def set_deck(project_id, version, payload):
+    _cache().set(deck_key(project_id), (version, payload), settings.DECK_CACHE["TIMEOUT"])
+
+
+def invalidate_deck(project_id):
+    _cache().delete(deck_key(project_id))
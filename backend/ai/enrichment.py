@@ -0,0 +1,271 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import asyncio
+import threading
+import time
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils.timezone import now
+from .models import Slide, touch_project
+from .pexel import get_img_link, get_img_link_async
+from .getImgColor import get_dominant_color, get_dominant_color_async
+from .xml_parser import get_fallback_image_query
+
+DEFAULT_IMG_URL = "https://img.freepik.com/free-photo/fantasy-style-scene-international-day-education_23-2151040298.jpg"
+DEFAULT_COLOR = "#667eea"
+
+# Section layouts that render a root image next to (or above) the content
+IMAGE_SECTION_LAYOUTS = ["left", "right", "vertical"]
+
+# "inline": generation waits for the image lookups; "deferred": slides are
+# saved with placeholders and enrich_pending_slides fills them in afterwards
+ENRICHMENT_MODES = ["inline", "deferred"]
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def resolve_image_query(slide_data, project_title):
+    """
+    Pick the Pexels query for a parsed slide, or None if it needs no image
+    """
+    if slide_data["has_images"] and slide_data["img_queries"]:
+        return slide_data["img_queries"][0]  # Use first query
+    if slide_data["section_layout"] in IMAGE_SECTION_LAYOUTS:
+        # Layout expects an image but the model gave no IMG tag
+        return get_fallback_image_query(
+            slide_data["content"],
+            slide_data["layout_type"],
+            project_title,
+        )
+    return None
+
+
+def _enrich_slide_in_worker(slide_data, img_query, with_color):
+    try:
+        return _enrich_slide(slide_data, img_query, with_color)
+    finally:
+        # Lookup caches may have opened a DB connection on this worker thread
+        connections.close_all()
+
+
+def _default_image(slide_data, img_url):
+    # Set default image if none found and layout needs one
+    if img_url is None and slide_data["section_layout"] in IMAGE_SECTION_LAYOUTS:
+        return DEFAULT_IMG_URL
+    return img_url
+
+
+def _enrich_slide(slide_data, img_query, with_color):
+    img_url = get_img_link(img_query) if img_query else None
+    img_url = _default_image(slide_data, img_url)
+
+    dominant_color = DEFAULT_COLOR
+    if img_url and with_color:
+        try:
+            dominant_color = get_dominant_color(img_url) or DEFAULT_COLOR
+        except Exception as e:
+            print(f"Failed to extract dominant color: {e}")
+
+    return {
+        "img_url": img_url,
+        "dominant_color": dominant_color,
+        "img_query": img_query,
+        "img_pending": False,
+    }
+
+
+def enrich_slides(slides_data, project_title, with_color=None):
+    """
+    Resolve image URLs and dominant colors for every slide concurrently.
+
+    Returns a list of {"img_url", "dominant_color", "img_query",
+    "img_pending"} dicts in the same order as slides_data. Slides whose
+    lookup does not finish before IMAGE_ENRICHMENT_TIMEOUT fall back to the
+    default image and color.
+    """
+    if with_color is None:
+        with_color = settings.DEBUG
+
+    if not slides_data:
+        return []
+
+    queries = [resolve_image_query(slide, project_title) for slide in slides_data]
+    return _enrich_all(slides_data, queries, with_color)
+
+
+def _enrich_all(slides_data, queries, with_color):
+    max_workers = min(settings.IMAGE_ENRICHMENT_MAX_WORKERS, len(slides_data))
+    deadline = time.monotonic() + settings.IMAGE_ENRICHMENT_TIMEOUT
+
+    executor = ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="slide-enrich"
+    )
+    try:
+        futures = [
+            executor.submit(_enrich_slide_in_worker, slide, query, with_color)
+            for slide, query in zip(slides_data, queries)
+        ]
+
+        results = []
+        for slide, future in zip(slides_data, futures):
+            try:
+                results.append(
+                    future.result(timeout=max(0, deadline - time.monotonic()))
+                )
+            except TimeoutError:
+                print(f"Slide {slide['slide_number']}: image lookup timed out")
+                results.append(_enrich_slide(slide, None, with_color=False))
+            except Exception as e:
+                print(f"Slide {slide['slide_number']}: image lookup failed: {e}")
+                results.append(_enrich_slide(slide, None, with_color=False))
+        return results
+    finally:
+        # Don't hold the request open for stragglers that already timed out
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _enrich_slide_async(slide_data, img_query, with_color, semaphore):
+    async with semaphore:
+        img_url = await get_img_link_async(img_query) if img_query else None
+        img_url = _default_image(slide_data, img_url)
+
+        dominant_color = DEFAULT_COLOR
+        if img_url and with_color:
+            try:
+                dominant_color = await get_dominant_color_async(img_url) or DEFAULT_COLOR
+            except Exception as e:
+                print(f"Failed to extract dominant color: {e}")
+
+    return {
+        "img_url": img_url,
+        "dominant_color": dominant_color,
+        "img_query": img_query,
+        "img_pending": False,
+    }
+
+
+async def enrich_slides_async(slides_data, project_title, with_color=None):
+    """
+    enrich_slides for async views, with the same ordering, concurrency limit
+    and IMAGE_ENRICHMENT_TIMEOUT fallback
+    """
+    if with_color is None:
+        with_color = settings.DEBUG
+
+    semaphore = asyncio.Semaphore(settings.IMAGE_ENRICHMENT_MAX_WORKERS)
+    tasks = [
+        asyncio.ensure_future(
+            _enrich_slide_async(
+                slide, resolve_image_query(slide, project_title), with_color, semaphore
+            )
+        )
+        for slide in slides_data
+    ]
+    if not tasks:
+        return []
+
+    done, pending = await asyncio.wait(tasks, timeout=settings.IMAGE_ENRICHMENT_TIMEOUT)
+    for task in pending:
+        task.cancel()
+
+    results = []
+    for slide, task in zip(slides_data, tasks):
+        if task in pending:
+            print(f"Slide {slide['slide_number']}: image lookup timed out")
+            results.append(_enrich_slide(slide, None, with_color=False))
+        elif task.exception() is not None:
+            print(f"Slide {slide['slide_number']}: image lookup failed: {task.exception()}")
+            results.append(_enrich_slide(slide, None, with_color=False))
+        else:
+            results.append(task.result())
+    return results
+
+
+def placeholder_enrichments(slides_data, project_title):
+    """
+    enrich_slides results without any lookups: the default image and color,
+    with every slide that has an image query marked img_pending for
+    enrich_pending_slides
+    """
+    results = []
+    for slide in slides_data:
+        img_query = resolve_image_query(slide, project_title)
+        results.append(
+            {
+                "img_url": DEFAULT_IMG_URL if img_query else _default_image(slide, None),
+                "dominant_color": DEFAULT_COLOR,
+                "img_query": img_query,
+                "img_pending": bool(img_query),
+            }
+        )
+    return results
+
+
+def enrich_pending_slides(project_id, with_color=None):
+    """
+    Look up the images of a project's slides saved with a placeholder and
+    store them, touching the project once. Slides deleted or given another
+    image since are left alone. Returns the number of slides updated.
+    """
+    if with_color is None:
+        with_color = settings.DEBUG
+
+    pending = list(
+        Slide.objects.filter(project_id=project_id, img_pending=True).values(
+            "id", "slide_number", "section_layout", "img_query", "img_url"
+        )
+    )
+    if not pending:
+        return 0
+
+    results = _enrich_all(pending, [slide["img_query"] for slide in pending], with_color)
+
+    timestamp = now()
+    updated = 0
+    for slide, result in zip(pending, results):
+        updated += Slide.objects.filter(
+            id=slide["id"],
+            img_pending=True,
+            img_query=slide["img_query"],
+            img_url=slide["img_url"],
+        ).update(
+            img_url=result["img_url"],
+            dominant_color=result["dominant_color"],
+            img_pending=False,
+            updated_at=timestamp,
+        )
+    if updated:
+        touch_project(project_id)
+    print(f"Resolved {updated} pending images of project {project_id}")
+    return updated
+
+
+def _get_background_executor():
+    global _background
+    if _background is None:
+        with _background_lock:
+            if _background is None:
+                _background = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_ENRICHMENT_BACKGROUND_WORKERS,
+                    thread_name_prefix="slide-enrich-background",
+                )
+    return _background
+
+
+def _enrich_pending_in_worker(project_id):
+    try:
+        enrich_pending_slides(project_id)
+    except Exception as e:
+        print(f"Background image enrichment of project {project_id} failed: {e}")
+    finally:
+        connections.close_all()
+
+
+def schedule_pending_enrichment(project_id):
+    """
+    Run enrich_pending_slides on the background pool once the current
+    transaction (if any) commits
+    """
+    transaction.on_commit(
+        lambda: _get_background_executor().submit(_enrich_pending_in_worker, project_id)
+    )
@@ -1,40 +1,26 @@
-import google.generativeai as genai
-import os
-import dotenv
 import json
-from django.conf import settings
-
-# Load environment variables from .env file
-dotenv.load_dotenv()
+from . import llm
+from .prompts import render_prompt
+from .llm_cache import cached_response, cached_response_async
+from .xml_parser import parse_xml_presentation
 
 
 def generate_ai_content(presentation_title: str, slide_titles):
-    # Retrieve the API key from the environment variable
-    api_key = os.getenv("GEMINI_API")
-    if not api_key:
-        raise ValueError("GEMINI_API environment variable is not set.")
-
-    # Configure the API with the provided key
-    genai.configure(api_key=api_key)
-
-    # Instantiate the model (ensure "gemini-2.5-flash" is valid)
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    # Configure the shared client (raises if GEMINI_API is not set)
+    llm.configure()
 
     try:
-        # Get the absolute path for the prompt.txt file
-        prompt_file_path = os.path.join(settings.BASE_DIR, "ai", "prompt.txt")
-
-        # Read the prompt from the txt file
-        with open(prompt_file_path, "r") as file:
-            slide_prompt = file.read()
-
         # Format the slide prompt with the provided topic
-        slide_prompt = slide_prompt.replace("{presentation_title}", presentation_title)
-        slide_prompt = slide_prompt.replace("{slide_titles}", str(slide_titles))
+        slide_prompt = render_prompt(
+            "presentation",
+            presentation_title=presentation_title,
+            slide_titles=str(slide_titles),
+            num_slides=len(slide_titles),
+        )
         # print(slide_prompt)
 
         # Send the slide generation request to the model
-        response = model.generate_content(slide_prompt)
+        response = llm.generate_content(slide_prompt)
 
         # Check if the response contains text
         if response and hasattr(response, "text"):
@@ -50,31 +36,21 @@ def generate_ai_content(presentation_title: str, slide_titles):
 
 
 def generate_ai_content_slide(prompt: str, project_title: str):
-    # Retrieve the API key from the environment variable
-    api_key = os.getenv("GEMINI_API")
-    if not api_key:
-        raise ValueError("GEMINI_API environment variable is not set.")
-
-    # Configure the API with the provided key
-    genai.configure(api_key=api_key)
-
-    # Instantiate the model
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    # Configure the shared client (raises if GEMINI_API is not set)
+    llm.configure()
 
     try:
-        # Get the absolute path for the prompt.txt file
-        prompt_file_path = os.path.join(settings.BASE_DIR, "ai", "add_slide_prompt.txt")
-
-        # Read the prompt template from the file
-        with open(prompt_file_path, "r") as file:
-            slide_prompt = file.read()
-
         # Format the slide prompt with the provided topic and presentation title
-        slide_prompt = slide_prompt.replace("{prompt}", prompt)
-        slide_prompt = slide_prompt.replace("{presentation_title}", project_title)
+        slide_prompt = render_prompt(
+            "add_slide",
+            slide_title=prompt,
+            project_title=project_title,
+            project_description="",
+            existing_slides_count=0,
+        )
 
         # Send the slide generation request to the model
-        response = model.generate_content(slide_prompt)
+        response = llm.generate_content(slide_prompt)
 
         # Parse the response and extract JSON content from the AI output
         if response and hasattr(response, "candidates") and response.candidates:
@@ -99,31 +75,18 @@ def generate_ai_content_slide(prompt: str, project_title: str):
 
 
 def generate_ai_title_slide(project_title: str, existing_titles):
-    # Retrieve the API key from the environment variable
-    api_key = os.getenv("GEMINI_API")
-    if not api_key:
-        raise ValueError("GEMINI_API environment variable is not set.")
-
-    genai.configure(api_key=api_key)
-
-    # Instantiate the model (ensure "gemini-2.5-flash" is valid)
-    model = genai.GenerativeModel("gemini-2.5-flash")
+    # Configure the shared client (raises if GEMINI_API is not set)
+    llm.configure()
 
     try:
-        # Get the absolute path for the prompt.txt file
-        prompt_file_path = os.path.join(
-            settings.BASE_DIR, "ai", "title_slide_prompt.txt"
+        slide_prompt = render_prompt(
+            "title_slide",
+            presentation_title=project_title,
+            existing_titles=json.dumps(existing_titles),
         )
 
-        # Read the prompt from the txt file
-        with open(prompt_file_path, "r") as file:
-            slide_prompt = file.read()
-        existing_titles_str = json.dumps(existing_titles)
-        slide_prompt = slide_prompt.replace("{presentation_title}", project_title)
-        slide_prompt = slide_prompt.replace("{existing_titles}", existing_titles_str)
-
         # Send the slide generation request to the model
-        response = model.generate_content(slide_prompt)
+        response = llm.generate_content(slide_prompt)
 
         # Check if the response contains text
         if response and hasattr(response, "text"):
@@ -139,84 +102,186 @@ def generate_ai_title_slide(project_title: str, existing_titles):
 
 
 def generate_ai_outline(prompt: str, pages: int):
-    # Retrieve the API key from the environment variable
-    api_key = os.getenv("GEMINI_API")
-    if not api_key:
-        raise ValueError("GEMINI_API environment variable is not set.")
+    try:
+        # Configure the shared client (raises if GEMINI_API is not set)
+        llm.configure()
+
+        slide_prompt = render_prompt(
+            "outline", presentation_prompt=prompt, pages=pages
+        )
+
+        def generate():
+            # Send the slide generation request to the model
+            response = llm.generate_content(slide_prompt)
+            if response and hasattr(response, "text"):
+                return response.text
+            return None
+
+        content = cached_response(
+            "outline",
+            "outline",
+            {"prompt": prompt, "pages": pages},
+            generate,
+            validate=valid_outline,
+        )
+        return clean_outline(content)
 
-    genai.configure(api_key=api_key)
+    except llm.LLMBusyError:
+        raise
+    except Exception as e:
+        # Return the error message in case of any issues
+        return f"Error during API request: {e}"
+
+
+def clean_outline(content):
+    # Check if the response contains text
+    if content:
+        content = content.replace("```json", "").replace("```", "").strip()
+        return content
+    else:
+        return "Error: No content generated."
 
-    # Instantiate the model (ensure "gemini-2.5-flash" is valid)
-    model = genai.GenerativeModel("gemini-2.5-flash")
 
+def valid_outline(content):
+    """
+    Whether outline output is worth caching: it decodes as JSON
+    """
     try:
-        # Get the absolute path for the prompt.txt file
-        prompt_file_path = os.path.join(settings.BASE_DIR, "ai", "generate_outline.txt")
+        json.loads(clean_outline(content))
+    except ValueError:
+        return False
+    return True
 
-        # Read the prompt from the txt file
-        with open(prompt_file_path, "r") as file:
-            slide_prompt = file.read()
-        slide_prompt = slide_prompt.replace("{presentation_prompt}", prompt)
-        slide_prompt = slide_prompt.replace("{pages}", str(pages))
 
-        # Send the slide generation request to the model
-        response = model.generate_content(slide_prompt)
+async def generate_ai_outline_async(prompt: str, pages: int):
+    """
+    generate_ai_outline for async views
+    """
+    try:
+        llm.configure()
 
-        # Check if the response contains text
-        if response and hasattr(response, "text"):
-            content = response.text
-            content = content.replace("```json", "").replace("```", "").strip()
-            return content
-        else:
-            return "Error: No content generated."
+        slide_prompt = render_prompt(
+            "outline", presentation_prompt=prompt, pages=pages
+        )
+
+        async def generate():
+            response = await llm.generate_content_async(slide_prompt)
+            if response and hasattr(response, "text"):
+                return response.text
+            return None
+
+        content = await cached_response_async(
+            "outline",
+            "outline",
+            {"prompt": prompt, "pages": pages},
+            generate,
+            validate=valid_outline,
+        )
+        return clean_outline(content)
 
+    except llm.LLMBusyError:
+        raise
     except Exception as e:
-        # Return the error message in case of any issues
         return f"Error during API request: {e}"
 
 
+def valid_presentation(content):
+    """
+    Whether presentation output is worth caching: at least one slide parses
+    """
+    xml_content = content.replace("```xml", "").replace("```", "").strip()
+    try:
+        return bool(parse_xml_presentation(xml_content, ""))
+    except Exception:
+        return False
+
+
+def build_xml_presentation_prompt(title, slide_titles, num_slides):
+    # Format slide titles for the prompt
+    slide_titles_formatted = "\n".join([f"- {title}" for title in slide_titles])
+
+    # Replace placeholders in the prompt
+    return render_prompt(
+        "presentation",
+        presentation_title=title,
+        slide_titles=slide_titles_formatted,
+        num_slides=num_slides
+    )
+
+
 def generate_xml_presentation(title, slide_titles, num_slides):
     """
     Generate XML presentation using the new prompt template
     """
     try:
-        # Read the prompt template
-        with open(os.path.join(os.path.dirname(__file__), "prompt.txt"), "r") as file:
-            prompt_template = file.read()
-
-        # Format slide titles for the prompt
-        slide_titles_formatted = "\n".join([f"- {title}" for title in slide_titles])
-
-        # Replace placeholders in the prompt
-        prompt = prompt_template.format(
-            presentation_title=title,
-            slide_titles=slide_titles_formatted,
-            num_slides=num_slides
-        )
+        prompt = build_xml_presentation_prompt(title, slide_titles, num_slides)
 
         # Generate content using Gemini
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
+        content = cached_response(
+            "presentation",
+            "presentation",
+            {"title": title, "slide_titles": slide_titles, "num_slides": num_slides},
+            lambda: llm.generate_content(prompt).text,
+            validate=valid_presentation,
+        )
 
-        return response.text.strip()
+        return content.strip()
 
+    except llm.LLMBusyError:
+        raise
     except Exception as e:
         print(f"Error generating XML presentation: {e}")
         return None
 
 
-def generate_slide_title_suggestions(project_title, project_description, context_info):
+async def generate_xml_presentation_async(title, slide_titles, num_slides):
     """
-    Generate AI-suggested slide titles based on project context
+    generate_xml_presentation for async views
     """
-    # Retrieve the API key from the environment variable
-    api_key = os.getenv("GEMINI_API")
-    if not api_key:
-        raise ValueError("GEMINI_API environment variable is not set.")
+    try:
+        llm.configure()
+        prompt = build_xml_presentation_prompt(title, slide_titles, num_slides)
+
+        async def generate():
+            return (await llm.generate_content_async(prompt)).text
+
+        content = await cached_response_async(
+            "presentation",
+            "presentation",
+            {"title": title, "slide_titles": slide_titles, "num_slides": num_slides},
+            generate,
+            validate=valid_presentation,
+        )
 
-    # Configure the API with the provided key
-    genai.configure(api_key=api_key)
+        return content.strip()
 
+    except llm.LLMBusyError:
+        raise
+    except Exception as e:
+        print(f"Error generating XML presentation: {e}")
+        return None
+
+
+def stream_xml_presentation(title, slide_titles, num_slides):
+    """
+    Generate the XML presentation with the streaming API, yielding text chunks
+    as the model produces them
+    """
+    # Configure the shared client (raises if GEMINI_API is not set)
+    llm.configure()
+
+    prompt = build_xml_presentation_prompt(title, slide_titles, num_slides)
+    for chunk in llm.stream_content(prompt):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks that only carry a finish reason or safety data have no text
+            continue
+        if text:
+            yield text
+
+
+def build_slide_title_prompt(project_title, project_description, context_info):
     existing_slides_text = ""
     if context_info["existing_slides"]:
         existing_slides_text = "\n".join([
@@ -244,144 +309,125 @@ REQUIREMENTS:
 Return ONLY a JSON array of 5 strings:
 ["Title 1", "Title 2", "Title 3", "Title 4", "Title 5"]
 """
+    return prompt
+
+
+def parse_slide_titles(text):
+    # Clean and parse response
+    content = text.strip()
+    content = content.replace("```json", "").replace("```", "").strip()
+    
+    # Parse JSON
+    titles = json.loads(content)
+    
+    if isinstance(titles, list) and len(titles) >= 3:
+        return titles[:5]  # Return max 5 titles
+    else:
+        raise Exception("Invalid response format")
+
+
+def fallback_slide_titles(project_title):
+    return [
+        f"Key Insights for {project_title}",
+        f"Strategic Analysis",
+        f"Implementation Framework", 
+        f"Results and Impact",
+        f"Future Recommendations"
+    ]
+
+
+def generate_slide_title_suggestions(project_title, project_description, context_info):
+    """
+    Generate AI-suggested slide titles based on project context
+    """
+    # Configure the shared client (raises if GEMINI_API is not set)
+    llm.configure()
+
+    prompt = build_slide_title_prompt(project_title, project_description, context_info)
 
     try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        
-        # Clean and parse response
-        content = response.text.strip()
-        content = content.replace("```json", "").replace("```", "").strip()
-        
-        # Parse JSON
-        titles = json.loads(content)
-        
-        if isinstance(titles, list) and len(titles) >= 3:
-            return titles[:5]  # Return max 5 titles
-        else:
-            raise Exception("Invalid response format")
+        response = llm.generate_content(prompt)
+        return parse_slide_titles(response.text)
             
+    except llm.LLMBusyError:
+        raise
     except Exception as e:
         print(f"Error generating slide titles: {e}")
         # Return fallback titles
-        return [
-            f"Key Insights for {project_title}",
-            f"Strategic Analysis",
-            f"Implementation Framework", 
-            f"Results and Impact",
-            f"Future Recommendations"
-        ]
+        return fallback_slide_titles(project_title)
 
 
-def generate_single_slide_xml(slide_title, context):
+async def generate_slide_title_suggestions_async(project_title, project_description, context_info):
     """
-    Generate XML content for a single slide
+    generate_slide_title_suggestions for async views
     """
-    # Retrieve the API key from the environment variable
-    api_key = os.getenv("GEMINI_API")
-    if not api_key:
-        raise ValueError("GEMINI_API environment variable is not set.")
+    llm.configure()
+
+    prompt = build_slide_title_prompt(project_title, project_description, context_info)
 
-    # Configure the API with the provided key
-    genai.configure(api_key=api_key)
-    
     try:
-        # Read the prompt template
-        with open(os.path.join(os.path.dirname(__file__), "add_slide_prompt.txt"), "r") as file:
-            prompt_template = file.read()
-
-        # Format the prompt with the context data
-        prompt = prompt_template.format(
-            slide_title=slide_title,
-            project_title=context['project_title'],
-            project_description=context['project_description'],
-            existing_slides_count=context['existing_slides_count']
-        )
+        response = await llm.generate_content_async(prompt)
+        return parse_slide_titles(response.text)
 
+    except llm.LLMBusyError:
+        raise
     except Exception as e:
-        print(f"Error reading prompt template: {e}")
-        # Fallback inline prompt if file reading fails
-        prompt = f"""
-You are an expert presentation designer. Create a single slide in XML format.
-
-SLIDE DETAILS:
-- Title: {slide_title}
-- Project Context: {context['project_title']}
-- Project Description: {context['project_description']}
-- Existing Slides Count: {context['existing_slides_count']}
-
-CRITICAL XML FORMATTING RULES:
-1. NO quotes inside text content - use apostrophes instead
-2. NO special characters like &, <, > in text content
-3. Keep all text content simple and clean
-4. Use only the exact XML structure shown below
+        print(f"Error generating slide titles: {e}")
+        return fallback_slide_titles(project_title)
 
-REQUIREMENTS:
-1. Create ONE SECTION with appropriate layout
-2. Choose from layouts: columns, bullets, icons, timeline, chart, arrows, cycle, pyramid, staircase
-3. Section layout can be: left, right, or vertical
-4. Include detailed content relevant to the slide title
-5. Add IMG tags with simple descriptive queries
-6. Make content professional and substantial
-
-LAYOUT GUIDELINES:
-- bullets: For lists, key points, steps
-- columns: For comparisons, features, benefits
-- icons: For services, features, concepts
-- timeline: For processes, history, roadmap
-- arrows: For workflows, processes
-
-EXACT OUTPUT FORMAT (use bullets layout):
-<PRESENTATION>
-<SECTION layout="vertical">
-<BULLETS>
-<DIV>
-<H3>Point Title 1</H3>
-<P>Description without quotes or special chars</P>
-</DIV>
-<DIV>
-<H3>Point Title 2</H3>
-<P>Description without quotes or special chars</P>
-</DIV>
-<DIV>
-<H3>Point Title 3</H3>
-<P>Description without quotes or special chars</P>
-</DIV>
-<DIV>
-<H3>Point Title 4</H3>
-<P>Description without quotes or special chars</P>
-</DIV>
-</BULLETS>
-<IMG query="simple image description">digital guidance parents teenagers</IMG>
-</SECTION>
-</PRESENTATION>
 
-Generate content about: {slide_title}
-"""
+def build_single_slide_prompt(slide_title, context):
+    # Format the prompt with the context data
+    return render_prompt(
+        "add_slide",
+        slide_title=slide_title,
+        project_title=context['project_title'],
+        project_description=context['project_description'],
+        existing_slides_count=context['existing_slides_count']
+    )
 
-    try:
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        response = model.generate_content(prompt)
-        xml_content = response.text.strip()
-        
-        # Clean the XML content to remove problematic characters
-        xml_content = xml_content.replace("```xml", "").replace("```", "").strip()
-        
-        # Remove XML declaration if present as it might cause issues
-        if xml_content.startswith("<?xml"):
-            lines = xml_content.split('\n')
-            xml_content = '\n'.join(lines[1:])
-        
-        # Escape any remaining problematic characters
-        xml_content = xml_content.replace('"', "'")
-        xml_content = xml_content.replace("&", "and")
-        
-        return xml_content
-        
-    except Exception as e:
-        print(f"Error generating single slide XML: {e}")
-        # Return a fallback XML structure
-        return f"""<PRESENTATION>
+
+def clean_single_slide_xml(text):
+    xml_content = text.strip()
+    
+    # Clean the XML content to remove problematic characters
+    xml_content = xml_content.replace("```xml", "").replace("```", "").strip()
+    
+    # Remove XML declaration if present as it might cause issues
+    if xml_content.startswith("<?xml"):
+        lines = xml_content.split('\n')
+        xml_content = '\n'.join(lines[1:])
+    
+    # Escape any remaining problematic characters
+    xml_content = xml_content.replace('"', "'")
+    xml_content = xml_content.replace("&", "and")
+    
+    return xml_content
+
+
+def request_single_slide_xml(slide_title, context):
+    """
+    Ask the model for one slide's XML; raises if the request fails
+    """
+    response = llm.generate_content(build_single_slide_prompt(slide_title, context))
+    return clean_single_slide_xml(response.text)
+
+
+async def request_single_slide_xml_async(slide_title, context):
+    """
+    request_single_slide_xml for async views
+    """
+    response = await llm.generate_content_async(
+        build_single_slide_prompt(slide_title, context)
+    )
+    return clean_single_slide_xml(response.text)
+
+
+def fallback_single_slide_xml(slide_title):
+    """
+    Generic bullets slide used when the model can't produce one
+    """
+    return f"""<PRESENTATION>
 <SECTION layout="vertical">
 <BULLETS>
 <DIV>
@@ -399,3 +445,35 @@ Generate content about: {slide_title}
 </BULLETS>
 </SECTION>
 </PRESENTATION>"""
+
+
+def generate_single_slide_xml(slide_title, context):
+    """
+    Generate XML content for a single slide
+    """
+    try:
+        # Configure the shared client (raises if GEMINI_API is not set)
+        llm.configure()
+        return request_single_slide_xml(slide_title, context)
+        
+    except llm.LLMBusyError:
+        raise
+    except Exception as e:
+        print(f"Error generating single slide XML: {e}")
+        # Return a fallback XML structure
+        return fallback_single_slide_xml(slide_title)
+
+
+async def generate_single_slide_xml_async(slide_title, context):
+    """
+    generate_single_slide_xml for async views
+    """
+    try:
+        llm.configure()
+        return await request_single_slide_xml_async(slide_title, context)
+
+    except llm.LLMBusyError:
+        raise
+    except Exception as e:
+        print(f"Error generating single slide XML: {e}")
+        return fallback_single_slide_xml(slide_title)
@@ -0,0 +1,592 @@
+import asyncio
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from . import llm
+from .gemini import (
+    generate_xml_presentation,
+    generate_xml_presentation_async,
+    stream_xml_presentation,
+    request_single_slide_xml,
+    request_single_slide_xml_async,
+    fallback_single_slide_xml,
+)
+from .cache import AsyncSingleFlight, SingleFlight
+from .models import Slide, lock_project, suppress_project_touch, touch_project
+from .ordering import POSITION_GAP, ordered_slides
+from .reconcile import apply_reconcile, plan_images, plan_reconcile, slide_fields
+from .serializers import SlideSerializer
+from .xml_parser import PresentationParser, parse_xml_presentation
+from .enrichment import (
+    ENRICHMENT_MODES,
+    enrich_slides,
+    enrich_slides_async,
+    placeholder_enrichments,
+    schedule_pending_enrichment,
+)
+
+# Pipeline stages, in the order they run
+STAGES = ["llm", "parse", "images", "persist"]
+
+# "single": the whole deck from one prompt; "parallel": one prompt per slide
+ENGINES = ["single", "parallel"]
+
+# How a regenerated deck is stored: "replace" deletes and recreates every
+# slide; "reconcile" diffs against the stored slides (see ai/reconcile.py)
+SAVE_MODES = ["replace", "reconcile"]
+
+# Identical generations already running in this process, by deck_flight_key
+_deck_flights = SingleFlight()
+_async_deck_flights = AsyncSingleFlight()
+
+
+class GenerationError(Exception):
+    """
+    Deck generation failed; carries the HTTP status the API should answer with
+    """
+
+    def __init__(
+        self, message, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, retry_after=None
+    ):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def headers(self):
+        if self.retry_after is None:
+            return None
+        return {"Retry-After": str(self.retry_after)}
+
+
+def busy_error(e):
+    """
+    GenerationError for a full LLM cap: a 429 the client can retry
+    """
+    return GenerationError(
+        str(e), status.HTTP_429_TOO_MANY_REQUESTS, retry_after=settings.LLM_BUSY_RETRY_AFTER
+    )
+
+
+def build_slide(project, slide_data, enrichment):
+    """
+    Unsaved Slide for a parsed slide record and its image enrichment
+    """
+    return Slide(
+        project=project,
+        slide_number=slide_data["slide_number"],
+        position=slide_data["slide_number"] * POSITION_GAP,
+        img_url=enrichment["img_url"],
+        dominant_color=enrichment["dominant_color"],
+        img_query=enrichment.get("img_query"),
+        img_pending=enrichment.get("img_pending", False),
+        **slide_fields(slide_data),
+    )
+
+
+def replace_slides(project, slides):
+    """
+    Swap a project's slides for unsaved Slide instances in one transaction:
+    one DELETE, one batched INSERT and one project timestamp update,
+    whatever the deck size. Concurrent rewrites of the same project wait
+    for each other instead of interleaving their slides.
+    """
+    with transaction.atomic():
+        lock_project(project.id)
+        with suppress_project_touch():
+            Slide.objects.filter(project=project).delete()
+            Slide.objects.bulk_create(slides)
+        touch_project(project.id)
+
+
+def generate_slide(index, slide_title, context):
+    """
+    Generate and parse one slide of a parallel deck.
+
+    Only this slide is retried (PARALLEL_GENERATION_RETRIES times) when the
+    request fails or its XML can't be parsed; after that it falls back to a
+    generic bullets slide. Returns (slide_data, attempts, failed).
+    """
+    slide_context = {**context, "existing_slides_count": index}
+    attempts = settings.PARALLEL_GENERATION_RETRIES + 1
+
+    for attempt in range(1, attempts + 1):
+        try:
+            xml_content = request_single_slide_xml(slide_title, slide_context)
+            slides_data = parse_xml_presentation(xml_content, context["project_title"])
+            if slides_data:
+                return slides_data[0], attempt, False
+            print(f"Slide '{slide_title}' attempt {attempt}: no section in output")
+        except llm.LLMBusyError:
+            raise
+        except Exception as e:
+            print(f"Slide '{slide_title}' attempt {attempt} failed: {e}")
+
+    return fallback_slide(slide_title, context), attempts, True
+
+
+async def generate_slide_async(index, slide_title, context):
+    """
+    generate_slide for the async engine
+    """
+    slide_context = {**context, "existing_slides_count": index}
+    attempts = settings.PARALLEL_GENERATION_RETRIES + 1
+
+    for attempt in range(1, attempts + 1):
+        try:
+            xml_content = await request_single_slide_xml_async(slide_title, slide_context)
+            slides_data = parse_xml_presentation(xml_content, context["project_title"])
+            if slides_data:
+                return slides_data[0], attempt, False
+            print(f"Slide '{slide_title}' attempt {attempt}: no section in output")
+        except llm.LLMBusyError:
+            raise
+        except Exception as e:
+            print(f"Slide '{slide_title}' attempt {attempt} failed: {e}")
+
+    return fallback_slide(slide_title, context), attempts, True
+
+
+def fallback_slide(slide_title, context):
+    slide_data = parse_xml_presentation(
+        fallback_single_slide_xml(slide_title), context["project_title"]
+    )[0]
+    slide_data["heading"] = slide_title
+    return slide_data
+
+
+def parallel_context(title, description, slide_titles):
+    # Every slide sees the project and the full outline so the deck reads as one
+    outline = "; ".join(
+        f"{number}. {slide_title}" for number, slide_title in enumerate(slide_titles, 1)
+    )
+    return {
+        "project_title": title,
+        "project_description": f"{description or title}\nFull deck outline: {outline}",
+    }
+
+
+def assemble_parallel(slide_titles, results):
+    """
+    Number the per-slide results in outline order and join their sections.
+    Returns (xml_content, slides_data, report).
+    """
+    slides_data = []
+    report = {"requests": 0, "failed_slides": []}
+    for slide_number, (slide_title, (slide_data, attempts, failed)) in enumerate(
+        zip(slide_titles, results), 1
+    ):
+        slide_data["slide_number"] = slide_number
+        # The single-slide prompt has no H1/H2, so the parser would take the
+        # first bullet's H3; the outline title is the slide's heading
+        slide_data["heading"] = slide_title
+        slides_data.append(slide_data)
+        report["requests"] += attempts
+        if failed:
+            report["failed_slides"].append(slide_number)
+
+    sections = [slide_data["xml_content"] for slide_data in slides_data]
+    xml_content = "<PRESENTATION>\n" + "\n".join(sections) + "\n</PRESENTATION>"
+    return xml_content, slides_data, report
+
+
+def generate_slides_parallel(title, description, slide_titles):
+    """
+    Generate a deck with one model request per slide title, at most
+    PARALLEL_GENERATION_MAX_WORKERS at a time, and assemble the sections in
+    outline order.
+
+    Returns (xml_content, slides_data, report) where report counts the
+    requests made and lists the slides that fell back.
+    """
+    # Fail fast on a missing API key instead of falling back on every slide
+    llm.configure()
+    context = parallel_context(title, description, slide_titles)
+
+    max_workers = max(1, min(settings.PARALLEL_GENERATION_MAX_WORKERS, len(slide_titles)))
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(
+                    lambda item: generate_slide(item[0], item[1], context),
+                    enumerate(slide_titles),
+                )
+            )
+    except llm.LLMBusyError as e:
+        raise busy_error(e)
+    return assemble_parallel(slide_titles, results)
+
+
+async def generate_slides_parallel_async(title, description, slide_titles):
+    """
+    generate_slides_parallel on the event loop: the per-slide requests are
+    coroutines, at most PARALLEL_GENERATION_MAX_WORKERS in flight
+    """
+    llm.configure()
+    context = parallel_context(title, description, slide_titles)
+    semaphore = asyncio.Semaphore(max(1, settings.PARALLEL_GENERATION_MAX_WORKERS))
+
+    async def bounded(index, slide_title):
+        async with semaphore:
+            return await generate_slide_async(index, slide_title, context)
+
+    try:
+        results = await asyncio.gather(
+            *(bounded(index, slide_title) for index, slide_title in enumerate(slide_titles))
+        )
+    except llm.LLMBusyError as e:
+        raise busy_error(e)
+    return assemble_parallel(slide_titles, results)
+
+
+def generate_single_shot(title, slide_titles):
+    """
+    Generate the whole deck's XML from one prompt
+    """
+    try:
+        xml_content = generate_xml_presentation(title, slide_titles, len(slide_titles))
+    except llm.LLMBusyError as e:
+        raise busy_error(e)
+    return clean_single_shot(xml_content)
+
+
+async def generate_single_shot_async(title, slide_titles):
+    try:
+        xml_content = await generate_xml_presentation_async(
+            title, slide_titles, len(slide_titles)
+        )
+    except llm.LLMBusyError as e:
+        raise busy_error(e)
+    return clean_single_shot(xml_content)
+
+
+def clean_single_shot(xml_content):
+    if not xml_content:
+        raise GenerationError("Failed to generate XML presentation.")
+
+    # Clean XML content
+    xml_content = xml_content.replace("```xml", "").replace("```", "").strip()
+    print("Generated XML Content:")
+    print(xml_content)
+    return xml_content
+
+
+def generate_deck(project, slide_titles, on_stage=None, engine=None, mode=None):
+    """
+    Generate, parse, enrich and store all slides of a project.
+
+    on_stage(stage) is called as each stage in STAGES starts.
+    engine is one of ENGINES and defaults to settings.GENERATION_ENGINE;
+    mode is one of SAVE_MODES and defaults to settings.GENERATION_SAVE_MODE.
+    With IMAGE_ENRICHMENT_MODE = "deferred" the slides are stored with
+    placeholder images (img_pending) that the background pool resolves.
+    Returns the response payload sent back to the client.
+    """
+    def stage(name):
+        if on_stage:
+            on_stage(name)
+
+    engine = check_engine(engine)
+    mode = check_mode(mode)
+    deferred = images_deferred()
+    title = project.title
+
+    # Generate XML presentation using AI
+    stage("llm")
+    if engine == "parallel":
+        # Each slide is parsed as it arrives, so "parse" only marks the hand-off
+        xml_content, slides_data, report = generate_slides_parallel(
+            title, project.description, slide_titles
+        )
+        print(
+            f"Parallel generation: {report['requests']} requests, "
+            f"fallback slides {report['failed_slides']}"
+        )
+        stage("parse")
+    else:
+        xml_content = generate_single_shot(title, slide_titles)
+
+        # Parse XML and create slides
+        stage("parse")
+        slides_data = parse_xml_presentation(xml_content, title)
+
+    check_parsed(slides_data)
+
+    # Save XML content to project
+    project.xml_content = xml_content
+    touch_project(project.id, xml_content=xml_content)
+
+    # Resolve images and colors concurrently (or leave placeholders for the
+    # background pool); when reconciling, only for slides whose image query
+    # no stored slide has resolved already
+    stage("images")
+    try:
+        plan = plan_reconcile(project, slides_data) if mode == "reconcile" else None
+        to_enrich = slides_to_enrich(slides_data, plan)
+        if deferred:
+            enrichments = placeholder_enrichments(to_enrich, title)
+        else:
+            enrichments = enrich_slides(to_enrich, title, with_color=settings.DEBUG)
+    except Exception as e:
+        print(f"Error creating slides: {str(e)}")
+        raise GenerationError(f"Failed to create slides: {str(e)}")
+
+    stage("persist")
+    payload = save_deck(project, xml_content, slides_data, enrichments, plan)
+    if deferred:
+        schedule_pending_enrichment(project.id)
+    return payload
+
+
+async def generate_deck_async(project, slide_titles, engine=None, mode=None):
+    """
+    generate_deck for async views. The model and image requests run as
+    coroutines; parsing stays inline and the database access goes through
+    sync_to_async.
+    """
+    engine = check_engine(engine)
+    mode = check_mode(mode)
+    deferred = images_deferred()
+    title = project.title
+
+    if engine == "parallel":
+        xml_content, slides_data, report = await generate_slides_parallel_async(
+            title, project.description, slide_titles
+        )
+        print(
+            f"Parallel generation: {report['requests']} requests, "
+            f"fallback slides {report['failed_slides']}"
+        )
+    else:
+        xml_content = await generate_single_shot_async(title, slide_titles)
+        slides_data = parse_xml_presentation(xml_content, title)
+
+    check_parsed(slides_data)
+
+    project.xml_content = xml_content
+    await sync_to_async(touch_project)(project.id, xml_content=xml_content)
+
+    try:
+        plan = None
+        if mode == "reconcile":
+            plan = await sync_to_async(plan_reconcile)(project, slides_data)
+        to_enrich = slides_to_enrich(slides_data, plan)
+        if deferred:
+            enrichments = placeholder_enrichments(to_enrich, title)
+        else:
+            enrichments = await enrich_slides_async(
+                to_enrich, title, with_color=settings.DEBUG
+            )
+    except Exception as e:
+        print(f"Error creating slides: {str(e)}")
+        raise GenerationError(f"Failed to create slides: {str(e)}")
+
+    payload = await sync_to_async(save_deck)(
+        project, xml_content, slides_data, enrichments, plan
+    )
+    if deferred:
+        await sync_to_async(schedule_pending_enrichment)(project.id)
+    return payload
+
+
+def check_engine(engine):
+    engine = engine or settings.GENERATION_ENGINE
+    if engine not in ENGINES:
+        raise GenerationError(
+            f"Unknown generation engine '{engine}'.", status.HTTP_400_BAD_REQUEST
+        )
+    return engine
+
+
+def check_mode(mode):
+    mode = mode or settings.GENERATION_SAVE_MODE
+    if mode not in SAVE_MODES:
+        raise GenerationError(
+            f"Unknown save mode '{mode}'.", status.HTTP_400_BAD_REQUEST
+        )
+    return mode
+
+
+def images_deferred():
+    if settings.IMAGE_ENRICHMENT_MODE not in ENRICHMENT_MODES:
+        raise GenerationError(
+            f"Unknown IMAGE_ENRICHMENT_MODE '{settings.IMAGE_ENRICHMENT_MODE}'."
+        )
+    return settings.IMAGE_ENRICHMENT_MODE == "deferred"
+
+
+def slides_to_enrich(slides_data, plan):
+    if plan is None:
+        return slides_data
+    return [slides_data[index] for index in plan["needs_images"]]
+
+
+def check_parsed(slides_data):
+    if not slides_data:
+        raise GenerationError(
+            "Failed to parse generated XML.", status.HTTP_400_BAD_REQUEST
+        )
+
+
+def save_deck(project, xml_content, slides_data, enrichments, plan=None):
+    """
+    Store the enriched slides in place of the project's current deck, by
+    applying a reconcile plan if there is one. Returns the response payload
+    sent back to the client; reconciling adds a "changes" report.
+    """
+    try:
+        changes = None
+        if plan is not None:
+            changes = apply_reconcile(project, plan, enrichments)
+            if changes is None:
+                print(f"Slides of project {project.id} changed meanwhile; replacing them")
+            enrichments = plan_images(plan, enrichments)
+
+        if changes is None:
+            # Replace existing slides with the new ones from parsed XML
+            replace_slides(
+                project,
+                [
+                    build_slide(project, slide_data, enrichment)
+                    for slide_data, enrichment in zip(slides_data, enrichments)
+                ],
+            )
+        print(f"Saved {len(slides_data)} slides")
+
+        # Fetch and serialize slides
+        saved_slides = ordered_slides(project)
+        serialized_slides = SlideSerializer(saved_slides, many=True).data
+
+    except Exception as e:
+        print(f"Error creating slides: {str(e)}")
+        raise GenerationError(f"Failed to create slides: {str(e)}")
+
+    payload = {
+        "project_id": project.id,
+        "title": project.title,
+        "xml_content": xml_content,
+        "slides": serialized_slides,
+    }
+    if changes is not None:
+        payload["changes"] = changes
+    return payload
+
+
+def deck_flight_key(project_id, slide_titles, engine, mode):
+    digest = hashlib.sha256(
+        json.dumps(slide_titles, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    return f"{project_id}:{engine}:{mode}:{digest}"
+
+
+def generate_deck_once(project, slide_titles, engine=None, mode=None):
+    """
+    generate_deck, coalescing identical requests: a call for the same
+    project, slide titles, engine and mode as one already running in this
+    process (a double click, a client retry) waits for that run and returns
+    its result instead of generating the deck again
+    """
+    engine = check_engine(engine)
+    mode = check_mode(mode)
+    ran = []
+
+    def run():
+        ran.append(True)
+        return generate_deck(project, slide_titles, engine=engine, mode=mode)
+
+    result = _deck_flights.do(
+        deck_flight_key(project.id, slide_titles, engine, mode), run
+    )
+    if not ran:
+        print(f"Joined in-flight generation of project {project.id}")
+    return result
+
+
+async def generate_deck_once_async(project, slide_titles, engine=None, mode=None):
+    """
+    generate_deck_once for async views
+    """
+    engine = check_engine(engine)
+    mode = check_mode(mode)
+    ran = []
+
+    async def run():
+        ran.append(True)
+        return await generate_deck_async(project, slide_titles, engine=engine, mode=mode)
+
+    result = await _async_deck_flights.do(
+        deck_flight_key(project.id, slide_titles, engine, mode), run
+    )
+    if not ran:
+        print(f"Joined in-flight generation of project {project.id}")
+    return result
+
+
+def stream_deck(project, slide_titles):
+    """
+    Generate a project's slides with the streaming LLM API.
+
+    Yields (event, data) pairs: "start", one "slide" per section as soon
+    as it is complete and enriched (or, with IMAGE_ENRICHMENT_MODE =
+    "deferred", given a placeholder image), then "done" or "error". Streamed
+    slides are not stored yet (their id is null): the old deck stays in
+    place until the whole new one is ready and replaces it in one
+    transaction, and "done" carries the stored slides.
+    """
+    title = project.title
+    num_slides = len(slide_titles)
+    yield "start", {"project_id": project.id, "title": title, "num_slides": num_slides}
+
+    chunks = []
+    parser = PresentationParser(title)
+    slides = []
+    try:
+        deferred = images_deferred()
+        for text in stream_xml_presentation(title, slide_titles, num_slides):
+            chunks.append(text)
+
+            for slide_data in parser.feed(text):
+                if deferred:
+                    enrichment = placeholder_enrichments([slide_data], title)[0]
+                else:
+                    enrichment = enrich_slides([slide_data], title, with_color=settings.DEBUG)[0]
+                slide = build_slide(project, slide_data, enrichment)
+                slide.display_number = slide_data["slide_number"]
+                slides.append(slide)
+                yield "slide", SlideSerializer(slide).data
+
+    except llm.LLMBusyError as e:
+        yield "error", {"error": str(e), "retry_after": settings.LLM_BUSY_RETRY_AFTER}
+        return
+    except Exception as e:
+        print(f"Error streaming presentation: {e}")
+        yield "error", {"error": f"Failed to generate XML presentation: {e}"}
+        return
+
+    if not slides:
+        yield "error", {"error": "Failed to parse generated XML."}
+        return
+
+    xml_content = "".join(chunks).replace("```xml", "").replace("```", "").strip()
+    try:
+        replace_slides(project, slides)
+        project.xml_content = xml_content
+        touch_project(project.id, xml_content=xml_content)
+        serialized_slides = SlideSerializer(ordered_slides(project), many=True).data
+    except Exception as e:
+        print(f"Error creating slides: {str(e)}")
+        yield "error", {"error": f"Failed to create slides: {str(e)}"}
+        return
+    if deferred:
+        schedule_pending_enrichment(project.id)
+
+    yield "done", {
+        "project_id": project.id,
+        "num_slides": len(slides),
+        "slides": serialized_slides,
+    }
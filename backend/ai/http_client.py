@@ -0,0 +1,199 @@
+import asyncio
+import random
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from django.conf import settings
+
+_session = None
+_session_lock = threading.Lock()
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+# Async clients and host limits belong to one event loop each
+_async_state = weakref.WeakKeyDictionary()
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CappedRetry(Retry):
+    """
+    Retry that never sleeps longer than HTTP_MAX_RETRY_WAIT: retries run
+    while the caller holds a per-host slot, so a longer Retry-After ends
+    the retries and hands the 429/503 back instead of stalling the host
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and self.respect_retry_after_header:
+            retry_after = self.get_retry_after(response)
+            if retry_after is not None and retry_after > settings.HTTP_MAX_RETRY_WAIT:
+                raise MaxRetryError(
+                    _pool,
+                    url,
+                    ResponseError(f"Retry-After of {retry_after:g}s is too long"),
+                )
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def _build_session():
+    """
+    Build a keep-alive session that retries 429/5xx with jittered backoff
+    """
+    retry = CappedRetry(
+        total=settings.HTTP_MAX_RETRIES,
+        backoff_factor=settings.HTTP_BACKOFF_FACTOR,
+        backoff_jitter=settings.HTTP_BACKOFF_JITTER,
+        backoff_max=settings.HTTP_MAX_RETRY_WAIT,
+        status_forcelist=sorted(RETRY_STATUSES),
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+        raise_on_status=False,  # Hand the last response back to the caller
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.HTTP_POOL_CONNECTIONS,
+        pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide pooled session, creating it on first use
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _host_semaphore(host):
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(
+                settings.HTTP_MAX_CONCURRENCY_PER_HOST
+            )
+            _host_semaphores[host] = semaphore
+        return semaphore
+
+
+def get_timeout():
+    return (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+
+
+def get(url, **kwargs):
+    """
+    GET through the shared session, limited per host and with default timeouts
+    """
+    kwargs.setdefault("timeout", get_timeout())
+    with _host_semaphore(urlsplit(url).hostname):
+        return get_session().get(url, **kwargs)
+
+
+@contextmanager
+def stream(url, **kwargs):
+    """
+    Streaming GET that holds the host slot until the body has been read
+    """
+    kwargs.setdefault("timeout", get_timeout())
+    with _host_semaphore(urlsplit(url).hostname):
+        response = get_session().get(url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
+
+
+def _get_async_state():
+    loop = asyncio.get_running_loop()
+    state = _async_state.get(loop)
+    if state is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_POOL_CONNECTIONS * settings.HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=settings.HTTP_POOL_MAXSIZE,
+            ),
+            # Retries connection failures; 429/5xx responses are retried in aget()
+            transport=httpx.AsyncHTTPTransport(retries=settings.HTTP_MAX_RETRIES),
+            follow_redirects=True,
+        )
+        state = {"client": client, "semaphores": {}}
+        _async_state[loop] = state
+    return state
+
+
+def get_async_client():
+    """
+    Return this event loop's pooled httpx client, creating it on first use
+    """
+    return _get_async_state()["client"]
+
+
+def _async_host_semaphore(host):
+    semaphores = _get_async_state()["semaphores"]
+    semaphore = semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.BoundedSemaphore(settings.HTTP_MAX_CONCURRENCY_PER_HOST)
+        semaphores[host] = semaphore
+    return semaphore
+
+
+def retry_delay(response, attempt):
+    """
+    Seconds to wait before retrying: Retry-After if given, else jittered
+    backoff, at most HTTP_MAX_RETRY_WAIT. None if Retry-After asks for
+    longer than that, which means don't retry.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        if int(retry_after) > settings.HTTP_MAX_RETRY_WAIT:
+            return None
+        return int(retry_after)
+    backoff = settings.HTTP_BACKOFF_FACTOR * (2 ** attempt)
+    return min(
+        backoff + random.uniform(0, settings.HTTP_BACKOFF_JITTER),
+        settings.HTTP_MAX_RETRY_WAIT,
+    )
+
+
+async def aget(url, **kwargs):
+    """
+    Async GET with the same per-host limit and 429/5xx retries as get()
+    """
+    client = get_async_client()
+    async with _async_host_semaphore(urlsplit(url).hostname):
+        for attempt in range(settings.HTTP_MAX_RETRIES + 1):
+            response = await client.get(url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == settings.HTTP_MAX_RETRIES:
+                return response
+            delay = retry_delay(response, attempt)
+            if delay is None:
+                return response
+            await asyncio.sleep(delay)
+
+
+@asynccontextmanager
+async def astream(url, **kwargs):
+    """
+    Async streaming GET that holds the host slot until the body has been read
+    """
+    client = get_async_client()
+    async with _async_host_semaphore(urlsplit(url).hostname):
+        async with client.stream("GET", url, **kwargs) as response:
+            yield response
@@ -0,0 +1,185 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+from rest_framework import status
+from .admission import check_job_capacity
+from .generation import STAGES, GenerationError, generate_deck
+from .models import GenerationJob
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.GENERATION_JOB_WORKERS,
+                    thread_name_prefix="generation-job",
+                )
+    return _executor
+
+
+def enqueue_generation(project, user, slide_titles, engine=None, mode=None):
+    """
+    Record a queued generation job and hand it to the configured runner.
+
+    With GENERATION_JOB_RUNNER = "thread" the job runs on this process's
+    worker pool; with "db" it waits for `manage.py run_generation_jobs`.
+    A request identical to a job that is still queued or running gets that
+    job back instead of a new one; otherwise the user's job cap applies.
+    Stale jobs of the user are failed first, so they count for neither.
+    """
+    fail_stale_jobs(user=user)
+    existing = find_unfinished_job(project, slide_titles, engine, mode)
+    if existing is not None:
+        return existing
+    check_job_capacity(user)
+
+    job = GenerationJob.objects.create(
+        project=project,
+        user=user,
+        slide_titles=slide_titles,
+        engine=engine,
+        mode=mode,
+        progress={stage: "pending" for stage in STAGES},
+    )
+    if settings.GENERATION_JOB_RUNNER == "thread":
+        transaction.on_commit(lambda: _get_executor().submit(run_job_in_worker, job.id))
+    return job
+
+
+def find_unfinished_job(project, slide_titles, engine, mode):
+    unfinished = GenerationJob.objects.filter(
+        project=project,
+        engine=engine,
+        mode=mode,
+        status__in=[GenerationJob.STATUS_QUEUED, GenerationJob.STATUS_RUNNING],
+    )
+    # JSON equality differs between databases; compare the titles here
+    for job in unfinished:
+        if job.slide_titles == slide_titles:
+            return job
+    return None
+
+
+def stale_jobs():
+    """
+    Unfinished jobs whose runner has gone away: queued and never claimed
+    within GENERATION_JOB_QUEUE_TIMEOUT, or running without a heartbeat
+    within GENERATION_JOB_STALE_AFTER
+    """
+    current = now()
+    return GenerationJob.objects.filter(
+        Q(
+            status=GenerationJob.STATUS_QUEUED,
+            created_at__lt=current - timedelta(seconds=settings.GENERATION_JOB_QUEUE_TIMEOUT),
+        )
+        | Q(
+            status=GenerationJob.STATUS_RUNNING,
+            heartbeat_at__lt=current - timedelta(seconds=settings.GENERATION_JOB_STALE_AFTER),
+        )
+    )
+
+
+def fail_stale_jobs(**filters):
+    """
+    Mark stale jobs (narrowed by filters) failed; returns how many
+    """
+    failed = stale_jobs().filter(**filters).update(
+        status=GenerationJob.STATUS_FAILED,
+        error="The generation job stopped responding. Please try again.",
+        error_status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        finished_at=now(),
+    )
+    if failed:
+        print(f"Failed {failed} stale generation jobs")
+    return failed
+
+
+def claim_job(job_id):
+    """
+    Move a queued job to running; False if another runner got it first
+    """
+    current = now()
+    claimed = GenerationJob.objects.filter(
+        id=job_id, status=GenerationJob.STATUS_QUEUED
+    ).update(status=GenerationJob.STATUS_RUNNING, started_at=current, heartbeat_at=current)
+    return claimed == 1
+
+
+def claim_next_job():
+    """
+    Claim the oldest queued job, returning its id or None if the queue is empty
+    """
+    queued = GenerationJob.objects.filter(
+        status=GenerationJob.STATUS_QUEUED
+    ).order_by("created_at")
+    for job_id in queued.values_list("id", flat=True)[:10]:
+        if claim_job(job_id):
+            return job_id
+    return None
+
+
+def run_job_in_worker(job_id):
+    try:
+        if claim_job(job_id):
+            run_job(job_id)
+    finally:
+        connections.close_all()
+
+
+def run_job(job_id):
+    """
+    Run the generation pipeline for an already claimed job
+    """
+    job = GenerationJob.objects.select_related("project").get(id=job_id)
+    jobs = GenerationJob.objects.filter(id=job_id)
+    progress = dict(job.progress)
+
+    def on_stage(stage):
+        for name, state in progress.items():
+            if state == "running":
+                progress[name] = "done"
+        progress[stage] = "running"
+        jobs.update(stage=stage, progress=progress, heartbeat_at=now())
+
+    try:
+        result = generate_deck(
+            job.project,
+            job.slide_titles,
+            on_stage=on_stage,
+            engine=job.engine,
+            mode=job.mode,
+        )
+    except Exception as e:
+        if isinstance(e, GenerationError):
+            message, error_status = e.message, e.status_code
+        else:
+            print(f"Generation job {job_id} crashed: {e}")
+            message, error_status = str(e), status.HTTP_500_INTERNAL_SERVER_ERROR
+        jobs.update(
+            status=GenerationJob.STATUS_FAILED,
+            progress={
+                name: "failed" if state == "running" else state
+                for name, state in progress.items()
+            },
+            error=message,
+            error_status=error_status,
+            finished_at=now(),
+        )
+        return
+
+    jobs.update(
+        status=GenerationJob.STATUS_SUCCEEDED,
+        stage=None,
+        progress={name: "done" for name in progress},
+        result=result,
+        finished_at=now(),
+    )
@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+import dotenv
+import google.generativeai as genai
+from django.conf import settings
+
+dotenv.load_dotenv()
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+_lock = threading.Lock()
+_configured = False
+_models = {}
+_slots = None
+
+_stats_lock = threading.Lock()
+_stats = {
+    "configure_calls": 0,
+    "models_created": 0,
+    "setup_seconds": 0.0,
+    "inference_calls": 0,
+    "inference_seconds": 0.0,
+    "queue_seconds": 0.0,
+    "busy_errors": 0,
+}
+
+
+class LLMBusyError(Exception):
+    """
+    No LLM slot freed up within LLM_QUEUE_TIMEOUT
+    """
+
+
+def _record(**increments):
+    with _stats_lock:
+        for key, value in increments.items():
+            _stats[key] += value
+
+
+def configure():
+    """
+    Configure the Gemini SDK with GEMINI_API once per process
+    """
+    global _configured
+    if _configured:
+        return
+    with _lock:
+        if _configured:
+            return
+        api_key = os.getenv("GEMINI_API")
+        if not api_key:
+            raise ValueError("GEMINI_API environment variable is not set.")
+
+        start = time.perf_counter()
+        genai.configure(api_key=api_key)
+        _record(configure_calls=1, setup_seconds=time.perf_counter() - start)
+        _configured = True
+
+
+def get_model(model_name=DEFAULT_MODEL, generation_config=None):
+    """
+    Shared GenerativeModel for a model name and generation config.
+    Instances are safe to use from several worker threads at once.
+    """
+    key = (model_name, json.dumps(generation_config, sort_keys=True))
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    configure()
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            start = time.perf_counter()
+            model = genai.GenerativeModel(
+                model_name, generation_config=generation_config
+            )
+            _record(models_created=1, setup_seconds=time.perf_counter() - start)
+            _models[key] = model
+    return model
+
+
+def _get_slots():
+    global _slots
+    if _slots is None:
+        with _lock:
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+    return _slots
+
+
+@contextmanager
+def llm_slot():
+    """
+    Hold one of the process-wide LLM_MAX_CONCURRENCY request slots, waiting
+    up to LLM_QUEUE_TIMEOUT for one before raising LLMBusyError
+    """
+    start = time.perf_counter()
+    acquired = _get_slots().acquire(timeout=settings.LLM_QUEUE_TIMEOUT)
+    _record(queue_seconds=time.perf_counter() - start)
+    if not acquired:
+        _record(busy_errors=1)
+        raise LLMBusyError("Too many LLM requests in flight.")
+    try:
+        yield
+    finally:
+        _slots.release()
+
+
+@asynccontextmanager
+async def llm_slot_async():
+    """
+    llm_slot for coroutines. Shares the threads' semaphore, polling it so
+    the event loop is never blocked while waiting.
+    """
+    slots = _get_slots()
+    start = time.perf_counter()
+    deadline = time.monotonic() + settings.LLM_QUEUE_TIMEOUT
+    delay = 0.01
+    while not slots.acquire(blocking=False):
+        if time.monotonic() >= deadline:
+            _record(queue_seconds=time.perf_counter() - start, busy_errors=1)
+            raise LLMBusyError("Too many LLM requests in flight.")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.25)
+    _record(queue_seconds=time.perf_counter() - start)
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+def generate_content(prompt, model_name=DEFAULT_MODEL, generation_config=None):
+    """
+    Run a (non-streaming) generation on the shared model
+    """
+    model = get_model(model_name, generation_config)
+    with llm_slot():
+        start = time.perf_counter()
+        try:
+            return model.generate_content(prompt)
+        finally:
+            _record(inference_calls=1, inference_seconds=time.perf_counter() - start)
+
+
+async def generate_content_async(prompt, model_name=DEFAULT_MODEL, generation_config=None):
+    """
+    Run a (non-streaming) generation without blocking the event loop
+    """
+    model = get_model(model_name, generation_config)
+    async with llm_slot_async():
+        start = time.perf_counter()
+        try:
+            return await model.generate_content_async(prompt)
+        finally:
+            _record(inference_calls=1, inference_seconds=time.perf_counter() - start)
+
+
+def stream_content(prompt, model_name=DEFAULT_MODEL, generation_config=None):
+    """
+    Run a streaming generation on the shared model, yielding response chunks.
+    The LLM slot is held until the stream ends.
+    """
+    model = get_model(model_name, generation_config)
+    with llm_slot():
+        start = time.perf_counter()
+        try:
+            yield from model.generate_content(prompt, stream=True)
+        finally:
+            _record(inference_calls=1, inference_seconds=time.perf_counter() - start)
+
+
+def get_llm_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["cached_models"] = len(_models)
+    stats["max_concurrency"] = settings.LLM_MAX_CONCURRENCY
+    return stats
@@ -0,0 +1,84 @@
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .cache import get_lookup_cache
+from .llm import DEFAULT_MODEL
+from .prompts import prompt_version
+
+
+def normalize_inputs(value, near_duplicate=False):
+    """
+    Collapse whitespace in every string (and lowercase it in near-duplicate
+    mode) so retries of the same request map to the same cache key
+    """
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value.lower() if near_duplicate else value
+    if isinstance(value, (list, tuple)):
+        return [normalize_inputs(item, near_duplicate) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize_inputs(item, near_duplicate) for key, item in value.items()}
+    return value
+
+
+def response_cache_key(endpoint, template, inputs, model_name=DEFAULT_MODEL):
+    near_duplicate = settings.LLM_RESPONSE_CACHE["NEAR_DUPLICATE"]
+    return json.dumps(
+        {
+            "endpoint": endpoint,
+            "template": prompt_version(template),
+            "model": model_name,
+            "near_duplicate": near_duplicate,
+            "inputs": normalize_inputs(inputs, near_duplicate),
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+
+def cached_response(
+    endpoint, template, inputs, generate, validate=None, model_name=DEFAULT_MODEL
+):
+    """
+    Return the raw model output for these inputs, calling generate() only on
+    a cache miss. Empty outputs, and outputs validate(output) rejects, are
+    not cached, so a retry asks the model again. Endpoints switched off in
+    LLM_RESPONSE_CACHE["ENDPOINTS"] always call generate().
+    """
+    if not settings.LLM_RESPONSE_CACHE["ENDPOINTS"].get(endpoint, False):
+        return generate()
+
+    cache = get_lookup_cache("llm_responses")
+    key = response_cache_key(endpoint, template, inputs, model_name)
+    hit, output = cache.get(key)
+    if hit and output:
+        print(f"LLM response cache hit for {endpoint}")
+        return output
+
+    output = generate()
+    if output and (validate is None or validate(output)):
+        cache.set(key, output)
+    return output
+
+
+async def cached_response_async(
+    endpoint, template, inputs, agenerate, validate=None, model_name=DEFAULT_MODEL
+):
+    """
+    cached_response for coroutines: awaits agenerate() on a miss and reaches
+    the cache backend through sync_to_async
+    """
+    if not settings.LLM_RESPONSE_CACHE["ENDPOINTS"].get(endpoint, False):
+        return await agenerate()
+
+    cache = get_lookup_cache("llm_responses")
+    key = response_cache_key(endpoint, template, inputs, model_name)
+    hit, output = await sync_to_async(cache.get)(key)
+    if hit and output:
+        print(f"LLM response cache hit for {endpoint}")
+        return output
+
+    output = await agenerate()
+    if output and (validate is None or validate(output)):
+        await sync_to_async(cache.set)(key, output)
+    return output
@@ -0,0 +1,80 @@
+import math
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from ai import http_client
+from ai.getImgColor import (
+    colorthief_dominant_color,
+    dominant_color_from_bytes,
+    download_image,
+    rgb_to_hex,
+    small_rendition_url,
+)
+
+
+def color_distance(a, b):
+    return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the NumPy dominant-color engine against the ColorThief path "
+        "for speed and color agreement. Sources are image URLs or local files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="+")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=40.0,
+            help="RGB distance under which two colors count as agreeing",
+        )
+
+    def handle(self, *args, sources, repeat, threshold, **options):
+        rows = []
+        for source in sources:
+            if Path(source).exists():
+                original = small = Path(source).read_bytes()
+                fetch_old = fetch_new = 0.0
+            else:
+                start = time.perf_counter()
+                original = http_client.get(source).content
+                fetch_old = time.perf_counter() - start
+
+                start = time.perf_counter()
+                small = download_image(small_rendition_url(source))
+                fetch_new = time.perf_counter() - start
+
+            old_color, old_time = self._time(colorthief_dominant_color, original, repeat)
+            new_color, new_time = self._time(dominant_color_from_bytes, small, repeat)
+            distance = color_distance(old_color, new_color)
+            rows.append((old_time + fetch_old, new_time + fetch_new, distance))
+
+            self.stdout.write(
+                f"{source}\n"
+                f"  colorthief {rgb_to_hex(old_color)}  "
+                f"fetch {fetch_old * 1000:8.1f} ms ({len(original)} B)  "
+                f"extract {old_time * 1000:8.1f} ms\n"
+                f"  numpy      {rgb_to_hex(new_color)}  "
+                f"fetch {fetch_new * 1000:8.1f} ms ({len(small)} B)  "
+                f"extract {new_time * 1000:8.1f} ms\n"
+                f"  distance {distance:.1f}"
+            )
+
+        old_total = sum(row[0] for row in rows)
+        new_total = sum(row[1] for row in rows)
+        agreeing = sum(1 for row in rows if row[2] <= threshold)
+        self.stdout.write(
+            f"\n{len(rows)} images: colorthief {old_total * 1000:.1f} ms, "
+            f"numpy {new_total * 1000:.1f} ms "
+            f"({old_total / new_total if new_total else float('inf'):.1f}x), "
+            f"{agreeing}/{len(rows)} colors within {threshold:g}"
+        )
+
+    def _time(self, extract, data, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            color = extract(data)
+        return color, (time.perf_counter() - start) / repeat
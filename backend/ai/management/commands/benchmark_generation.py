@@ -0,0 +1,97 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from ai.generation import generate_single_shot, generate_slides_parallel
+from ai.xml_parser import parse_xml_presentation
+
+# Outline topics cycled to build decks of any length
+TOPICS = [
+    "Introduction",
+    "Market Overview",
+    "Customer Problems",
+    "Our Solution",
+    "Key Features",
+    "Competitive Landscape",
+    "Business Model",
+    "Go To Market",
+    "Roadmap",
+    "Team",
+    "Financial Projections",
+    "Risks and Mitigations",
+    "Case Study",
+    "Metrics That Matter",
+    "Conclusion",
+]
+
+
+def build_titles(num_slides):
+    return [
+        TOPICS[i % len(TOPICS)] + (f" {i // len(TOPICS) + 1}" if i >= len(TOPICS) else "")
+        for i in range(num_slides)
+    ]
+
+
+def run_single(title, slide_titles):
+    """
+    One prompt for the whole deck. A run fails if the request errors or the
+    parsed deck doesn't have one slide per title.
+    """
+    try:
+        xml_content = generate_single_shot(title, slide_titles)
+        slides_data = parse_xml_presentation(xml_content, title)
+    except Exception:
+        return {"requests": 1, "failed_slides": len(slide_titles), "run_failed": True}
+    missing = max(0, len(slide_titles) - len(slides_data))
+    return {"requests": 1, "failed_slides": missing, "run_failed": missing > 0}
+
+
+def run_parallel(title, slide_titles):
+    """
+    One prompt per slide. Only slides that fell back after their retries count
+    as failures.
+    """
+    _, _, report = generate_slides_parallel(title, title, slide_titles)
+    failed = len(report["failed_slides"])
+    return {"requests": report["requests"], "failed_slides": failed, "run_failed": failed > 0}
+
+
+class Command(BaseCommand):
+    help = "Compare wall time and failure rate of the single-shot and parallel engines (calls Gemini)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--slides", type=int, nargs="+", default=[5, 15, 30])
+        parser.add_argument("--runs", type=int, default=3)
+        parser.add_argument("--title", default="The Future of Remote Work")
+
+    def handle(self, *args, slides, runs, title, **options):
+        engines = {"single": run_single, "parallel": run_parallel}
+
+        # Every run must hit the model, so the LLM response cache is switched off.
+        # The report is written after all runs, below the engines' diagnostics.
+        results = []
+        with override_settings(
+            LLM_RESPONSE_CACHE={"ENDPOINTS": {}, "NEAR_DUPLICATE": False}
+        ):
+            for num_slides in slides:
+                slide_titles = build_titles(num_slides)
+                for name, run in engines.items():
+                    results.append(
+                        (num_slides, name, self._measure(run, title, slide_titles, runs))
+                    )
+
+        for num_slides, name, (elapsed, totals) in results:
+            self.stdout.write(
+                f"{num_slides:>3} slides  {name:<8} "
+                f"{elapsed:7.2f} s/deck  "
+                f"requests {totals['requests'] / runs:5.1f}/deck  "
+                f"failed slides {totals['failed_slides'] / (num_slides * runs):6.1%}  "
+                f"failed decks {totals['run_failed']}/{runs}"
+            )
+
+    def _measure(self, run, title, slide_titles, runs):
+        totals = {"requests": 0, "failed_slides": 0, "run_failed": 0}
+        start = time.perf_counter()
+        for _ in range(runs):
+            for key, value in run(title, slide_titles).items():
+                totals[key] += int(value)
+        return (time.perf_counter() - start) / runs, totals
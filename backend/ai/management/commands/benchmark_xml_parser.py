@@ -0,0 +1,143 @@
+import time
+from django.core.management.base import BaseCommand
+from ai.xml_parser import (
+    PresentationParser,
+    extract_heading_from_xml,
+    parse_xml_presentation_tree,
+)
+
+SECTION_TEMPLATES = [
+    """<SECTION layout="left">
+<H1>Market Overview {n}</H1>
+<COLUMNS>
+<DIV><H3>Segment A</H3><P>Growth driven by enterprise adoption and new pricing tiers</P></DIV>
+<DIV><H3>Segment B</H3><P>Consumer demand stabilising after two volatile quarters</P></DIV>
+<DIV><H3>Segment C</H3><P>Emerging markets contributing a rising share of revenue</P></DIV>
+</COLUMNS>
+<IMG query="modern office team reviewing market growth charts on a large screen" />
+</SECTION>""",
+    """<SECTION layout="right">
+<H2>Key Findings {n}</H2>
+<BULLETS>
+<DIV><H3>Retention</H3><P>Customers who onboard in week one churn half as often</P></DIV>
+<DIV><H3>Expansion</H3><P>Seat expansion accounts for most net new revenue</P></DIV>
+<DIV><H3>Support</H3><P>Median ticket resolution time fell by a third</P></DIV>
+</BULLETS>
+<IMG query="customer success manager on a video call with a client in a bright office" />
+</SECTION>""",
+    """<SECTION layout="vertical">
+<H2>Quarterly Revenue {n}</H2>
+<CHART charttype="vertical-bar">
+<TABLE>
+<TR><TD type="label"><VALUE>Q1</VALUE></TD><TD type="data"><VALUE>120</VALUE></TD></TR>
+<TR><TD type="label"><VALUE>Q2</VALUE></TD><TD type="data"><VALUE>135</VALUE></TD></TR>
+<TR><TD type="label"><VALUE>Q3</VALUE></TD><TD type="data"><VALUE>150</VALUE></TD></TR>
+<TR><TD type="label"><VALUE>Q4</VALUE></TD><TD type="data"><VALUE>170</VALUE></TD></TR>
+</TABLE>
+</CHART>
+</SECTION>""",
+    """<SECTION layout="left">
+<H2>Roadmap {n}</H2>
+<TIMELINE>
+<DIV><H3>Discovery</H3><P>Interview users and map the current workflow</P></DIV>
+<DIV><H3>Pilot</H3><P>Ship to three design partners and measure adoption</P></DIV>
+<DIV><H3>Launch</H3><P>General availability with self serve onboarding</P></DIV>
+</TIMELINE>
+<IMG query="project roadmap sticky notes on a glass wall in a startup office" />
+</SECTION>""",
+    """<SECTION layout="right">
+<ICONS>
+<DIV><ICON query="shield" /><H3>Security</H3><P>Encryption at rest and in transit</P></DIV>
+<DIV><ICON query="rocket" /><H3>Speed</H3><P>Pages render in under a second</P></DIV>
+<DIV><ICON query="users" /><H3>Collaboration</H3><P>Real time editing for whole teams</P></DIV>
+</ICONS>
+<IMG query="abstract technology background with glowing network connections" />
+</SECTION>""",
+]
+
+
+def build_deck(num_slides):
+    sections = [
+        SECTION_TEMPLATES[i % len(SECTION_TEMPLATES)].format(n=i + 1)
+        for i in range(num_slides)
+    ]
+    return "<PRESENTATION>\n" + "\n".join(sections) + "\n</PRESENTATION>"
+
+
+def parse_tree(xml_content):
+    """
+    The previous path: parse the whole document, then re-scan each slide's
+    serialized XML for its heading
+    """
+    slides_data = parse_xml_presentation_tree(xml_content, "Benchmark")
+    for slide_data in slides_data:
+        slide_data["heading"] = extract_heading_from_xml(slide_data["xml_content"])
+    return slides_data
+
+
+def parse_sections(xml_content):
+    parser = PresentationParser("Benchmark")
+    return parser.feed(xml_content) + parser.close()
+
+
+def parse_sections_chunked(xml_content, chunk_size=64):
+    parser = PresentationParser("Benchmark")
+    slides_data = []
+    for i in range(0, len(xml_content), chunk_size):
+        slides_data += parser.feed(xml_content[i : i + chunk_size])
+    return slides_data + parser.close()
+
+
+def summary(slide_data):
+    return (
+        slide_data["slide_number"],
+        slide_data["section_layout"],
+        slide_data["layout_type"],
+        slide_data["content"],
+        slide_data["img_queries"][:1],
+        slide_data["heading"],
+    )
+
+
+class Command(BaseCommand):
+    help = "Compare PresentationParser against the whole-document ElementTree parser"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--slides", type=int, nargs="+", default=[15, 100, 500])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, slides, repeat, **options):
+        # The whole-document parser prints every deck it parses, as it did in
+        # production; the report is written after all runs, below that output
+        results = [self._run(num_slides, repeat) for num_slides in slides]
+
+        for num_slides, size, timings, same in results:
+            baseline = timings["tree"]
+            self.stdout.write(f"{num_slides} slides ({size} bytes), outputs match: {same}")
+            for name, elapsed in timings.items():
+                self.stdout.write(
+                    f"  {name:<12} {elapsed * 1000:8.2f} ms  "
+                    f"({baseline / elapsed:.2f}x vs tree)"
+                )
+
+    def _run(self, num_slides, repeat):
+        xml_content = build_deck(num_slides)
+        parsers = {
+            "tree": parse_tree,
+            "sections": parse_sections,
+            "sections/64B": parse_sections_chunked,
+        }
+        timings = {}
+        outputs = {}
+        for name, parse in parsers.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                outputs[name] = parse(xml_content)
+            timings[name] = (time.perf_counter() - start) / repeat
+
+        expected = [summary(slide) for slide in outputs["tree"]]
+        same = all(
+            [summary(slide) for slide in output] == expected
+            for output in outputs.values()
+        )
+        return num_slides, len(xml_content), timings, same
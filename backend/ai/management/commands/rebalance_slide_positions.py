@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from ai.models import Project
+from ai.ordering import rebalance_positions
+
+
+class Command(BaseCommand):
+    help = (
+        "Renumber slide ordering keys to evenly gapped values. Run once after "
+        "adding Slide.position to backfill it from slide_number."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--project", action="append", help="Only this project id (repeatable)"
+        )
+
+    def handle(self, *args, project, **options):
+        projects = Project.objects.all()
+        if project:
+            projects = projects.filter(id__in=project)
+
+        total = 0
+        for project_id in projects.values_list("id", flat=True).iterator():
+            total += rebalance_positions(project_id)
+        self.stdout.write(f"Rewrote {total} slide positions")
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from ai.jobs import claim_next_job, fail_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued deck generation jobs from the database. "
+        "Used when GENERATION_JOB_RUNNER is set to 'db'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once the queue is empty"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty",
+        )
+
+    def handle(self, *args, once, interval, **options):
+        while True:
+            close_old_connections()
+            fail_stale_jobs()
+            job_id = claim_next_job()
+            if job_id is None:
+                if once:
+                    return
+                time.sleep(interval)
+                continue
+
+            self.stdout.write(f"Running generation job {job_id}")
+            run_job(job_id)
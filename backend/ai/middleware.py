@@ -0,0 +1,67 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+class QueryCounter:
+    """
+    connection.execute_wrapper hook that counts queries and their time
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class QueryCountMiddleware:
+    """
+    Report the SQL queries a request ran on this thread as X-DB-Queries and
+    X-DB-Time (ms) headers, and print a line per request in DEBUG.
+    Enabled by QUERY_COUNT_HEADERS. Queries run by worker threads (image
+    enrichment, background jobs) and by streamed response bodies after the
+    headers are sent are not included.
+
+    Async-capable so the async views under slides/asgi.py stay on the event
+    loop. Their ORM calls run on sync_to_async threads, out of this
+    middleware's reach, so async requests pass through without headers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_COUNT_HEADERS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+
+        response["X-DB-Queries"] = str(counter.count)
+        response["X-DB-Time"] = f"{counter.seconds * 1000:.1f}"
+        if settings.DEBUG:
+            print(
+                f"{request.method} {request.path} -> {response.status_code}: "
+                f"{counter.count} queries, {counter.seconds * 1000:.1f} ms"
+            )
+        return response
@@ -1,9 +1,13 @@
 from django.db import models
 from django.contrib.auth.models import User
+import threading
 import uuid
+from contextlib import contextmanager
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils.timezone import now
+from django.core.serializers.json import DjangoJSONEncoder
+from .deck_cache import invalidate_deck
 
 
 # User Profile model
@@ -40,6 +44,12 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Dashboard: a user's projects, most recently edited first
+            models.Index(fields=["user", "-updated_at"], name="project_user_updated_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -52,7 +62,8 @@ class Slide(models.Model):
     template = models.ForeignKey(
         Template, on_delete=models.SET_NULL, null=True, blank=True
     )
-    slide_number = models.PositiveIntegerField()  # Order in the project
+    slide_number = models.PositiveIntegerField()  # Dense number as of the last renumbering
+    position = models.BigIntegerField(default=0)  # Sparse ordering key (see ai/ordering.py)
     content = models.JSONField()  # Content of the slide (title, body, images, etc.)
     xml_content = models.TextField(blank=True, null=True)  # Store XML for this slide
     layout_type = models.CharField(max_length=50, blank=True, null=True)  # Layout type
@@ -63,21 +74,82 @@ class Slide(models.Model):
     dominant_color = models.CharField(
         max_length=7, blank=True, null=True, default="#ffdbac"
     )
+    img_query = models.CharField(max_length=255, blank=True, null=True)  # Pexels query img_url came from
+    img_pending = models.BooleanField(default=False)  # img_url is a placeholder until the lookup for img_query finishes
 
     class Meta:
-        ordering = ["slide_number"]  # Ensure slides are always ordered by their number
+        ordering = ["position", "slide_number", "id"]  # Ensure slides are always ordered by their key
+        indexes = [
+            # Deck loads, neighbour lookups and rank counts
+            models.Index(
+                fields=["project", "position", "slide_number"],
+                name="slide_project_order_idx",
+            ),
+            # ?since= delta responses
+            models.Index(fields=["project", "updated_at"], name="slide_project_updated_idx"),
+        ]
+        constraints = [
+            # Position 0 marks slides not yet backfilled by rebalance_slide_positions
+            models.UniqueConstraint(
+                fields=["project", "position"],
+                condition=models.Q(position__gt=0),
+                name="slide_unique_position",
+            ),
+        ]
 
     def __str__(self):
         return f"Slide {self.slide_number} in {self.project.title}"
 
 
+_touch_state = threading.local()
+
+
+def touch_project(project_id, **fields):
+    """
+    Bump a project's updated_at (and set any extra fields) with one UPDATE,
+    dropping its cached deck payload
+    """
+    updated = Project.objects.filter(id=project_id).update(updated_at=now(), **fields)
+    invalidate_deck(project_id)
+    return updated
+
+
+def lock_project(project_id):
+    """
+    Take a row lock on a project until the current transaction ends, so
+    writers that rewrite its whole deck go one at a time. SQLite has no
+    row locks; there the IMMEDIATE transaction mode serializes writers.
+    """
+    list(Project.objects.select_for_update().filter(id=project_id).values_list("id"))
+
+
+@contextmanager
+def suppress_project_touch():
+    """
+    Skip the per-slide timestamp update while writing many slides at once;
+    the caller touches the project itself afterwards
+    """
+    depth = getattr(_touch_state, "depth", 0)
+    _touch_state.depth = depth + 1
+    try:
+        yield
+    finally:
+        _touch_state.depth = depth
+
+
 @receiver(post_save, sender=Slide)
 @receiver(post_delete, sender=Slide)
 def update_project_timestamp(sender, instance, **kwargs):
     # Update the associated project's updated_at field
-    project = instance.project
-    project.updated_at = now()
-    project.save()
+    if getattr(_touch_state, "depth", 0):
+        return
+    touch_project(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def drop_cached_deck(sender, instance, **kwargs):
+    invalidate_deck(instance.id)
 
 
 # Shared Project model
@@ -97,3 +169,66 @@ class SharedProject(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.project.title} ({self.role})"
+
+
+# Background deck generation job (see ai/jobs.py)
+class GenerationJob(models.Model):
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="generation_jobs"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="generation_jobs"
+    )
+    slide_titles = models.JSONField(default=list)
+    engine = models.CharField(max_length=10, blank=True, null=True)  # None = GENERATION_ENGINE
+    mode = models.CharField(max_length=10, blank=True, null=True)  # None = GENERATION_SAVE_MODE
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED
+    )
+    stage = models.CharField(max_length=20, blank=True, null=True)  # Current stage
+    progress = models.JSONField(default=dict)  # Stage name -> pending/running/done
+    result = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True, null=True)
+    error_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)  # Last sign of life from the runner
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"Generation {self.id} for {self.project_id} ({self.status})"
+
+
+# Persistent key/value store backing the lookup caches in ai/cache.py
+class CacheEntry(models.Model):
+    namespace = models.CharField(max_length=50)
+    key = models.CharField(max_length=64)  # sha256 of the normalized key
+    value = models.TextField(blank=True, null=True)  # Null marks a negative entry
+    expires_at = models.DateTimeField()
+    last_used_at = models.DateTimeField(default=now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["namespace", "key"], name="unique_cache_entry"
+            )
+        ]
+        indexes = [models.Index(fields=["namespace", "last_used_at"])]
+
+    def __str__(self):
+        return f"{self.namespace}:{self.key}"
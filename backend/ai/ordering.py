@@ -0,0 +1,273 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Max, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils.timezone import now
+from rest_framework import status
+from .models import Slide, lock_project, touch_project
+
+# Slides are ordered by a sparse integer key, position. Slide k of a freshly
+# numbered deck sits at k * POSITION_GAP, so a slide can be inserted or moved
+# by writing one row with a key between its new neighbours. When two
+# neighbours get closer than POSITION_MIN_GAP the deck is renumbered in the
+# background. slide_number is the dense 1..N rank, derived for the API.
+POSITION_GAP = settings.SLIDE_POSITION_GAP
+POSITION_MIN_GAP = settings.SLIDE_POSITION_MIN_GAP
+
+# Display order; slide_number and id break ties for decks not yet backfilled
+# (position 0). Live keys are positive and unique per project.
+ORDER_FIELDS = ["position", "slide_number", "id"]
+
+_rebalance_executor = None
+_rebalance_lock = threading.Lock()
+_rebalance_pending = set()
+
+
+class OrderingError(Exception):
+    """
+    A reorder request doesn't match the project's slides
+    """
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def ordered_slides(project):
+    """
+    A project's slides in display order, annotated with their derived
+    slide number
+    """
+    return (
+        Slide.objects.filter(project=project)
+        .annotate(
+            display_number=Window(
+                RowNumber(), order_by=[F(field).asc() for field in ORDER_FIELDS]
+            )
+        )
+        .order_by(*ORDER_FIELDS)
+    )
+
+
+def slide_rank(slide):
+    """
+    1-based display number of a single slide
+    """
+    before = (
+        Q(position__lt=slide.position)
+        | Q(position=slide.position, slide_number__lt=slide.slide_number)
+        | Q(position=slide.position, slide_number=slide.slide_number, id__lt=slide.id)
+    )
+    return Slide.objects.filter(before, project_id=slide.project_id).count() + 1
+
+
+def current_order(project):
+    """
+    (id, position) of a project's slides in display order, without loading
+    slide content
+    """
+    return list(
+        Slide.objects.filter(project=project)
+        .order_by(*ORDER_FIELDS)
+        .values_list("id", "position")
+    )
+
+
+def next_position(project):
+    """
+    Key for a slide appended at the end of the deck
+    """
+    last = Slide.objects.filter(project=project).aggregate(last=Max("position"))["last"]
+    return (last or 0) + POSITION_GAP
+
+
+def parse_slide_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise OrderingError(f"Invalid slide ID {value!r}.")
+
+
+def write_positions(changed, fields):
+    """
+    bulk_update slides to new keys without tripping the unique
+    (project, position) constraint halfway through: the rows first park at
+    the negated target key, which no live row uses, then take the real one
+    """
+    parked = [Slide(id=slide.id, position=-slide.position) for slide in changed]
+    Slide.objects.bulk_update(parked, ["position"])
+    Slide.objects.bulk_update(changed, fields)
+
+
+def apply_order(project, old_order, new_order):
+    """
+    Renumber slides to follow new_order with evenly gapped keys, writing only
+    the rows whose key changes in one bulk UPDATE, and touch the project once
+    """
+    old_positions = dict(old_order)
+    timestamp = now()
+    changed = [
+        Slide(
+            id=slide_id,
+            position=number * POSITION_GAP,
+            slide_number=number,
+            updated_at=timestamp,
+        )
+        for number, slide_id in enumerate(new_order, 1)
+        if old_positions[slide_id] != number * POSITION_GAP
+    ]
+    if changed:
+        with transaction.atomic():
+            write_positions(changed, ["position", "slide_number", "updated_at"])
+            touch_project(project.id)
+    return len(changed)
+
+
+def reorder_slides(project, new_order):
+    """
+    Put a project's slides in the given order of slide ids.
+    Returns (order, number of slides rewritten).
+    """
+    if not isinstance(new_order, list) or not new_order:
+        raise OrderingError("Invalid slide order.")
+    new_order = [parse_slide_id(slide_id) for slide_id in new_order]
+
+    old_order = current_order(project)
+    old_ids = {slide_id for slide_id, _ in old_order}
+    unknown = set(new_order) - old_ids
+    if unknown:
+        raise OrderingError(
+            f"Slide with ID {min(unknown)} not found.", status.HTTP_404_NOT_FOUND
+        )
+    if len(new_order) != len(old_order) or len(set(new_order)) != len(new_order):
+        raise OrderingError("Invalid slide order.")
+
+    return new_order, apply_order(project, old_order, new_order)
+
+
+def position_at(project, index, exclude_id=None):
+    """
+    Key for a slide placed at 1-based index, between the slides currently at
+    index - 1 and index (ignoring exclude_id). Renumbers the deck first if
+    there is no free key between them.
+    """
+    for _ in range(2):
+        slides = Slide.objects.filter(project=project)
+        if exclude_id is not None:
+            slides = slides.exclude(id=exclude_id)
+        offset = max(index - 2, 0)
+        neighbours = list(
+            slides.order_by(*ORDER_FIELDS).values_list("position", flat=True)[
+                offset : index
+            ]
+        )
+        if index == 1:
+            prev_key, next_key = None, (neighbours[0] if neighbours else None)
+        else:
+            if not neighbours:
+                raise OrderingError("Invalid target position.")
+            prev_key = neighbours[0]
+            next_key = neighbours[1] if len(neighbours) > 1 else None
+
+        if next_key is None:
+            return (prev_key or 0) + POSITION_GAP
+        if prev_key is None:
+            # Keys stay positive; 0 marks slides not yet backfilled
+            prev_key = 0
+
+        key = (prev_key + next_key) // 2
+        if prev_key < key < next_key:
+            if min(key - prev_key, next_key - key) < POSITION_MIN_GAP:
+                schedule_rebalance(project.id)
+            return key
+
+        # Neighbours are adjacent (or not yet backfilled): make room and retry
+        rebalance_positions(project.id)
+    raise OrderingError("Could not find a free slide position.")
+
+
+def move_slide(project, slide_id, to_position):
+    """
+    Move one slide to a 1-based position by rewriting only its key.
+    Returns (slide id, number of slides rewritten).
+    """
+    slide_id = parse_slide_id(slide_id)
+    if not Slide.objects.filter(id=slide_id, project=project).exists():
+        raise OrderingError(
+            f"Slide with ID {slide_id} not found.", status.HTTP_404_NOT_FOUND
+        )
+    try:
+        to_position = int(to_position)
+    except (TypeError, ValueError):
+        raise OrderingError("Invalid target position.")
+    if to_position < 1:
+        raise OrderingError("Position must be 1 or more.")
+
+    with transaction.atomic():
+        position = position_at(project, to_position, exclude_id=slide_id)
+        Slide.objects.filter(id=slide_id).update(position=position, updated_at=now())
+        touch_project(project.id)
+    return slide_id, 1
+
+
+def rebalance_positions(project_id):
+    """
+    Spread a project's keys back to multiples of POSITION_GAP and refresh the
+    stored slide_number, keeping the current order. Returns rows rewritten.
+    """
+    with transaction.atomic():
+        # Wait for inserts that picked a key under the lock to commit
+        lock_project(project_id)
+        order = list(
+            Slide.objects.select_for_update()
+            .filter(project_id=project_id)
+            .order_by(*ORDER_FIELDS)
+            .values_list("id", "position", "slide_number")
+        )
+        changed = [
+            Slide(id=slide_id, position=number * POSITION_GAP, slide_number=number)
+            for number, (slide_id, position, slide_number) in enumerate(order, 1)
+            if position != number * POSITION_GAP or slide_number != number
+        ]
+        if changed:
+            write_positions(changed, ["position", "slide_number"])
+    return len(changed)
+
+
+def _get_rebalance_executor():
+    global _rebalance_executor
+    if _rebalance_executor is None:
+        with _rebalance_lock:
+            if _rebalance_executor is None:
+                _rebalance_executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="slide-rebalance"
+                )
+    return _rebalance_executor
+
+
+def _rebalance_in_worker(project_id):
+    with _rebalance_lock:
+        _rebalance_pending.discard(project_id)
+    try:
+        rebalance_positions(project_id)
+    except Exception as e:
+        print(f"Rebalancing slides of project {project_id} failed: {e}")
+    finally:
+        connections.close_all()
+
+
+def schedule_rebalance(project_id):
+    """
+    Renumber a project's keys in the background once the current
+    transaction commits; repeated requests for one project are merged
+    """
+    with _rebalance_lock:
+        if project_id in _rebalance_pending:
+            return
+        _rebalance_pending.add(project_id)
+    transaction.on_commit(
+        lambda: _get_rebalance_executor().submit(_rebalance_in_worker, project_id)
+    )
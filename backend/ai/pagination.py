@@ -0,0 +1,13 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ProjectCursorPagination(CursorPagination):
+    """
+    Newest-first cursor pages over updated_at; page cost doesn't grow with
+    how far the client has scrolled
+    """
+
+    ordering = ("-updated_at", "-created_at")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
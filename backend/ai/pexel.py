@@ -1,28 +1,80 @@
-import requests
 import os
+from asgiref.sync import sync_to_async
 from dotenv import load_dotenv
+from . import http_client
+from .cache import get_lookup_cache
 
+PEXELS_SEARCH_URL = "https://api.pexels.com/v1/search"
 
-def get_img_link(img_keyword):
+
+def normalize_query(img_keyword):
+    """
+    Normalize an image query so trivially different strings share a cache entry
+    """
+    return " ".join(img_keyword.lower().split())
+
+
+def search_request(img_keyword):
+    """
+    Headers and params of the Pexels search for img_keyword
+    """
     load_dotenv()
     pexel_api = os.getenv("PEXELS_API") 
-    url = "https://api.pexels.com/v1/search"  
     headers = {"Authorization": pexel_api}
     params = {"query": img_keyword, "per_page": 1}
+    return headers, params
+
+
+def first_photo_url(data):
+    if "photos" in data and len(data["photos"]) > 0:
+        return data["photos"][0]["src"]["original"]
+    return None
+
+
+def get_img_link(img_keyword):
+    cache_key = normalize_query(img_keyword)
+    query_cache = get_lookup_cache("pexels")
+    hit, cached_url = query_cache.get(cache_key)
+    if hit:
+        return cached_url
+
+    headers, params = search_request(img_keyword)
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = http_client.get(PEXELS_SEARCH_URL, headers=headers, params=params)
         response.raise_for_status()
-        data = response.json()
+        original_image_url = first_photo_url(response.json())
 
-        if "photos" in data and len(data["photos"]) > 0:
-            original_image_url = data["photos"][0]["src"]["original"]
-            return original_image_url
-        else:
-            return None 
+        # A query without results is cached too
+        query_cache.set(cache_key, original_image_url)
+        return original_image_url
 
     except Exception as e:
         print(f"Error occurred: {e}")
         return None
 
 
+async def get_img_link_async(img_keyword):
+    """
+    get_img_link for async views: the search runs on the event loop, the
+    lookup cache (which may hit the database) on a worker thread
+    """
+    cache_key = normalize_query(img_keyword)
+    query_cache = get_lookup_cache("pexels")
+    hit, cached_url = await sync_to_async(query_cache.get)(cache_key)
+    if hit:
+        return cached_url
+
+    headers, params = search_request(img_keyword)
+
+    try:
+        response = await http_client.aget(PEXELS_SEARCH_URL, headers=headers, params=params)
+        response.raise_for_status()
+        original_image_url = first_photo_url(response.json())
+
+        await sync_to_async(query_cache.set)(cache_key, original_image_url)
+        return original_image_url
+
+    except Exception as e:
+        print(f"Error occurred: {e}")
+        return None
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import re
+import threading
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+PROMPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Placeholders are {lower_snake_case}; other braces (JSON examples) are literal
+PLACEHOLDER = re.compile(r"\{([a-z_]+)\}")
+
+# Template name -> (file, placeholders it must contain)
+TEMPLATES = {
+    "presentation": (
+        "prompt.txt",
+        {"presentation_title", "slide_titles", "num_slides"},
+    ),
+    "outline": (
+        "generate_outline.txt",
+        {"presentation_prompt", "pages"},
+    ),
+    "add_slide": (
+        "add_slide_prompt.txt",
+        {"slide_title", "project_title", "project_description", "existing_slides_count"},
+    ),
+    "title_slide": (
+        "title_slide_prompt.txt",
+        {"presentation_title", "existing_titles"},
+    ),
+}
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class PromptTemplate:
+    """
+    A prompt file loaded once and split into literal text and placeholders,
+    so rendering is a single join
+    """
+
+    def __init__(self, name, filename, placeholders):
+        self.name = name
+        self.path = os.path.join(PROMPT_DIR, filename)
+        self.placeholders = placeholders
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        mtime = os.path.getmtime(self.path)
+        with open(self.path, "r") as file:
+            text = file.read()
+
+        found = set(PLACEHOLDER.findall(text))
+        if found != self.placeholders:
+            raise ImproperlyConfigured(
+                f"Prompt '{self.name}' ({self.path}) has placeholders "
+                f"{sorted(found)}, expected {sorted(self.placeholders)}"
+            )
+
+        # Even indexes are literal text, odd indexes are placeholder names
+        self._parts = PLACEHOLDER.split(text)
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        self._mtime = mtime
+
+    def reload_if_changed(self):
+        if os.path.getmtime(self.path) != self._mtime:
+            with self._lock:
+                if os.path.getmtime(self.path) != self._mtime:
+                    self.load()
+                    print(f"Reloaded prompt template '{self.name}'")
+
+    def render(self, **values):
+        if settings.DEBUG:
+            self.reload_if_changed()
+
+        missing = self.placeholders - values.keys()
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' is missing values for {sorted(missing)}")
+
+        parts = self._parts
+        return "".join(
+            part if i % 2 == 0 else str(values[part]) for i, part in enumerate(parts)
+        )
+
+
+def load_prompts():
+    """
+    Load and validate every template; called from AiConfig.ready()
+    """
+    with _registry_lock:
+        for name, (filename, placeholders) in TEMPLATES.items():
+            _registry[name] = PromptTemplate(name, filename, placeholders)
+
+
+def get_prompt(name):
+    if name not in _registry:
+        load_prompts()
+    return _registry[name]
+
+
+def render_prompt(name, **values):
+    return get_prompt(name).render(**values)
+
+
+def prompt_version(name):
+    """
+    Stable hash of the template text, for use in cache keys
+    """
+    prompt = get_prompt(name)
+    if settings.DEBUG:
+        prompt.reload_if_changed()
+    return prompt.version
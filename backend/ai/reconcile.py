@@ -0,0 +1,225 @@
+import hashlib
+import json
+from collections import defaultdict
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.timezone import now
+from .enrichment import resolve_image_query
+from .models import Slide, lock_project, suppress_project_touch, touch_project
+from .ordering import ORDER_FIELDS, POSITION_GAP, write_positions
+from .xml_parser import extract_heading_from_xml
+
+# Regenerating a deck in "reconcile" mode diffs the new slides against the
+# stored ones instead of replacing them all. New slides are paired with
+# existing rows by identical content, then by heading, then by position.
+# Unchanged rows are left alone, paired rows are updated in place (keeping
+# their id), and image lookups are skipped for slides whose image query is
+# the one an existing slide already resolved.
+
+# Columns a regenerated slide writes
+CONTENT_FIELDS = ["content", "xml_content", "layout_type", "section_layout"]
+IMAGE_FIELDS = ["img_url", "dominant_color", "img_query", "img_pending"]
+WRITE_FIELDS = ["position", "slide_number", *CONTENT_FIELDS, *IMAGE_FIELDS, "updated_at"]
+
+
+def slide_fields(slide_data):
+    """
+    Column values for a parsed slide record
+    """
+    # The pull parser records the heading; older records only carry the XML
+    heading = slide_data.get("heading") or extract_heading_from_xml(
+        slide_data["xml_content"]
+    )
+    return {
+        "content": {"heading": heading, **slide_data["content"]},
+        "xml_content": slide_data["xml_content"],
+        "layout_type": slide_data["layout_type"],
+        "section_layout": slide_data["section_layout"],
+    }
+
+
+def content_hash(fields):
+    """
+    Hash of a slide's content columns. Existing rows are hashed from their
+    current values, so slides edited since the last generation count as
+    changed.
+    """
+    payload = json.dumps(
+        [fields[name] for name in CONTENT_FIELDS], sort_keys=True, cls=DjangoJSONEncoder
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def heading_key(fields):
+    return str(fields["content"].get("heading") or "").strip().lower()
+
+
+def pair_slides(existing_fields, new_fields):
+    """
+    Index of the existing slide each new slide replaces, or None
+    """
+    matches = [None] * len(new_fields)
+    used = set()
+
+    def claim(new_keys, old_keys):
+        available = defaultdict(list)
+        for index, value in enumerate(old_keys):
+            if index not in used:
+                available[value].append(index)
+        for index, value in enumerate(new_keys):
+            if matches[index] is None and available.get(value):
+                old_index = available[value].pop(0)
+                matches[index] = old_index
+                used.add(old_index)
+
+    # Identical slides first, wherever they moved, then same heading
+    claim([content_hash(f) for f in new_fields], [content_hash(f) for f in existing_fields])
+    claim([heading_key(f) for f in new_fields], [heading_key(f) for f in existing_fields])
+
+    # Whatever is left pairs up by position
+    for index in range(len(new_fields)):
+        if matches[index] is None and index < len(existing_fields) and index not in used:
+            matches[index] = index
+            used.add(index)
+    return matches
+
+
+def plan_reconcile(project, slides_data):
+    """
+    Pair parsed slides with the project's stored slides.
+
+    Returns a plan dict: the existing rows, the new column values, the
+    matches, the image each slide can reuse, and the indexes of slides that
+    still need an image lookup (enrich those and pass the results to
+    apply_reconcile).
+    """
+    existing = list(Slide.objects.filter(project=project).order_by(*ORDER_FIELDS))
+    existing_fields = [
+        {name: getattr(slide, name) for name in CONTENT_FIELDS} for slide in existing
+    ]
+    new_fields = [slide_fields(slide_data) for slide_data in slides_data]
+    matches = pair_slides(existing_fields, new_fields)
+
+    # Any stored slide's image can be reused for the same query (placeholders
+    # still waiting for their lookup can't)
+    images_by_query = {}
+    for slide in existing:
+        if slide.img_query and slide.img_url and not slide.img_pending:
+            images_by_query.setdefault(
+                slide.img_query,
+                {"img_url": slide.img_url, "dominant_color": slide.dominant_color},
+            )
+
+    reused = {}
+    needs_images = []
+    for index, slide_data in enumerate(slides_data):
+        img_query = resolve_image_query(slide_data, project.title)
+        matched = existing[matches[index]] if matches[index] is not None else None
+        if img_query and matched is not None and matched.img_query == img_query and (
+            matched.img_url and not matched.img_pending
+        ):
+            image = {"img_url": matched.img_url, "dominant_color": matched.dominant_color}
+        else:
+            image = images_by_query.get(img_query) if img_query else None
+        if image is None:
+            needs_images.append(index)
+        else:
+            reused[index] = {**image, "img_query": img_query, "img_pending": False}
+
+    return {
+        "existing": existing,
+        "new_fields": new_fields,
+        "matches": matches,
+        "reused": reused,
+        "needs_images": needs_images,
+        "snapshot": [(slide.id, slide.position) for slide in existing],
+    }
+
+
+def plan_images(plan, enrichments):
+    """
+    Image of every new slide, in order: reused ones from the plan, the rest
+    from enrichments (the lookups for plan["needs_images"], in that order)
+    """
+    images = dict(plan["reused"])
+    images.update(zip(plan["needs_images"], enrichments))
+    return [images[index] for index in range(len(plan["new_fields"]))]
+
+
+def apply_reconcile(project, plan, enrichments):
+    """
+    Write a reconcile plan: delete unmatched rows, bulk update the matched
+    rows that changed (content, image or position) and bulk insert the rest,
+    touching the project once.
+
+    Returns a report of the slide numbers created, updated and unchanged,
+    the number of rows deleted, and the image lookups made and skipped.
+    Returns None without writing anything if the deck's slides changed
+    since planning.
+    """
+    images = plan_images(plan, enrichments)
+
+    existing = plan["existing"]
+    timestamp = now()
+    report = {
+        "mode": "reconcile",
+        "created": [],
+        "updated": [],
+        "unchanged": [],
+        "deleted": 0,
+        "images_fetched": len(plan["needs_images"]),
+        "images_reused": len(plan["reused"]),
+    }
+
+    created, changed = [], []
+    for index, fields in enumerate(plan["new_fields"]):
+        number = index + 1
+        values = {
+            **fields,
+            **images[index],
+            "position": number * POSITION_GAP,
+            "slide_number": number,
+        }
+        if plan["matches"][index] is None:
+            created.append(Slide(project=project, **values))
+            report["created"].append(number)
+            continue
+
+        slide = existing[plan["matches"][index]]
+        content_changed = any(getattr(slide, name) != value for name, value in fields.items())
+        image_changed = any(getattr(slide, name) != images[index][name] for name in IMAGE_FIELDS)
+        moved = slide.position != values["position"] or slide.slide_number != number
+        if content_changed or image_changed:
+            report["updated"].append(number)
+            values["updated_at"] = timestamp
+        else:
+            report["unchanged"].append(number)
+        if content_changed or image_changed or moved:
+            for name, value in values.items():
+                setattr(slide, name, value)
+            changed.append(slide)
+
+    matched = {index for index in plan["matches"] if index is not None}
+    deleted_ids = [slide.id for i, slide in enumerate(existing) if i not in matched]
+    report["deleted"] = len(deleted_ids)
+
+    with transaction.atomic():
+        lock_project(project.id)
+        current = list(
+            Slide.objects.filter(project=project)
+            .order_by(*ORDER_FIELDS)
+            .values_list("id", "position")
+        )
+        if current != plan["snapshot"]:
+            # Another writer got in between; don't merge into its deck
+            return None
+
+        with suppress_project_touch():
+            if deleted_ids:
+                Slide.objects.filter(id__in=deleted_ids).delete()
+            if changed:
+                write_positions(changed, WRITE_FIELDS)
+            if created:
+                Slide.objects.bulk_create(created)
+        touch_project(project.id)
+    return report
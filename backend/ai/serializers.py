@@ -1,9 +1,60 @@
 from rest_framework import serializers
-from .models import Slide, Project, UserProfile
+from .models import Slide, Project, UserProfile, GenerationJob
 from django.contrib.auth.models import User
 
 
-class SlideSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """
+    Field names from a ?fields=a,b query parameter, or None
+    """
+    if request is None:
+        return None
+    param = request.query_params.get("fields")
+    if not param:
+        return None
+    return {name.strip() for name in param.split(",") if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for read serializers: pass fields=[...] or put the
+    request (with ?fields=a,b) in the context. Unknown names are ignored,
+    "id" is always kept, and serializers given data= keep every field.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+
+        if "data" in kwargs:
+            return
+        if fields is None:
+            fields = requested_fields(self.context.get("request"))
+        if fields:
+            keep = set(fields) | {"id"}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+
+class SlideSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # Derived from the ordering key; querysets from ordered_slides() carry it,
+    # single slides get display_number set by the caller, and delta responses
+    # pass {slide id: number} as context["slide_numbers"]. There is no
+    # per-slide fallback query, so a missing number fails loudly instead of
+    # turning many=True into N+1.
+    slide_number = serializers.SerializerMethodField()
+
+    def get_slide_number(self, slide):
+        number = getattr(slide, "display_number", None)
+        if number is None:
+            number = self.context.get("slide_numbers", {}).get(slide.id)
+        if number is None:
+            raise ValueError(
+                f"No display number for slide {slide.id}: serialize ordered_slides(), "
+                "set display_number or pass context['slide_numbers']"
+            )
+        return number
+
     class Meta:
         model = Slide
         fields = [
@@ -14,11 +65,13 @@ class SlideSerializer(serializers.ModelSerializer):
             "dominant_color",
             "xml_content",
             "layout_type",
-            "section_layout"
+            "section_layout",
+            "img_pending",
         ]  # Include only necessary fields
+        read_only_fields = ["img_pending"]
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Project
@@ -33,6 +86,46 @@ class ProjectSerializer(serializers.ModelSerializer):
         ]  # Include only necessary fields
 
 
+class ProjectSummarySerializer(serializers.ModelSerializer):
+    """
+    Dashboard card for a project: no XML, optional slide count and thumbnail
+    (present when the queryset was annotated with them)
+    """
+    slide_count = serializers.IntegerField(read_only=True, required=False)
+    thumbnail = serializers.SerializerMethodField()
+
+    def get_thumbnail(self, project):
+        if not hasattr(project, "thumbnail_img_url"):
+            return None
+        return {
+            "heading": project.thumbnail_heading,
+            "img_url": project.thumbnail_img_url,
+            "dominant_color": project.thumbnail_dominant_color,
+            "layout_type": project.thumbnail_layout_type,
+        }
+
+    def to_representation(self, project):
+        data = super().to_representation(project)
+        if not hasattr(project, "slide_count"):
+            data.pop("slide_count", None)
+        if not hasattr(project, "thumbnail_img_url"):
+            data.pop("thumbnail")
+        return data
+
+    class Meta:
+        model = Project
+        fields = [
+            "id",
+            "title",
+            "description",
+            "updated_at",
+            "is_public",
+            "is_favorite",
+            "slide_count",
+            "thumbnail",
+        ]
+
+
 class UserProfileModelSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
@@ -54,3 +147,22 @@ class UserProfileSerializer(serializers.ModelSerializer):
             "last_name",
             "profile",  # Nested profile field
         ]
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GenerationJob
+        fields = [
+            "id",
+            "project",
+            "engine",
+            "mode",
+            "status",
+            "stage",
+            "progress",
+            "result",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
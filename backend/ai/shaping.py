@@ -0,0 +1,64 @@
+from datetime import timezone as dt_timezone
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from .models import Slide
+from .ordering import current_order
+from .serializers import SlideSerializer, requested_fields
+
+# Response shaping for deck endpoints:
+#   ?fields=a,b   only these slide fields (and "id"); the deck-level
+#                 xml_content is only sent when "xml_content" is listed
+#   ?since=<ts>   delta mode: only slides changed after the timestamp,
+#                 plus the full slide order so clients can drop deleted
+#                 slides and renumber the rest
+
+
+def parse_since(request):
+    """
+    The ?since= timestamp as an aware datetime, or None
+    """
+    value = request.query_params.get("since")
+    if not value:
+        return None
+    since = parse_datetime(value.replace(" ", "+"))
+    if since is None:
+        raise ValidationError({"since": "Expected an ISO 8601 timestamp."})
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, dt_timezone.utc)
+    return since
+
+
+def deck_delta(project, since, request):
+    """
+    Slides of a project changed after `since` and the current slide order
+    """
+    order = [slide_id for slide_id, _ in current_order(project)]
+    changed = Slide.objects.filter(project=project, updated_at__gt=since)
+    serializer = SlideSerializer(
+        changed,
+        many=True,
+        context={
+            "request": request,
+            "slide_numbers": {slide_id: number for number, slide_id in enumerate(order, 1)},
+        },
+    )
+    return {"slides": serializer.data, "slide_order": order, "since": since}
+
+
+def shape_deck_payload(payload, request):
+    """
+    Apply ?fields= to an already serialized deck payload
+    """
+    fields = requested_fields(request)
+    if not fields:
+        return payload
+    keep = fields | {"id"}
+    shaped = {key: value for key, value in payload.items() if key != "xml_content"}
+    if "xml_content" in fields:
+        shaped["xml_content"] = payload.get("xml_content")
+    shaped["slides"] = [
+        {key: value for key, value in slide.items() if key in keep}
+        for slide in payload["slides"]
+    ]
+    return shaped
@@ -0,0 +1,26 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from ai.admission import DjangoCacheStore
+
+
+class DjangoCacheStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.store = DjangoCacheStore()
+        self.addCleanup(self.store.cache.clear)
+
+    def acquire_at(self, current):
+        with mock.patch("time.time", return_value=current):
+            return self.store.acquire("in-flight:1", 2, 60)
+
+    def test_leaked_slot_expires_while_others_come_and_go(self):
+        # A slot that is never released
+        self.assertTrue(self.acquire_at(1000))
+        # Later generations use the other slot and give it back
+        for current in (1030, 1050):
+            self.assertTrue(self.acquire_at(current))
+            with mock.patch("time.time", return_value=current):
+                self.store.release("in-flight:1")
+        # Both slots are free once the leaked one is 60 seconds old
+        self.assertTrue(self.acquire_at(1061))
+        self.assertTrue(self.acquire_at(1061))
+        self.assertFalse(self.acquire_at(1061))
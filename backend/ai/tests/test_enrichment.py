@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from ai import generation, llm
+from ai.enrichment import DEFAULT_IMG_URL
+from ai.models import Project, Slide
+
+ADDED_SLIDE = (
+    '<PRESENTATION><SECTION layout="left"><H2>Added</H2><BULLETS>'
+    '<DIV><H3>Point</H3><P>Detail</P></DIV></BULLETS><IMG query="city skyline" /></SECTION>'
+    "</PRESENTATION>"
+)
+
+
+def no_lookups(*args, **kwargs):
+    raise AssertionError("image looked up inline in deferred mode")
+
+
+@override_settings(IMAGE_ENRICHMENT_MODE="deferred")
+@mock.patch("ai.views.get_img_link", no_lookups)
+@mock.patch("ai.async_views.get_img_link_async", no_lookups)
+@mock.patch.object(generation, "enrich_slides", no_lookups)
+@mock.patch.object(llm, "configure", lambda: None)
+class DeferredEnrichmentTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="deferred")
+        self.project = Project.objects.create(user=self.user, title="Deck")
+
+    def assertPlaceholder(self, slide):
+        self.assertEqual(slide.img_url, DEFAULT_IMG_URL)
+        self.assertEqual(slide.img_query, "city skyline")
+        self.assertTrue(slide.img_pending)
+
+    @mock.patch.object(llm, "generate_content", return_value=SimpleNamespace(text=ADDED_SLIDE))
+    @mock.patch("ai.views.schedule_pending_enrichment")
+    def test_add_slide(self, schedule, generate_content):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(f"/api/add-slide/{self.project.id}/", {"title": "Added"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertPlaceholder(Slide.objects.get(project=self.project))
+        schedule.assert_called_once_with(self.project.id)
+
+    @mock.patch.object(llm, "generate_content_async")
+    @mock.patch("ai.views.schedule_pending_enrichment")
+    async def test_add_slide_async(self, schedule, generate_content_async):
+        generate_content_async.return_value = SimpleNamespace(text=ADDED_SLIDE)
+        token = RefreshToken.for_user(self.user).access_token
+        response = await self.async_client.post(
+            f"/api/async/add-slide/{self.project.id}/",
+            {"title": "Added"},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertPlaceholder(await Slide.objects.aget(project=self.project))
+        schedule.assert_called_once_with(self.project.id)
+
+    @mock.patch.object(generation, "schedule_pending_enrichment")
+    def test_stream(self, schedule):
+        def chunks(*args):
+            yield ADDED_SLIDE
+
+        with mock.patch.object(generation, "stream_xml_presentation", chunks):
+            events = list(generation.stream_deck(self.project, ["Added"]))
+
+        self.assertEqual([event for event, _ in events], ["start", "slide", "done"])
+        self.assertTrue(events[1][1]["img_pending"])
+        self.assertPlaceholder(Slide.objects.get(project=self.project))
+        schedule.assert_called_once_with(self.project.id)
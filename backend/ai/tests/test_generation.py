@@ -0,0 +1,167 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from ai import llm
+from ai.generation import assemble_parallel
+from ai.models import Project
+from ai.xml_parser import parse_xml_presentation
+
+# A response in the shape the single-slide prompt asks for
+SINGLE_SLIDE_RESPONSE = """<PRESENTATION>
+<SECTION layout="vertical">
+<BULLETS>
+<DIV><H3>Point Title 1</H3><P>Description without quotes or special chars</P></DIV>
+<DIV><H3>Point Title 2</H3><P>Description without quotes or special chars</P></DIV>
+</BULLETS>
+<IMG query="simple image description" />
+</SECTION>
+</PRESENTATION>"""
+
+
+class AssembleParallelTests(SimpleTestCase):
+    def test_slides_are_headed_with_their_outline_titles(self):
+        results = [
+            (parse_xml_presentation(SINGLE_SLIDE_RESPONSE, "Deck")[0], 1, False),
+            (parse_xml_presentation(SINGLE_SLIDE_RESPONSE, "Deck")[0], 2, True),
+        ]
+        self.assertEqual(results[0][0]["heading"], "Point Title 1")
+
+        xml_content, slides_data, report = assemble_parallel(["Why now", "Roadmap"], results)
+
+        self.assertEqual([slide["heading"] for slide in slides_data], ["Why now", "Roadmap"])
+        self.assertEqual([slide["slide_number"] for slide in slides_data], [1, 2])
+        self.assertEqual(report, {"requests": 3, "failed_slides": [2]})
+        self.assertEqual(xml_content.count("<SECTION"), 2)
+
+
+@override_settings(LLM_BUSY_RETRY_AFTER=7)
+@mock.patch.object(llm, "configure", lambda: None)
+@mock.patch.object(llm, "generate_content", side_effect=llm.LLMBusyError("Too many LLM requests in flight."))
+class LLMBusyTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="busy")
+        self.project = Project.objects.create(user=user, title="Deck")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def generate(self, engine):
+        return self.client.post(
+            f"/api/generate-xml-presentation/{self.project.id}/",
+            {"slide_titles": ["One", "Two"], "engine": engine},
+            format="json",
+        )
+
+    def test_single_engine_answers_429(self, generate_content):
+        response = self.generate("single")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "7")
+
+    def test_parallel_engine_does_not_retry_or_fall_back(self, generate_content):
+        response = self.generate("parallel")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "7")
+        self.assertLessEqual(generate_content.call_count, 2)
+
+    def test_add_slide_answers_429_without_saving(self, generate_content):
+        response = self.client.post(
+            f"/api/add-slide/{self.project.id}/", {"title": "Costs"}, format="json"
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "7")
+        self.assertFalse(self.project.slides.exists())
+
+    def test_slide_titles_answer_429(self, generate_content):
+        response = self.client.post(f"/api/suggest-slide-title/{self.project.id}/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "7")
+
+    def test_outline_answers_429(self, generate_content):
+        response = self.client.post(
+            "/api/generate-outline/", {"prompt": "Solar power", "num_pages": 3}, format="json"
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "7")
+
+    async def test_async_endpoints_answer_429(self, generate_content):
+        token = RefreshToken.for_user(self.project.user).access_token
+        busy = llm.LLMBusyError("Too many LLM requests in flight.")
+        with mock.patch.object(llm, "generate_content_async", side_effect=busy):
+            for url, data in (
+                (f"/api/async/add-slide/{self.project.id}/", {"title": "Costs"}),
+                (f"/api/async/suggest-slide-title/{self.project.id}/", {}),
+                ("/api/async/generate-outline/", {"prompt": "Solar power", "num_pages": 3}),
+            ):
+                with self.subTest(url=url):
+                    response = await self.async_client.post(
+                        url,
+                        data,
+                        content_type="application/json",
+                        headers={"Authorization": f"Bearer {token}"},
+                    )
+                    self.assertEqual(response.status_code, 429)
+                    self.assertEqual(response["Retry-After"], "7")
+        self.assertFalse(await self.project.slides.aexists())
+
+
+@mock.patch.object(llm, "configure", side_effect=ValueError("GEMINI_API environment variable is not set."))
+class MissingApiKeyTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="nokey")
+        self.project = Project.objects.create(user=user, title="Deck")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_outline_answers_the_handled_error(self, configure):
+        response = self.client.post(
+            "/api/generate-outline/", {"prompt": "Solar power", "num_pages": 3}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch("ai.views.get_img_link", return_value=None)
+    def test_add_slide_falls_back(self, get_img_link, configure):
+        response = self.client.post(
+            f"/api/add-slide/{self.project.id}/", {"title": "Costs"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+@mock.patch.object(llm, "configure", lambda: None)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="cache")
+        self.project = Project.objects.create(user=user, title="Deck")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def outline(self):
+        return self.client.post(
+            "/api/generate-outline/", {"prompt": "Solar power", "num_pages": 3}, format="json"
+        )
+
+    def generate(self):
+        return self.client.post(
+            f"/api/generate-xml-presentation/{self.project.id}/",
+            {"slide_titles": ["One"], "engine": "single"},
+            format="json",
+        )
+
+    @mock.patch.object(llm, "generate_content", return_value=mock.Mock(text="Sorry, I can't help"))
+    def test_invalid_outline_is_not_replayed(self, generate_content):
+        self.assertEqual(self.outline().status_code, 400)
+        self.assertEqual(self.outline().status_code, 400)
+        self.assertEqual(generate_content.call_count, 2)
+
+    @mock.patch.object(llm, "generate_content")
+    def test_valid_outline_is_cached(self, generate_content):
+        generate_content.return_value = mock.Mock(text='{"title": "Solar", "slide_titles": ["A"]}')
+        self.assertEqual(self.outline().status_code, 200)
+        self.assertEqual(self.outline().status_code, 200)
+        self.assertEqual(generate_content.call_count, 1)
+
+    @mock.patch.object(llm, "generate_content", return_value=mock.Mock(text="<PRESENTATION></PRESENTATION>"))
+    def test_unparseable_deck_is_not_replayed(self, generate_content):
+        self.assertEqual(self.generate().status_code, 400)
+        self.assertEqual(self.generate().status_code, 400)
+        self.assertEqual(generate_content.call_count, 2)
@@ -0,0 +1,34 @@
+from django.test import SimpleTestCase, override_settings
+from urllib3.exceptions import MaxRetryError
+from urllib3.response import HTTPResponse
+from ai import http_client
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+@override_settings(HTTP_MAX_RETRY_WAIT=5, HTTP_BACKOFF_FACTOR=0.5, HTTP_BACKOFF_JITTER=0)
+class RetryWaitTests(SimpleTestCase):
+    def retry(self):
+        return http_client.CappedRetry(
+            total=3, status_forcelist=[429], respect_retry_after_header=True
+        )
+
+    def test_short_retry_after_is_retried(self):
+        response = HTTPResponse(status=429, headers={"Retry-After": "2"})
+        retry = self.retry().increment("GET", "/search", response=response)
+        self.assertIsInstance(retry, http_client.CappedRetry)
+        self.assertEqual(retry.total, 2)
+
+    def test_long_retry_after_gives_up(self):
+        response = HTTPResponse(status=429, headers={"Retry-After": "3600"})
+        with self.assertRaises(MaxRetryError):
+            self.retry().increment("GET", "/search", response=response)
+
+    def test_async_retry_delay(self):
+        self.assertEqual(http_client.retry_delay(FakeResponse({"Retry-After": "2"}), 0), 2)
+        self.assertIsNone(http_client.retry_delay(FakeResponse({"Retry-After": "3600"}), 0))
+        # Backoff without Retry-After is capped too
+        self.assertEqual(http_client.retry_delay(FakeResponse({}), 10), 5)
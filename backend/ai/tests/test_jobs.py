@@ -0,0 +1,57 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework.exceptions import Throttled
+from ai.jobs import enqueue_generation
+from ai.models import GenerationJob, Project
+
+
+@override_settings(
+    GENERATION_JOB_RUNNER="db",
+    GENERATION_JOB_QUEUE_TIMEOUT=60,
+    GENERATION_JOB_STALE_AFTER=60,
+)
+class StaleJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="jobs")
+        self.project = Project.objects.create(user=self.user, title="Deck")
+
+    def dead_job(self, slide_titles, **fields):
+        return GenerationJob.objects.create(
+            project=self.project,
+            user=self.user,
+            slide_titles=slide_titles,
+            status=GenerationJob.STATUS_RUNNING,
+            heartbeat_at=now() - timedelta(minutes=5),
+            **fields,
+        )
+
+    def test_identical_request_does_not_join_a_dead_job(self):
+        dead = self.dead_job(["Intro"])
+        job = enqueue_generation(self.project, self.user, ["Intro"])
+        self.assertNotEqual(job.id, dead.id)
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, GenerationJob.STATUS_FAILED)
+
+    def test_dead_jobs_do_not_count_against_the_cap(self):
+        self.dead_job(["A"])
+        self.dead_job(["B"])
+        GenerationJob.objects.filter(slide_titles=["B"]).update(
+            status=GenerationJob.STATUS_QUEUED,
+            created_at=now() - timedelta(minutes=5),
+        )
+        job = enqueue_generation(self.project, self.user, ["C"])
+        self.assertEqual(job.status, GenerationJob.STATUS_QUEUED)
+
+    def test_live_jobs_still_count(self):
+        enqueue_generation(self.project, self.user, ["A"])
+        GenerationJob.objects.create(
+            project=self.project,
+            user=self.user,
+            slide_titles=["B"],
+            status=GenerationJob.STATUS_RUNNING,
+            heartbeat_at=now(),
+        )
+        with self.assertRaises(Throttled):
+            enqueue_generation(self.project, self.user, ["C"])
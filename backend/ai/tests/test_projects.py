@@ -0,0 +1,20 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ai.models import Project
+
+
+class ProjectsListTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="owner")
+        Project.objects.create(user=user, title="Old", xml_content="<SECTION/>" * 100)
+        Project.objects.create(user=user, title="New", xml_content="<SECTION/>" * 100)
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def test_list_has_no_xml(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/projects/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([project["title"] for project in response.data], ["New", "Old"])
+        self.assertNotIn("xml_content", response.data[0])
@@ -0,0 +1,224 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ai.models import GenerationJob, Project, Slide
+from ai.ordering import POSITION_GAP
+
+# Every endpoint runs against decks of these sizes with the same number of
+# queries; a count that grows with the deck is an N+1
+DECK_SIZES = (5, 20, 50)
+
+
+def fake_response(text):
+    return SimpleNamespace(text=text, candidates=[])
+
+
+def section_xml(title):
+    return (
+        '<SECTION layout="left"><H2>' + title + "</H2><BULLETS>"
+        "<DIV><H3>Point</H3><P>Detail</P></DIV></BULLETS>"
+        '<IMG query="' + title.lower() + '" /></SECTION>'
+    )
+
+
+def deck_xml(slide_titles):
+    return "<PRESENTATION>" + "".join(section_xml(title) for title in slide_titles) + "</PRESENTATION>"
+
+
+class QueryBudgetTestCase(TestCase):
+    def make_deck(self, num_slides):
+        user = User.objects.create(username=f"budget-{num_slides}")
+        project = Project.objects.create(user=user, title="Budget", is_public=True)
+        Slide.objects.bulk_create(
+            Slide(
+                project=project,
+                slide_number=number,
+                position=number * POSITION_GAP,
+                content={"heading": f"Slide {number}"},
+                xml_content=section_xml(f"Slide {number}"),
+                img_query=f"slide {number}",
+            )
+            for number in range(1, num_slides + 1)
+        )
+        client = APIClient(SERVER_NAME="localhost")
+        client.force_authenticate(user)
+        return project, client
+
+    def each_deck(self, check):
+        """
+        Run check(num_slides, project, client) on a fresh deck of each size
+        """
+        for num_slides in DECK_SIZES:
+            with self.subTest(slides=num_slides):
+                check(num_slides, *self.make_deck(num_slides))
+
+    def slide_ids(self, project):
+        return list(
+            Slide.objects.filter(project=project)
+            .order_by("position")
+            .values_list("id", flat=True)
+        )
+
+    def assertBudget(self, budget, send, status_code=200):
+        with self.assertNumQueries(budget):
+            response = send()
+        self.assertEqual(response.status_code, status_code)
+        return response
+
+
+class ReadQueryBudgetTests(QueryBudgetTestCase):
+    def test_deck(self):
+        anonymous = APIClient(SERVER_NAME="localhost")
+
+        def check(_, project, client):
+            url = f"/api/project/{project.id}/"
+            self.assertBudget(3, lambda: client.get(url))
+            # The owner's view above fills the payload cache
+            cached = self.assertBudget(1, lambda: anonymous.get(url))
+            self.assertBudget(
+                1, lambda: anonymous.get(url, HTTP_IF_NONE_MATCH=cached["ETag"]), 304
+            )
+
+        self.each_deck(check)
+
+    def test_deck_changes(self):
+        def check(_, project, client):
+            self.assertBudget(4, lambda: client.get(
+                f"/api/project/{project.id}/changes/?since=2000-01-01T00:00:00Z"
+            ))
+
+        self.each_deck(check)
+
+    def test_project_lists(self):
+        def check(_, project, client):
+            self.assertBudget(1, lambda: client.get("/api/projects/"))
+            self.assertBudget(2, lambda: client.get(
+                "/api/projects/summary/?include=slide_count,thumbnail"
+            ))
+
+        self.each_deck(check)
+
+    def test_generation_job(self):
+        def check(_, project, client):
+            job = GenerationJob.objects.create(project=project, user=project.user)
+            self.assertBudget(2, lambda: client.get(f"/api/generation-jobs/{job.id}/"))
+
+        self.each_deck(check)
+
+
+class WriteQueryBudgetTests(QueryBudgetTestCase):
+    def test_slide_edit(self):
+        def check(_, project, client):
+            slide_ids = self.slide_ids(project)
+            url = f"/api/slide-edit/{slide_ids[0]}/"
+            self.assertBudget(6, lambda: client.patch(
+                url, {"content": {"heading": "Edited"}}, format="json"
+            ))
+            self.assertBudget(13, lambda: client.patch(url, {"slide_number": 2}, format="json"))
+            self.assertBudget(3, lambda: client.delete(f"/api/slide-edit/{slide_ids[1]}/"), 204)
+
+        self.each_deck(check)
+
+    def test_reorder(self):
+        def check(_, project, client):
+            slide_ids = self.slide_ids(project)
+            url = f"/api/project/{project.id}/reorder-slides/"
+            self.assertBudget(7, lambda: client.post(
+                url, {"move": {"slide_id": slide_ids[-1], "to": 1}}, format="json"
+            ))
+            self.assertBudget(7, lambda: client.post(
+                url, {"new_order": slide_ids[::-1]}, format="json"
+            ))
+
+        self.each_deck(check)
+
+    def test_project_update(self):
+        def check(_, project, client):
+            self.assertBudget(3, lambda: client.patch(
+                f"/api/projects/{project.id}/", {"title": "Renamed"}, format="json"
+            ))
+
+        self.each_deck(check)
+
+
+class LLMQueryBudgetTests(QueryBudgetTestCase):
+    """
+    The LLM endpoints with Gemini, Pexels and the image download mocked out
+    """
+
+    def setUp(self):
+        self.generate_content = self.mock("ai.llm.generate_content")
+        self.mock("ai.llm.configure")
+        for target in ("ai.enrichment.get_img_link", "ai.views.get_img_link"):
+            self.mock(target, return_value="https://images.example/photo.jpg")
+        for target in ("ai.enrichment.get_dominant_color", "ai.views.get_dominant_color"):
+            self.mock(target, return_value="#123456")
+
+    def mock(self, target, **kwargs):
+        patcher = patch(target, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def generate(self, client, project, slide_titles, mode):
+        self.generate_content.return_value = fake_response(deck_xml(slide_titles))
+        return client.post(
+            f"/api/generate-xml-presentation/{project.id}/",
+            {"slide_titles": slide_titles, "mode": mode},
+            format="json",
+        )
+
+    def test_generate(self):
+        def check(num_slides, project, client):
+            slide_titles = [f"Topic {number}" for number in range(1, num_slides + 1)]
+            self.assertBudget(17, lambda: self.generate(client, project, slide_titles, "replace"))
+
+        self.each_deck(check)
+
+    def test_regenerate_reconcile(self):
+        def check(num_slides, project, client):
+            slide_titles = [f"Slide {number}" for number in range(1, num_slides + 1)]
+            slide_titles[0] = "A new opening"
+            response = self.assertBudget(
+                18, lambda: self.generate(client, project, slide_titles, "reconcile")
+            )
+            self.assertIn("changes", response.data)
+
+        self.each_deck(check)
+
+    def test_add_slide(self):
+        def check(_, project, client):
+            self.generate_content.return_value = fake_response(
+                "<PRESENTATION>" + section_xml("Added") + "</PRESENTATION>"
+            )
+            self.assertBudget(9, lambda: client.post(
+                f"/api/add-slide/{project.id}/", {"title": "Added", "position": 2}, format="json"
+            ), 201)
+
+        self.each_deck(check)
+
+    def test_outline(self):
+        self.generate_content.return_value = fake_response(
+            json.dumps({"title": "Outline", "slide_titles": ["One", "Two", "Three"]})
+        )
+
+        def check(_, project, client):
+            self.assertBudget(9, lambda: client.post(
+                "/api/generate-outline/",
+                {"prompt": f"About {project.id}", "num_pages": 3, "project_id": str(project.id)},
+                format="json",
+            ))
+
+        self.each_deck(check)
+
+    def test_slide_title_suggestions(self):
+        self.generate_content.return_value = fake_response(json.dumps(["One", "Two", "Three"]))
+        def check(_, project, client):
+            response = self.assertBudget(
+                2, lambda: client.post(f"/api/suggest-slide-title/{project.id}/")
+            )
+            self.assertEqual(response.data["slide_titles"], ["One", "Two", "Three"])
+
+        self.each_deck(check)
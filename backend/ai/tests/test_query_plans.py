@@ -0,0 +1,82 @@
+from datetime import timedelta
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils.timezone import now
+from ai.models import Project, Slide
+from ai.ordering import ORDER_FIELDS, POSITION_GAP
+
+
+def uses_index(plan):
+    if connection.vendor == "postgresql":
+        return "Seq Scan" not in plan and "Index" in plan
+    if connection.vendor == "sqlite":
+        return "USING INDEX" in plan or "USING COVERING INDEX" in plan or (
+            "USING INTEGER PRIMARY KEY" in plan
+        )
+    return "index" in plan.lower()
+
+
+class QueryPlanChecks:
+    """
+    EXPLAIN the query shapes behind the dashboard, deck loads and edits,
+    over enough rows that a missing index would show up as a scan
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(User(username=f"plans-{n}") for n in range(5))
+        Project.objects.bulk_create(
+            Project(user=user, title=f"Deck {n}") for user in users for n in range(40)
+        )
+        cls.user = users[0]
+        cls.project = Project.objects.filter(user=cls.user).first()
+        Slide.objects.bulk_create(
+            Slide(project=project, slide_number=n, position=n * POSITION_GAP, content={})
+            for project in Project.objects.filter(title__in=["Deck 0", "Deck 1"])
+            for n in range(1, 101)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index=None):
+        plan = queryset.explain()
+        self.assertTrue(uses_index(plan), plan)
+        if index:
+            self.assertIn(index, plan)
+
+    def test_dashboard(self):
+        self.assertUsesIndex(
+            Project.objects.filter(user=self.user).order_by("-updated_at"),
+            "project_user_updated_idx",
+        )
+
+    def test_deck_lookups(self):
+        self.assertUsesIndex(Project.objects.filter(id=self.project.id, user=self.user))
+        self.assertUsesIndex(Project.objects.filter(id=self.project.id, is_public=True))
+
+    def test_slides_in_order(self):
+        self.assertUsesIndex(
+            Slide.objects.filter(project=self.project).order_by(*ORDER_FIELDS),
+            "slide_project_order_idx",
+        )
+
+    def test_slides_since(self):
+        # A client polling for changes asks about the last few seconds
+        since = now() - timedelta(seconds=5)
+        # SQLite without range statistics may pick either project index
+        self.assertUsesIndex(Slide.objects.filter(project=self.project, updated_at__gt=since))
+
+
+@skipUnless(connection.vendor == "sqlite", "needs the SQLite database")
+class SQLiteQueryPlanTests(QueryPlanChecks, TestCase):
+    pass
+
+
+@skipUnless(connection.vendor == "postgresql", "needs the PostgreSQL database")
+class PostgresQueryPlanTests(QueryPlanChecks, TestCase):
+    def setUp(self):
+        # Judge the available plans, not the planner's choice for small tables
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
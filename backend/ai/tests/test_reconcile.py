@@ -0,0 +1,123 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from ai.models import Project, Slide
+from ai.ordering import current_order, move_slide
+from ai.reconcile import apply_reconcile, pair_slides, plan_reconcile
+from ai.xml_parser import parse_xml_presentation
+
+
+def deck(titles):
+    """
+    Parsed slides for a deck with one left-image section per title
+    """
+    sections = "".join(
+        f'<SECTION layout="left"><H2>{title}</H2><BULLETS><DIV><H3>Point</H3>'
+        f'<P>About {title}</P></DIV></BULLETS><IMG query="{title.lower()}" /></SECTION>'
+        for title in titles
+    )
+    return parse_xml_presentation(f"<PRESENTATION>{sections}</PRESENTATION>", "Deck")
+
+
+def fetch_images(plan, slides_data):
+    """
+    Stand-in for enrich_slides over the slides the plan says need an image
+    """
+    return [
+        {
+            "img_url": f"https://images.example/{slides_data[index]['img_queries'][0]}.jpg",
+            "dominant_color": "#123456",
+            "img_query": slides_data[index]["img_queries"][0],
+            "img_pending": False,
+        }
+        for index in plan["needs_images"]
+    ]
+
+
+def fields(heading, text="Body"):
+    return {
+        "content": {"heading": heading, "text": text},
+        "xml_content": f"<SECTION><H2>{heading}</H2><P>{text}</P></SECTION>",
+        "layout_type": "bullets",
+        "section_layout": "left",
+    }
+
+
+class PairSlidesTests(SimpleTestCase):
+    def test_identical_slides_pair_wherever_they_moved(self):
+        existing = [fields("A"), fields("B"), fields("C")]
+        self.assertEqual(pair_slides(existing, [fields("C"), fields("A"), fields("B")]), [2, 0, 1])
+
+    def test_edited_slide_pairs_by_heading_then_position(self):
+        existing = [fields("A"), fields("B"), fields("C")]
+        new = [fields("A"), fields("B", "Rewritten"), fields("Brand new")]
+        self.assertEqual(pair_slides(existing, new), [0, 1, 2])
+
+    def test_extra_slides_are_unmatched(self):
+        self.assertEqual(pair_slides([fields("A")], [fields("A"), fields("B")]), [0, None])
+
+
+class ApplyReconcileTests(TestCase):
+    titles = ["Why now", "Market", "Roadmap", "Team"]
+
+    def setUp(self):
+        user = User.objects.create(username="reconcile")
+        self.project = Project.objects.create(user=user, title="Deck")
+        self.regenerate(self.titles)
+        self.ids = [slide_id for slide_id, _ in current_order(self.project)]
+
+    def regenerate(self, titles):
+        slides_data = deck(titles)
+        plan = plan_reconcile(self.project, slides_data)
+        return apply_reconcile(self.project, plan, fetch_images(plan, slides_data))
+
+    def headings(self):
+        return [
+            slide.content["heading"]
+            for slide in Slide.objects.filter(project=self.project).order_by("position")
+        ]
+
+    def test_unchanged_deck_writes_nothing_new(self):
+        report = self.regenerate(self.titles)
+        self.assertEqual(report["unchanged"], [1, 2, 3, 4])
+        self.assertEqual(report["created"] + report["updated"], [])
+        self.assertEqual(report["deleted"], 0)
+        self.assertEqual(report["images_fetched"], 0)
+        self.assertEqual([slide_id for slide_id, _ in current_order(self.project)], self.ids)
+
+    def test_one_edited_title_fetches_one_image(self):
+        report = self.regenerate(["Why now", "Market size", "Roadmap", "Team"])
+        self.assertEqual(report["images_fetched"], 1)
+        self.assertEqual(report["images_reused"], 3)
+        self.assertEqual(report["updated"], [2])
+        self.assertEqual(report["unchanged"], [1, 3, 4])
+        self.assertEqual([slide_id for slide_id, _ in current_order(self.project)], self.ids)
+        edited = Slide.objects.get(id=self.ids[1])
+        self.assertEqual(edited.content["heading"], "Market size")
+        self.assertEqual(edited.img_query, "market size")
+
+    def test_reordered_slides_keep_their_rows(self):
+        report = self.regenerate(self.titles[::-1])
+        self.assertEqual(report["images_fetched"], 0)
+        self.assertEqual(report["created"] + report["updated"], [])
+        self.assertEqual([slide_id for slide_id, _ in current_order(self.project)], self.ids[::-1])
+        self.assertEqual(self.headings(), self.titles[::-1])
+
+    def test_deleted_slide(self):
+        report = self.regenerate(["Why now", "Roadmap", "Team"])
+        self.assertEqual(report["deleted"], 1)
+        self.assertEqual(report["images_fetched"], 0)
+        self.assertEqual(report["unchanged"], [1, 2, 3])
+        self.assertFalse(Slide.objects.filter(id=self.ids[1]).exists())
+        self.assertEqual(self.headings(), ["Why now", "Roadmap", "Team"])
+
+    def test_concurrent_writer_aborts_the_plan(self):
+        slides_data = deck(["Why now", "Market size", "Roadmap", "Team"])
+        plan = plan_reconcile(self.project, slides_data)
+
+        # Someone moves a slide between planning and writing
+        move_slide(self.project, self.ids[3], 1)
+        moved = [slide_id for slide_id, _ in current_order(self.project)]
+
+        self.assertIsNone(apply_reconcile(self.project, plan, fetch_images(plan, slides_data)))
+        self.assertEqual([slide_id for slide_id, _ in current_order(self.project)], moved)
+        self.assertEqual(self.headings(), ["Team", "Why now", "Market", "Roadmap"])
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+from ai import llm
+from ai.models import Project, Slide
+from ai.ordering import POSITION_GAP, current_order, ordered_slides
+from ai.serializers import SlideSerializer
+
+
+class SlideEditTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="editor")
+        self.project = Project.objects.create(user=user, title="Deck")
+        Slide.objects.bulk_create(
+            Slide(project=self.project, slide_number=n, position=n * POSITION_GAP, content={"heading": f"Slide {n}"})
+            for n in (1, 2, 3)
+        )
+        self.ids = [slide_id for slide_id, _ in current_order(self.project)]
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def patch(self, slide_id, data):
+        return self.client.patch(f"/api/slide-edit/{slide_id}/", data, format="json")
+
+    def test_invalid_patch_does_not_move_the_slide(self):
+        response = self.patch(self.ids[2], {"slide_number": 1, "section_layout": "x" * 50})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([slide_id for slide_id, _ in current_order(self.project)], self.ids)
+
+    def test_move_and_edit(self):
+        response = self.patch(self.ids[2], {"slide_number": 1, "content": {"heading": "Moved"}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["slide"]["slide_number"], 1)
+        self.assertEqual(
+            [slide_id for slide_id, _ in current_order(self.project)],
+            [self.ids[2], self.ids[0], self.ids[1]],
+        )
+        self.assertEqual(Slide.objects.get(id=self.ids[2]).content, {"heading": "Moved"})
+
+    @mock.patch("ai.views.get_img_link", return_value=None)
+    @mock.patch.object(llm, "configure", lambda: None)
+    @mock.patch.object(llm, "generate_content")
+    def test_add_slide_into_a_full_gap(self, generate_content, get_img_link):
+        # Adjacent keys leave no room, so the deck is renumbered first
+        for position, slide_id in enumerate(self.ids, start=1):
+            Slide.objects.filter(id=slide_id).update(position=position)
+        generate_content.return_value = SimpleNamespace(text=(
+            '<PRESENTATION><SECTION layout="left"><H2>Added</H2><BULLETS>'
+            "<DIV><H3>Point</H3><P>Detail</P></DIV></BULLETS></SECTION></PRESENTATION>"
+        ))
+        response = self.client.post(
+            f"/api/add-slide/{self.project.id}/", {"title": "Added", "position": 2}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        added = Slide.objects.get(project=self.project, content__heading="Added").id
+        self.assertEqual(
+            [slide_id for slide_id, _ in current_order(self.project)],
+            [self.ids[0], added, self.ids[1], self.ids[2]],
+        )
+        positions = list(Slide.objects.filter(project=self.project).values_list("position", flat=True))
+        self.assertEqual(len(set(positions)), 4)
+
+
+class SlideNumberTests(TestCase):
+    def test_serializer_never_queries_per_slide(self):
+        project = Project.objects.create(user=User.objects.create(username="numbers"), title="Deck")
+        Slide.objects.bulk_create(
+            Slide(project=project, slide_number=n, position=n * POSITION_GAP, content={})
+            for n in (1, 2)
+        )
+        with self.assertNumQueries(1):
+            data = SlideSerializer(ordered_slides(project), many=True).data
+        self.assertEqual([slide["slide_number"] for slide in data], [1, 2])
+
+        with self.assertRaises(ValueError):
+            SlideSerializer(Slide.objects.filter(project=project), many=True).data
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from ai import generation
+from ai.models import Project, Slide
+from ai.ordering import POSITION_GAP
+from ai.views import events_in_thread
+
+SECTION = "<SECTION layout='left'><H2>{}</H2><BULLETS><DIV><H3>a</H3><P>b</P></DIV></BULLETS></SECTION>"
+
+
+def fake_enrich(slides_data, title, with_color=None):
+    return [
+        {"img_url": None, "dominant_color": "#667eea", "img_query": None, "img_pending": False}
+        for _ in slides_data
+    ]
+
+
+@mock.patch.object(generation, "enrich_slides", fake_enrich)
+class StreamDeckTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="stream")
+        self.project = Project.objects.create(user=user, title="Deck")
+        Slide.objects.bulk_create(
+            Slide(project=self.project, slide_number=n, position=n * POSITION_GAP, content={"heading": f"Old {n}"})
+            for n in (1, 2)
+        )
+
+    def run_stream(self, chunks):
+        with mock.patch.object(generation, "stream_xml_presentation", lambda *a: chunks()):
+            return list(generation.stream_deck(self.project, ["One", "Two"]))
+
+    def test_failure_midway_keeps_the_old_deck(self):
+        def chunks():
+            yield "<PRESENTATION>" + SECTION.format("New 1")
+            raise RuntimeError("connection reset")
+
+        events = self.run_stream(chunks)
+        self.assertEqual([event for event, _ in events], ["start", "slide", "error"])
+        self.assertEqual(
+            [s.content["heading"] for s in Slide.objects.filter(project=self.project)],
+            ["Old 1", "Old 2"],
+        )
+
+    def test_done_swaps_in_the_new_deck(self):
+        def chunks():
+            yield "<PRESENTATION>" + SECTION.format("New 1")
+            yield SECTION.format("New 2") + "</PRESENTATION>"
+
+        events = self.run_stream(chunks)
+        self.assertEqual([event for event, _ in events], ["start", "slide", "slide", "done"])
+        self.assertIsNone(events[1][1]["id"])
+        done = events[-1][1]
+        self.assertEqual([s["slide_number"] for s in done["slides"]], [1, 2])
+        self.assertEqual(
+            list(Slide.objects.filter(project=self.project).values_list("id", flat=True)),
+            [s["id"] for s in done["slides"]],
+        )
+        self.assertEqual(
+            [s.content["heading"] for s in Slide.objects.filter(project=self.project)],
+            ["New 1", "New 2"],
+        )
+
+
+class EventsInThreadTests(TestCase):
+    def test_items_arrive_before_the_iterator_finishes(self):
+        first_received = threading.Event()
+
+        def events():
+            yield "first"
+            # Only continues once the consumer has the first item
+            if not first_received.wait(timeout=5):
+                raise AssertionError("first item was held back")
+            yield "second"
+
+        async def consume():
+            received = []
+            async for item in events_in_thread(events()):
+                received.append(item)
+                first_received.set()
+            return received
+
+        self.assertEqual(asyncio.run(consume()), ["first", "second"])
+
+    def test_on_finish_runs_without_a_consumer(self):
+        finished = threading.Event()
+        events_in_thread(iter(["first", "second"]), on_finish=finished.set)
+        self.assertTrue(finished.wait(timeout=5))
+
+
+@override_settings(ADMISSION_CONTROL={**settings.ADMISSION_CONTROL, "MAX_IN_FLIGHT_PER_USER": 1})
+class StreamSlotTests(TestCase):
+    def setUp(self):
+        user = User.objects.create(username="slots")
+        self.project = Project.objects.create(user=user, title="Deck")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def post(self):
+        return self.client.post(
+            f"/api/generate-xml-presentation-stream/{self.project.id}/",
+            {"slide_titles": ["One"]},
+            format="json",
+        )
+
+    def test_closing_an_unread_stream_frees_the_slot(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post().status_code, 429)
+
+        # The client went away before the first chunk was read
+        response.close()
+        response.close()
+        second = self.post()
+        self.assertEqual(second.status_code, 200)
+        second.close()
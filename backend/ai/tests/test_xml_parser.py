@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase
+from ai.management.commands.benchmark_xml_parser import build_deck, parse_tree, summary
+from ai.xml_parser import PresentationParser, parse_xml_presentation
+
+
+class PresentationParserTests(SimpleTestCase):
+    def test_matches_the_whole_document_parser(self):
+        xml_content = build_deck(12)
+        expected = [summary(slide) for slide in parse_tree(xml_content)]
+        self.assertEqual(
+            [summary(slide) for slide in parse_xml_presentation(xml_content, "Deck")],
+            expected,
+        )
+
+        # Chunk boundaries anywhere, including inside tags
+        parser = PresentationParser("Deck")
+        slides_data = []
+        for i in range(0, len(xml_content), 7):
+            slides_data += parser.feed(xml_content[i : i + 7])
+        self.assertEqual([summary(slide) for slide in slides_data + parser.close()], expected)
+
+    def test_malformed_section_keeps_the_rest_of_the_deck(self):
+        xml_content = (
+            "<PRESENTATION>"
+            "<SECTION layout='left'><H2>First</H2><BULLETS><DIV><H3>a</H3><P>b</P></DIV></BULLETS></SECTION>"
+            "<SECTION layout='right'><H2>Broken<BULLETS><DIV><H3>c</H3><P>d</P></DIV></BULLETS></SECTION>"
+            "<SECTION layout='vertical'><H2>Third</H2><IMG query='city skyline' /></SECTION>"
+            "</PRESENTATION>"
+        )
+        slides_data = parse_xml_presentation(xml_content, "Deck")
+        self.assertEqual([slide["slide_number"] for slide in slides_data], [1, 2, 3])
+        self.assertEqual(slides_data[1]["section_layout"], "right")
+        self.assertEqual(slides_data[1]["layout_type"], "bullets")
+        self.assertEqual(slides_data[2]["img_queries"], ["city skyline"])
+
+    def test_stores_cleaned_source_text(self):
+        section = '<SECTION layout="left"><H2>R&D</H2></SECTION>'
+        slide_data = parse_xml_presentation(section, "Deck")[0]
+        self.assertEqual(slide_data["xml_content"], "<SECTION layout='left'><H2>RandD</H2></SECTION>")
+        self.assertEqual(slide_data["heading"], "RandD")
@@ -1,8 +1,13 @@
 from django.urls import path
+from . import async_views
 from .views import (
     GenerateXMLPresentationView,
+    GenerationJobView,
+    GenerateXMLPresentationStreamView,
     ProjectsView,
+    DeckChangesView,
     ProjectsListView,
+    ProjectSummaryListView,
     GoogleAuthView,
     SlideEditView,
     ProjectRetrieveUpdateDestroyView,
@@ -11,16 +16,30 @@ from .views import (
     GenerateSlideTitleView,
     ReorderSlidesView,
     ProjectOutlineView,
+    CacheStatsView,
+    LLMStatsView,
 )
 
 urlpatterns = [
     # Modern XML-based slide generation (ONLY THIS)
     path('generate-xml-presentation/<str:pk>/', GenerateXMLPresentationView.as_view(), name='generate-xml-presentation'),
+    path(
+        "generate-xml-presentation-stream/<uuid:pk>/",
+        GenerateXMLPresentationStreamView.as_view(),
+        name="generate-xml-presentation-stream",
+    ),
+    path("generation-jobs/<uuid:job_id>/", GenerationJobView.as_view(), name="generation_job"),
 
     # Project management
     path("generate-outline/", ProjectOutlineView.as_view(), name="generate_outline"),
     path("projects/", ProjectsListView.as_view(), name="projects"),
+    path("projects/summary/", ProjectSummaryListView.as_view(), name="projects_summary"),
     path("project/<uuid:project_id>/", ProjectsView.as_view(), name="project_slides"),
+    path(
+        "project/<uuid:project_id>/changes/",
+        DeckChangesView.as_view(),
+        name="project_changes",
+    ),
     path(
         "projects/<uuid:pk>/",
         ProjectRetrieveUpdateDestroyView.as_view(),
@@ -52,4 +71,23 @@ urlpatterns = [
 
     # User profile
     path("user-profile/", UserProfileView.as_view(), name="user_profile"),
+
+    # Async variants of the LLM and image endpoints; serve them from
+    # slides/asgi.py so in-flight requests don't hold a worker thread
+    path(
+        "async/generate-xml-presentation/<uuid:pk>/",
+        async_views.generate_xml_presentation,
+        name="async_generate_xml_presentation",
+    ),
+    path("async/generate-outline/", async_views.generate_outline, name="async_generate_outline"),
+    path(
+        "async/suggest-slide-title/<uuid:pk>/",
+        async_views.suggest_slide_title,
+        name="async_suggest_slide_title",
+    ),
+    path("async/add-slide/<uuid:pk>/", async_views.add_slide, name="async_add_slide"),
+
+    # Diagnostics
+    path("cache-stats/", CacheStatsView.as_view(), name="cache_stats"),
+    path("llm-stats/", LLMStatsView.as_view(), name="llm_stats"),
 ]
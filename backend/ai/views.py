@@ -1,26 +1,81 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import get_object_or_404
-from .gemini import (
-    generate_ai_outline,
-    generate_xml_presentation,
-)
+from django.http import StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.fields.json import KeyTextTransform
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.utils.timezone import now
+from django.views.decorators.http import condition
+from .gemini import generate_ai_outline
+import hashlib
 import json
-from .models import Project, Slide, UserProfile
-from .serializers import SlideSerializer, ProjectSerializer, UserProfileSerializer
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.exceptions import PermissionDenied
+import queue
+import threading
+from .models import Project, Slide, UserProfile, GenerationJob, lock_project
+from .serializers import (
+    SlideSerializer,
+    ProjectSerializer,
+    ProjectSummarySerializer,
+    UserProfileSerializer,
+    GenerationJobSerializer,
+)
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 import os
 import requests
 from dotenv import load_dotenv
 from .pexel import get_img_link
+from . import http_client
 from .getImgColor import get_dominant_color
 from django.conf import settings
-from django.db import transaction
-from .xml_parser import parse_xml_presentation, extract_heading_from_xml, get_fallback_image_query
+from .enrichment import (
+    DEFAULT_COLOR,
+    IMAGE_SECTION_LAYOUTS,
+    placeholder_enrichments,
+    schedule_pending_enrichment,
+)
+from .generation import (
+    ENGINES,
+    SAVE_MODES,
+    GenerationError,
+    busy_error,
+    generate_deck_once,
+    images_deferred,
+    stream_deck,
+)
+from .jobs import enqueue_generation, fail_stale_jobs
+from .pagination import ProjectCursorPagination
+from .ordering import (
+    ORDER_FIELDS,
+    OrderingError,
+    move_slide,
+    next_position,
+    ordered_slides,
+    position_at,
+    reorder_slides,
+    slide_rank,
+)
+from .shaping import deck_delta, parse_since, shape_deck_payload
+from .cache import get_cache_stats
+from .deck_cache import get_deck, set_deck
+from . import llm
+from .llm import get_llm_stats
+from .admission import (
+    TokenBucketThrottle,
+    acquire_generation_slot,
+    generation_slot,
+    hold_generation_slot,
+    release_generation_slot,
+)
 
 load_dotenv()
 
@@ -31,11 +86,14 @@ class GenerateXMLPresentationView(APIView):
     Only XML-based generation is supported with intelligent image handling
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "generation"
 
     def post(self, request, pk):
         project_id = pk
         slide_titles = request.data.get("slide_titles", [])
-        mode = settings.DEBUG
+        engine = request.data.get("engine")
+        mode = request.data.get("mode")
 
         try:
             project = Project.objects.get(id=project_id, user=request.user)
@@ -45,126 +103,190 @@ class GenerateXMLPresentationView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        title = project.title
-        num_slides = len(slide_titles)
-
-        # Generate XML presentation using AI
-        xml_content = generate_xml_presentation(title, slide_titles, num_slides)
-
-        if not xml_content:
+        if engine and engine not in ENGINES:
             return Response(
-                {"error": "Failed to generate XML presentation."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"error": f"engine must be one of {ENGINES}."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        
-        # Clean XML content
-        xml_content = xml_content.replace("```xml", "").replace("```", "").strip()
-        print("Generated XML Content:")
-        print(xml_content)
-
-        # Parse XML and create slides
-        slides_data = parse_xml_presentation(xml_content, title)
-
-        if not slides_data:
+        if mode and mode not in SAVE_MODES:
             return Response(
-                {"error": "Failed to parse generated XML."},
+                {"error": f"mode must be one of {SAVE_MODES}."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Save XML content to project
-        project.xml_content = xml_content
-        project.save()
+        # Job mode: queue the pipeline and let the client poll for progress
+        if request.data.get("async"):
+            job = enqueue_generation(project, request.user, slide_titles, engine, mode)
+            return Response(
+                GenerationJobSerializer(job).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
 
         try:
-            # Delete existing slides
-            Slide.objects.filter(project=project).delete()
+            with generation_slot(request.user):
+                response_data = generate_deck_once(
+                    project, slide_titles, engine=engine, mode=mode
+                )
+        except GenerationError as e:
+            return Response({"error": e.message}, status=e.status_code, headers=e.headers)
 
-            # Create new slides from parsed XML
-            for slide_data in slides_data:
-                img_url = None
-                dominant_color = "#667eea"  # Default color
+        return Response(shape_deck_payload(response_data, request), status=status.HTTP_200_OK)
 
-                # Only fetch image if XML contains IMG tags
-                if slide_data["has_images"] and slide_data["img_queries"]:
-                    print(f"Slide {slide_data['slide_number']}: Found IMG tags, fetching image...")
-                    img_query = slide_data["img_queries"][0]  # Use first query
-                    img_url = get_img_link(img_query)
-                    print(f"Image URL from Pexels: {img_url}")
-                elif slide_data["section_layout"] in ["left", "right", "vertical"]:
-                    # If section layout expects an image but no IMG tag, use fallback
-                    print(f"Slide {slide_data['slide_number']}: No IMG tags but layout expects image, using fallback...")
-                    fallback_query = get_fallback_image_query(
-                        slide_data["content"], 
-                        slide_data["layout_type"], 
-                        title
-                    )
-                    img_url = get_img_link(fallback_query)
-                    print(f"Fallback image URL: {img_url}")
-                else:
-                    print(f"Slide {slide_data['slide_number']}: No images required for this layout")
 
-                # Set default image if none found and layout needs one
-                if img_url is None and slide_data["section_layout"] in ["left", "right", "vertical"]:
-                    img_url = "https://img.freepik.com/free-photo/fantasy-style-scene-international-day-education_23-2151040298.jpg"
+_END_OF_STREAM = object()
 
-                # Get dominant color only if we have an image
-                if img_url and mode:
-                    try:
-                        dominant_color = get_dominant_color(img_url)
-                        print(f"Dominant color extracted: {dominant_color}")
-                    except Exception as e:
-                        print(f"Failed to extract dominant color: {e}")
-                        dominant_color = "#667eea"
 
-                # Extract heading from XML content
-                heading = extract_heading_from_xml(slide_data["xml_content"])
+def events_in_thread(events, on_finish=None):
+    """
+    Async iterator over a sync iterator that runs on its own thread. Under
+    ASGI, Django reads a sync streaming body to the end before sending any
+    of it; this hands each item over as soon as it is produced. The thread
+    starts right away and runs to the end even if the client goes away or
+    the body is never read; on_finish() is called when it's done.
+    """
+    items = queue.Queue()
 
-                # Create slide content
-                slide_content = {
-                    "heading": heading,
-                    **slide_data["content"]  # Merge the parsed content
-                }
+    def run():
+        try:
+            for item in events:
+                items.put(item)
+        except Exception as e:
+            print(f"Error streaming events: {e}")
+        finally:
+            if on_finish:
+                on_finish()
+            connections.close_all()
+            items.put(_END_OF_STREAM)
 
-                # Save slide
-                slide_instance = Slide(
-                    project=project,
-                    slide_number=slide_data["slide_number"],
-                    content=slide_content,
-                    xml_content=slide_data["xml_content"],
-                    layout_type=slide_data["layout_type"],
-                    section_layout=slide_data["section_layout"],
-                    img_url=img_url,
-                    dominant_color=dominant_color,
-                )
-                slide_instance.save()
-                print(f"Saved slide {slide_data['slide_number']} with layout {slide_data['layout_type']}")
+    threading.Thread(target=run, name="event-stream", daemon=True).start()
 
-            # Fetch and serialize slides
-            saved_slides = Slide.objects.filter(project=project).order_by("slide_number")
-            serialized_slides = SlideSerializer(saved_slides, many=True).data
+    async def relay():
+        while True:
+            item = await sync_to_async(items.get, thread_sensitive=False)()
+            if item is _END_OF_STREAM:
+                return
+            yield item
 
-        except Exception as e:
-            print(f"Error creating slides: {str(e)}")
+    return relay()
+
+
+class SlotStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Streamed response that gives back a generation slot when it is closed.
+    WSGI servers close every response they were handed, including when the
+    client disconnected before the first chunk.
+    """
+
+    def __init__(self, *args, release_slot, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release_slot = release_slot
+
+    def close(self):
+        try:
+            self.release_slot()
+        finally:
+            super().close()
+
+
+class GenerateXMLPresentationStreamView(APIView):
+    """
+    Stream slides to the client as Server-Sent Events while the model is
+    still generating the rest of the deck
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "generation"
+
+    def post(self, request, pk):
+        slide_titles = request.data.get("slide_titles", [])
+
+        try:
+            project = Project.objects.get(id=pk, user=request.user)
+        except Project.DoesNotExist:
             return Response(
-                {"error": f"Failed to create slides: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"error": "Project not found or access denied."},
+                status=status.HTTP_404_NOT_FOUND,
             )
 
-        response_data = {
-            "project_id": project.id,
-            "title": project.title,
-            "xml_content": xml_content,
-            "slides": serialized_slides,
-        }
+        # Answered with a 429 before the stream starts. The slot is held
+        # until the response is closed or, under ASGI, until the generation
+        # thread finishes, whether or not the body was ever read.
+        release_slot = hold_generation_slot(request.user)
+
+        def event_stream():
+            for event, data in stream_deck(project, slide_titles):
+                payload = json.dumps(data, cls=DjangoJSONEncoder)
+                yield f"event: {event}\ndata: {payload}\n\n"
+
+        events = event_stream()
+        if isinstance(request._request, ASGIRequest):
+            events = events_in_thread(events, on_finish=release_slot)
+        response = SlotStreamingHttpResponse(
+            events, release_slot=release_slot, content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # Don't let nginx buffer the stream
+        return response
 
-        return Response(response_data, status=status.HTTP_200_OK)
+
+class GenerationJobView(APIView):
+    """
+    Status, per-stage progress and (once finished) slides of a generation job
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        # Don't leave clients polling a job whose runner died
+        fail_stale_jobs(id=job_id)
+        job = get_object_or_404(GenerationJob, id=job_id, user=request.user)
+        return Response(GenerationJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+def deck_updated_at(request, project_id=None):
+    """
+    updated_at of the deck this request may read, or None. One indexed
+    lookup, shared by the ETag and Last-Modified checks and the payload cache.
+    """
+    if not hasattr(request, "_deck_updated_at"):
+        updated_at = None
+        if project_id:
+            projects = Project.objects.filter(id=project_id)
+            if request.user.is_authenticated:
+                projects = projects.filter(user=request.user)
+            else:
+                projects = projects.filter(is_public=True)
+            updated_at = projects.values_list("updated_at", flat=True).first()
+        request._deck_updated_at = updated_at
+    return request._deck_updated_at
+
+
+def deck_etag(request, project_id=None):
+    updated_at = deck_updated_at(request, project_id)
+    if updated_at is None:
+        return None
+    return f"{project_id}-{updated_at.timestamp()}"
 
 
 class ProjectsView(APIView):
     permission_classes = [AllowAny]
 
+    @method_decorator(condition(etag_func=deck_etag, last_modified_func=deck_updated_at))
     def get(self, request, project_id=None):
+        response = self.get_deck(request, project_id)
+        # The same URL serves different decks to different users
+        patch_vary_headers(response, ["Authorization"])
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def get_deck(self, request, project_id):
         if project_id:
+            # Repeat views of an unchanged deck skip the slide query and serialization
+            updated_at = deck_updated_at(request, project_id)
+            if updated_at is not None:
+                response_data = get_deck(project_id, updated_at)
+                if response_data is not None:
+                    return Response(response_data, status=status.HTTP_200_OK)
+
             try:
                 if request.user.is_authenticated:
                     project = Project.objects.get(id=project_id, user=request.user)
@@ -177,7 +299,7 @@ class ProjectsView(APIView):
                     status=status.HTTP_404_NOT_FOUND,
                 )
 
-            slides = Slide.objects.filter(project=project).order_by("slide_number")
+            slides = ordered_slides(project)
             serialized_slides = SlideSerializer(slides, many=True).data
             response_data = {
                 "project_id": project_id,
@@ -187,6 +309,7 @@ class ProjectsView(APIView):
                 "description": project.description,
                 "xml_content": project.xml_content,
             }
+            set_deck(project_id, project.updated_at, response_data)
 
             return Response(response_data, status=status.HTTP_200_OK)
 
@@ -196,6 +319,40 @@ class ProjectsView(APIView):
         )
 
 
+class DeckChangesView(APIView):
+    """
+    Slides of a deck changed after ?since=, the current slide order and how
+    many slides still show a placeholder image. Clients poll it after a
+    generation with deferred images, passing back next_since each time.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, project_id):
+        since = parse_since(request)
+        if since is None:
+            raise ValidationError({"since": "This query parameter is required."})
+        # Taken before reading so the next poll covers writes made meanwhile
+        next_since = now()
+
+        try:
+            if request.user.is_authenticated:
+                project = Project.objects.get(id=project_id, user=request.user)
+            else:
+                project = Project.objects.get(id=project_id, is_public=True)
+        except Project.DoesNotExist:
+            return Response(
+                {"detail": "Project not found or not accessible."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        response_data = deck_delta(project, since, request)
+        response_data["pending_images"] = Slide.objects.filter(
+            project=project, img_pending=True
+        ).count()
+        response_data["next_since"] = next_since
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
 class ProjectRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     queryset = Project.objects.all()
@@ -219,11 +376,16 @@ class ProjectRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 
 class ProjectsListView(APIView):
+    """
+    Unpaginated list of the user's projects, newest first. Rows come from
+    the same XML-free query as the summary list; open a project to get its
+    xml_content.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        projects = Project.objects.filter(user=request.user).order_by("-updated_at")
-        serialized_projects = ProjectSerializer(projects, many=True).data
+        projects = project_summaries(request).order_by("-updated_at", "-created_at")
+        serialized_projects = ProjectSummarySerializer(projects, many=True).data
         return Response(serialized_projects, status=status.HTTP_200_OK)
 
     def delete(self, request, project_id):
@@ -238,6 +400,76 @@ class ProjectsListView(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+# Optional extras for the project summary list, requested with ?include=a,b
+SUMMARY_INCLUDES = {"slide_count", "thumbnail"}
+
+
+def summary_includes(request):
+    requested = request.query_params.get("include", "").split(",")
+    return SUMMARY_INCLUDES.intersection(name.strip() for name in requested)
+
+
+def project_summaries(request):
+    """
+    The user's projects without XML payloads, annotated with whatever
+    ?include= asked for
+    """
+    projects = Project.objects.filter(user=request.user).only(
+        "id", "title", "description", "updated_at", "created_at",
+        "is_public", "is_favorite",
+    )
+
+    includes = summary_includes(request)
+    if "slide_count" in includes:
+        projects = projects.annotate(slide_count=Count("slides"))
+    if "thumbnail" in includes:
+        first_slide = Slide.objects.filter(project=OuterRef("pk")).order_by(*ORDER_FIELDS)
+        projects = projects.annotate(
+            thumbnail_heading=Subquery(
+                first_slide.annotate(heading=KeyTextTransform("heading", "content"))
+                .values("heading")[:1]
+            ),
+            thumbnail_img_url=Subquery(first_slide.values("img_url")[:1]),
+            thumbnail_dominant_color=Subquery(first_slide.values("dominant_color")[:1]),
+            thumbnail_layout_type=Subquery(first_slide.values("layout_type")[:1]),
+        )
+    return projects
+
+
+def project_list_etag(request, *args, **kwargs):
+    """
+    ETag of a user's project list page. Any change to a project or its
+    slides bumps updated_at, and creating or deleting one changes the
+    count, so one aggregate query tells whether the page can have changed.
+    """
+    if not request.user.is_authenticated:
+        return None
+    state = Project.objects.filter(user=request.user).aggregate(
+        count=Count("id"), latest=Max("updated_at")
+    )
+    key = f"{request.user.pk}|{state['count']}|{state['latest']}|{request.get_full_path()}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class ProjectSummaryListView(APIView):
+    """
+    Paginated dashboard list of the user's projects without XML payloads.
+
+    ?include=slide_count,thumbnail adds the slide count and the first
+    slide's image data, computed in the same query.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @method_decorator(condition(etag_func=project_list_etag))
+    def get(self, request):
+        projects = project_summaries(request)
+        paginator = ProjectCursorPagination()
+        page = paginator.paginate_queryset(projects, request, view=self)
+        return paginator.get_paginated_response(
+            ProjectSummarySerializer(page, many=True).data
+        )
+
+
 class GoogleAuthView(APIView):
     permission_classes = [AllowAny]
 
@@ -250,10 +482,17 @@ class GoogleAuthView(APIView):
                 {"error": "Token is required"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        google_token_info_url = (
-            f"https://oauth2.googleapis.com/tokeninfo?id_token={token}"
-        )
-        response = requests.get(google_token_info_url)
+        google_token_info_url = "https://oauth2.googleapis.com/tokeninfo"
+        try:
+            response = http_client.get(
+                google_token_info_url, params={"id_token": token}
+            )
+        except requests.RequestException as e:
+            print(f"Google token verification failed: {e}")
+            return Response(
+                {"error": "Unable to verify token"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         if response.status_code != 200:
             return Response(
                 {"error": "Invalid token"}, status=status.HTTP_400_BAD_REQUEST
@@ -304,10 +543,14 @@ class SlideEditView(APIView):
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, id, *args, **kwargs):
-        slide = get_object_or_404(Slide, pk=id, project__user=request.user)
+        slide = get_object_or_404(
+            Slide.objects.select_related("project"), pk=id, project__user=request.user
+        )
 
         img_url = request.data.get("img_url")
-        if img_url:
+        new_image = bool(img_url) and img_url != slide.img_url
+        # An unchanged image keeps its stored color
+        if new_image:
             try:
                 dominant_color = get_dominant_color(img_url)
                 if dominant_color:
@@ -315,14 +558,39 @@ class SlideEditView(APIView):
             except Exception as e:
                 print(f"Failed to extract dominant color: {e}")
 
+        since = parse_since(request)
         serializer = SlideSerializer(slide, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(
-                {"message": "Slide updated successfully", "slide": serializer.data},
-                status=status.HTTP_200_OK,
-            )
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Move and save together, so a failed save doesn't leave the slide moved
+        try:
+            with transaction.atomic():
+                # slide_number is derived from the ordering key; a new one moves the slide
+                if "slide_number" in request.data:
+                    move_slide(slide.project, slide.id, request.data["slide_number"])
+                    slide.refresh_from_db(fields=["position"])
+
+                if new_image:
+                    # Replaces the placeholder of a pending background lookup
+                    serializer.save(img_pending=False)
+                else:
+                    if slide.img_pending:
+                        # The background lookup may have finished since the read
+                        slide.refresh_from_db(fields=["img_url", "dominant_color", "img_pending"])
+                    serializer.save()
+        except OrderingError as e:
+            return Response({"detail": e.message}, status=e.status_code)
+
+        slide.display_number = slide_rank(slide)
+        response_data = {
+            "message": "Slide updated successfully",
+            "slide": SlideSerializer(slide, context={"request": request}).data,
+        }
+        # Delta mode also reports other slides changed since the client's copy
+        if since is not None:
+            response_data.update(deck_delta(slide.project, since, request))
+        return Response(response_data, status=status.HTTP_200_OK)
     
     def delete(self, request, id, *args, **kwargs):
         slide = get_object_or_404(Slide, pk=id, project__user=request.user)
@@ -342,6 +610,11 @@ class UserProfileView(generics.RetrieveDestroyAPIView):
 
 
 class ReorderSlidesView(APIView):
+    """
+    Reorder a project's slides, either with the full order
+    {"new_order": [slide ids]} or by moving one slide
+    {"move": {"slide_id": id, "to": 1-based position}}
+    """
     permission_classes = [IsAuthenticated]
 
     def post(self, request, project_id):
@@ -353,31 +626,25 @@ class ReorderSlidesView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        new_order = request.data.get("new_order")
-        if not new_order or len(new_order) != len(project.slides.all()):
-            return Response(
-                {"detail": "Invalid slide order."}, status=status.HTTP_400_BAD_REQUEST
-            )
-
-        with transaction.atomic():
-            for index, slide_id in enumerate(new_order):
-                try:
-                    slide = Slide.objects.get(id=slide_id, project=project)
-                    slide.slide_number = index + 1
-                    slide.save()
-                except Slide.DoesNotExist:
-                    return Response(
-                        {"detail": f"Slide with ID {slide_id} not found."},
-                        status=status.HTTP_404_NOT_FOUND,
-                    )
+        move = request.data.get("move")
+        try:
+            if isinstance(move, dict):
+                _, changed = move_slide(project, move.get("slide_id"), move.get("to"))
+            else:
+                _, changed = reorder_slides(project, request.data.get("new_order"))
+        except OrderingError as e:
+            return Response({"detail": e.message}, status=e.status_code)
 
         return Response(
-            {"detail": "Slides reordered successfully."}, status=status.HTTP_200_OK
+            {"detail": "Slides reordered successfully.", "changed": changed},
+            status=status.HTTP_200_OK,
         )
 
 
 class ProjectOutlineView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "outline"
 
     def post(self, request):
         prompt = request.data.get("prompt")
@@ -389,7 +656,11 @@ class ProjectOutlineView(APIView):
             )
         project_id = request.data.get("project_id")
 
-        response = generate_ai_outline(prompt, num_pages)
+        try:
+            response = generate_ai_outline(prompt, num_pages)
+        except llm.LLMBusyError as e:
+            error = busy_error(e)
+            return Response({"error": error.message}, status=error.status_code, headers=error.headers)
         try:
             outline_data = json.loads(response)
         except json.JSONDecodeError:
@@ -440,11 +711,46 @@ class ProjectOutlineView(APIView):
         )
 
 
+def slide_title_context(project):
+    """
+    Project and existing slides the title suggestions are based on
+    """
+    # Get existing slides for context
+    existing_slides = ordered_slides(project)
+
+    # Create context from existing slides
+    return {
+        "project_title": project.title,
+        "project_description": project.description,
+        "existing_slides": [
+            {
+                "slide_number": slide.display_number,
+                "heading": slide.content.get("heading", ""),
+                "layout_type": slide.layout_type
+            }
+            for slide in existing_slides
+        ]
+    }
+
+
+def fallback_slide_title_suggestions(project):
+    # Fallback titles if AI fails
+    return [
+        f"Key Insights for {project.title}",
+        f"Strategic Overview of {project.title}",
+        f"Implementation Framework",
+        f"Next Steps and Recommendations",
+        f"Conclusion and Takeaways"
+    ]
+
+
 class GenerateSlideTitleView(APIView):
     """
     Generate AI-suggested slide titles based on existing presentation content
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "slide_titles"
 
     def post(self, request, pk):
         try:
@@ -455,54 +761,152 @@ class GenerateSlideTitleView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Get existing slides for context
-        existing_slides = Slide.objects.filter(project=project).order_by("slide_number")
-        
-        # Create context from existing slides
-        context_info = {
-            "project_title": project.title,
-            "project_description": project.description,
-            "existing_slides": [
-                {
-                    "slide_number": slide.slide_number,
-                    "heading": slide.content.get("heading", ""),
-                    "layout_type": slide.layout_type
-                }
-                for slide in existing_slides
-            ]
-        }
+        context_info = slide_title_context(project)
 
         # Generate suggested titles using AI
-        try:
-            from .gemini import generate_slide_title_suggestions
-            
-            # Call AI function to generate titles
-            slide_titles = generate_slide_title_suggestions(
-                project.title,
-                project.description,
-                context_info
-            )
-            
-            return Response(
-                {"slide_titles": slide_titles},
-                status=status.HTTP_200_OK,
-            )
-            
-        except Exception as e:
-            print(f"Error generating slide titles: {str(e)}")
-            # Fallback titles if AI fails
-            fallback_titles = [
-                f"Key Insights for {project.title}",
-                f"Strategic Overview of {project.title}",
-                f"Implementation Framework",
-                f"Next Steps and Recommendations",
-                f"Conclusion and Takeaways"
-            ]
-            
-            return Response(
-                {"slide_titles": fallback_titles},
-                status=status.HTTP_200_OK,
-            )
+        with generation_slot(request.user):
+            try:
+                from .gemini import generate_slide_title_suggestions
+
+                # Call AI function to generate titles
+                slide_titles = generate_slide_title_suggestions(
+                    project.title,
+                    project.description,
+                    context_info
+                )
+
+                return Response(
+                    {"slide_titles": slide_titles},
+                    status=status.HTTP_200_OK,
+                )
+
+            except llm.LLMBusyError as e:
+                error = busy_error(e)
+                return Response({"error": error.message}, status=error.status_code, headers=error.headers)
+            except Exception as e:
+                print(f"Error generating slide titles: {str(e)}")
+                return Response(
+                    {"slide_titles": fallback_slide_title_suggestions(project)},
+                    status=status.HTTP_200_OK,
+                )
+
+
+def new_slide_number(existing_slides_count, insert_at):
+    """
+    1-based number for a slide added to a deck: appended by default, or
+    inserted at insert_at. Returns None if insert_at is out of range.
+    """
+    if insert_at is None:
+        return existing_slides_count + 1
+    try:
+        number = int(insert_at)
+    except (TypeError, ValueError):
+        return None
+    if not 1 <= number <= existing_slides_count + 1:
+        return None
+    return number
+
+
+def parse_added_slide(xml_content, slide_number, slide_title):
+    """
+    Parse the XML generated for a single added slide
+    """
+    if not xml_content:
+        raise Exception("Failed to generate slide content")
+
+    # Clean XML content
+    xml_content = xml_content.replace("```xml", "").replace("```", "").strip()
+
+    # Parse the generated XML
+    from .xml_parser import parse_single_slide_xml
+    slide_data = parse_single_slide_xml(xml_content, slide_number, slide_title)
+
+    if not slide_data:
+        raise Exception("Failed to parse generated slide XML")
+    return slide_data
+
+
+def no_image_enrichment():
+    return {"img_url": None, "dominant_color": DEFAULT_COLOR, "img_query": None, "img_pending": False}
+
+
+def added_slide_placeholder(slide_data, project_title):
+    """
+    Enrichment for an added slide that needs no lookup now: none for
+    layouts without an image, a pending placeholder in deferred mode.
+    Returns None when the image has to be looked up inline.
+    """
+    if slide_data["section_layout"] not in IMAGE_SECTION_LAYOUTS:
+        return no_image_enrichment()
+    if images_deferred():
+        return placeholder_enrichments([slide_data], project_title)[0]
+    return None
+
+
+def save_added_slide(
+    request,
+    project,
+    slide_data,
+    enrichment,
+    existing_slides_count,
+    since,
+):
+    """
+    Store an added slide, writing only its own row, and build the response.
+    A placeholder image is looked up on the background pool afterwards.
+    """
+    next_slide_number = slide_data["slide_number"]
+
+    # Extract heading from XML
+    from .xml_parser import extract_heading_from_xml
+    heading = extract_heading_from_xml(slide_data["xml_content"])
+
+    # Create slide content
+    slide_content = {
+        "heading": heading,
+        **slide_data["content"]
+    }
+
+    # Create and save the new slide; only its own row is written. The key is
+    # picked and used under the project lock, so concurrent inserts and the
+    # rebalance that position_at may schedule (it runs after the commit)
+    # never see it half done.
+    with transaction.atomic():
+        lock_project(project.id)
+        if next_slide_number > existing_slides_count:
+            position = next_position(project)
+        else:
+            position = position_at(project, next_slide_number)
+        new_slide = Slide(
+            project=project,
+            slide_number=next_slide_number,
+            position=position,
+            content=slide_content,
+            xml_content=slide_data["xml_content"],
+            layout_type=slide_data["layout_type"],
+            section_layout=slide_data["section_layout"],
+            **enrichment,
+        )
+        new_slide.save()
+    if new_slide.img_pending:
+        schedule_pending_enrichment(project.id)
+    # Inserted at (or appended as) exactly this number
+    new_slide.display_number = next_slide_number
+
+    response_data = {
+        "message": "Slide added successfully",
+        "slide": SlideSerializer(new_slide, context={"request": request}).data,
+    }
+    if since is not None:
+        # Only slides changed since the client's copy, plus the new order
+        response_data.update(deck_delta(project, since, request))
+    else:
+        # Return all slides for the project (updated)
+        all_slides = ordered_slides(project)
+        response_data["slides"] = SlideSerializer(
+            all_slides, many=True, context={"request": request}
+        ).data
+    return response_data
 
 
 class AddSlideView(APIView):
@@ -510,6 +914,8 @@ class AddSlideView(APIView):
     Add a new slide to an existing presentation
     """
     permission_classes = [IsAuthenticated]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "add_slide"
 
     def post(self, request, pk):
         try:
@@ -526,11 +932,20 @@ class AddSlideView(APIView):
                 {"error": "Slide title is required."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        since = parse_since(request)
 
+        acquire_generation_slot(request.user)
         try:
-            # Get the next slide number
-            last_slide = Slide.objects.filter(project=project).order_by("-slide_number").first()
-            next_slide_number = (last_slide.slide_number + 1) if last_slide else 1
+            # Append by default, or insert at a 1-based "position"
+            existing_slides_count = Slide.objects.filter(project=project).count()
+            next_slide_number = new_slide_number(
+                existing_slides_count, request.data.get("position")
+            )
+            if next_slide_number is None:
+                return Response(
+                    {"error": f"position must be between 1 and {existing_slides_count + 1}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
             # Generate single slide content using AI
             from .gemini import generate_single_slide_xml
@@ -540,43 +955,28 @@ class AddSlideView(APIView):
                 "project_title": project.title,
                 "project_description": project.description,
                 "slide_title": slide_title,
-                "existing_slides_count": Slide.objects.filter(project=project).count()
+                "existing_slides_count": existing_slides_count
             }
             
             # Generate XML for this single slide
             xml_content = generate_single_slide_xml(slide_title, context)
-            
-            if not xml_content:
-                raise Exception("Failed to generate slide content")
-
-            # Clean XML content
-            xml_content = xml_content.replace("```xml", "").replace("```", "").strip()
-
-            # Parse the generated XML
-            from .xml_parser import parse_single_slide_xml
-            slide_data = parse_single_slide_xml(xml_content, next_slide_number, slide_title)
-
-            if not slide_data:
-                raise Exception("Failed to parse generated slide XML")
+            slide_data = parse_added_slide(xml_content, next_slide_number, slide_title)
 
             # Handle image generation
-            img_url = None
-            dominant_color = "#667eea"
-            
-            # Get image if layout requires it
-            if slide_data["section_layout"] in ["left", "right", "vertical"]:
+            enrichment = added_slide_placeholder(slide_data, project.title)
+            if enrichment is None:
                 if slide_data["has_images"] and slide_data["img_queries"]:
                     img_query = slide_data["img_queries"][0]
-                    img_url = get_img_link(img_query)
                 else:
                     # Generate fallback image query
                     from .xml_parser import get_fallback_image_query
-                    fallback_query = get_fallback_image_query(
+                    img_query = get_fallback_image_query(
                         slide_data["content"], 
                         slide_data["layout_type"], 
                         project.title
                     )
-                    img_url = get_img_link(fallback_query)
+                img_url = get_img_link(img_query)
+                dominant_color = DEFAULT_COLOR
 
                 # Extract dominant color if we have an image
                 if img_url and settings.DEBUG:
@@ -584,47 +984,52 @@ class AddSlideView(APIView):
                         dominant_color = get_dominant_color(img_url)
                     except Exception as e:
                         print(f"Failed to extract dominant color: {e}")
-                        dominant_color = "#667eea"
-
-            # Extract heading from XML
-            from .xml_parser import extract_heading_from_xml
-            heading = extract_heading_from_xml(slide_data["xml_content"])
-
-            # Create slide content
-            slide_content = {
-                "heading": heading,
-                **slide_data["content"]
-            }
-
-            # Create and save the new slide
-            new_slide = Slide(
-                project=project,
-                slide_number=next_slide_number,
-                content=slide_content,
-                xml_content=slide_data["xml_content"],
-                layout_type=slide_data["layout_type"],
-                section_layout=slide_data["section_layout"],
-                img_url=img_url,
-                dominant_color=dominant_color,
-            )
-            new_slide.save()
-
-            # Return all slides for the project (updated)
-            all_slides = Slide.objects.filter(project=project).order_by("slide_number")
-            serialized_slides = SlideSerializer(all_slides, many=True).data
+                        dominant_color = DEFAULT_COLOR
+                enrichment = {
+                    "img_url": img_url,
+                    "dominant_color": dominant_color,
+                    "img_query": img_query,
+                    "img_pending": False,
+                }
 
-            return Response(
-                {
-                    "message": "Slide added successfully",
-                    "slide": SlideSerializer(new_slide).data,
-                    "slides": serialized_slides
-                },
-                status=status.HTTP_201_CREATED,
+            response_data = save_added_slide(
+                request,
+                project,
+                slide_data,
+                enrichment,
+                existing_slides_count,
+                since,
             )
+            return Response(response_data, status=status.HTTP_201_CREATED)
 
+        except llm.LLMBusyError as e:
+            error = busy_error(e)
+            return Response({"error": error.message}, status=error.status_code, headers=error.headers)
         except Exception as e:
             print(f"Error adding slide: {str(e)}")
             return Response(
                 {"error": f"Failed to add slide: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+        finally:
+            release_generation_slot(request.user)
+
+
+class CacheStatsView(APIView):
+    """
+    Hit/miss counters for this process's lookup caches
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats(), status=status.HTTP_200_OK)
+
+
+class LLMStatsView(APIView):
+    """
+    Client setup vs inference time for this process's LLM client
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_llm_stats(), status=status.HTTP_200_OK)
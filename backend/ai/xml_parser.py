@@ -30,6 +30,15 @@ def parse_xml_presentation(xml_content, project_title):
     """
     Parse XML presentation content and extract slide data
     """
+    parser = PresentationParser(project_title)
+    return parser.feed(xml_content) + parser.close()
+
+
+def parse_xml_presentation_tree(xml_content, project_title):
+    """
+    Whole-document ElementTree parser used before PresentationParser.
+    Kept as the baseline for the benchmark_xml_parser command.
+    """
     try:
         # Clean the XML content first
         xml_content = clean_xml_content(xml_content.strip())
@@ -102,6 +111,149 @@ def parse_xml_presentation(xml_content, project_title):
         print(f"Error parsing XML: {e}")
         return []
 
+SECTION_END = "</SECTION>"
+
+LAYOUT_TAGS = ['COLUMNS', 'BULLETS', 'ICONS', 'CYCLE', 'ARROWS', 'TIMELINE', 'PYRAMID', 'STAIRCASE', 'CHART']
+HEADING_TAGS = ['H1', 'H2', 'H3']
+
+
+def new_slide_record(section_layout, xml_content):
+    return {
+        'slide_number': None,
+        'section_layout': section_layout,
+        'layout_type': None,
+        'content': {},
+        'img_queries': [],
+        'has_images': False,
+        'heading': None,
+        'xml_content': xml_content
+    }
+
+
+class PresentationParser:
+    """
+    Incremental parser for the presentation XML dialect.
+
+    Text can be fed in arbitrary chunks; feed() returns the slide records of
+    the SECTION elements completed so far, with their heading and image
+    queries. A malformed section is recovered with the regex fallback
+    without affecting the sections around it.
+
+    A record's xml_content is the section's cleaned source text (single
+    quoted attributes, "&" spelled "and", whitespace as generated), not the
+    ElementTree re-serialization the whole-document parser stored.
+    """
+
+    def __init__(self, project_title=""):
+        self.project_title = project_title
+        self.slide_number = 0
+        self._buffer = ""
+
+    def feed(self, data):
+        sections, self._buffer = split_complete_sections(self._buffer + data)
+        slides_data = []
+        for section_xml in sections:
+            slide_data = self._parse_section(section_xml)
+            if slide_data:
+                slides_data.append(slide_data)
+        return slides_data
+
+    def close(self):
+        """
+        Finish parsing; an unterminated trailing section is dropped
+        """
+        if "<SECTION" in self._buffer:
+            print(f"Dropping incomplete section: {self._buffer[:200]}")
+        self._buffer = ""
+        return []
+
+    def _parse_section(self, section_xml):
+        section_xml = clean_section(section_xml)
+        try:
+            slide_data = parse_section(section_xml)
+        except ET.ParseError as e:
+            print(f"XML Parse Error in section {self.slide_number + 1}: {e}")
+            slide_data = parse_section_with_fallback(section_xml)
+            if slide_data is None:
+                return None
+
+        self.slide_number += 1
+        slide_data['slide_number'] = self.slide_number
+        return slide_data
+
+
+def clean_section(section_xml):
+    """
+    clean_xml_content for one split-off SECTION. Same result: the section
+    has no XML declaration or surrounding whitespace, and once quotes and
+    ampersands are replaced the entity and malformed-tag regexes can't match.
+    """
+    return section_xml.replace('"', "'").replace("&", "and")
+
+
+def parse_section(section_xml):
+    """
+    Build a slide record from one SECTION element: one C-accelerated parse,
+    then lookups on the small tree
+    """
+    section = ET.fromstring(section_xml)
+    slide_data = new_slide_record(section.get('layout', 'left'), section_xml)
+
+    for child in section:
+        if child.tag in LAYOUT_TAGS:
+            slide_data['layout_type'] = child.tag.lower()
+            slide_data['content'] = parse_layout_content(child)
+
+    for img in section.iter('IMG'):
+        query = img.get('query', '')
+        if query:
+            slide_data['img_queries'].append(query)
+            slide_data['has_images'] = True
+
+    slide_data['heading'] = next(
+        (
+            elem.text.strip()
+            for tag in HEADING_TAGS
+            for elem in section.iter(tag)
+            if elem.text
+        ),
+        "Untitled Slide"
+    )
+    return slide_data
+
+
+def parse_section_with_fallback(section_xml):
+    """
+    Regex fallback for a single malformed SECTION
+    """
+    match = re.match(r'<SECTION([^>]*)>(.*)</SECTION>', section_xml, re.DOTALL)
+    if not match:
+        return None
+    layout_match = re.search(r'layout=[\'"]([^\'"]*)[\'"]', match.group(1))
+    layout = layout_match.group(1) if layout_match else 'left'
+    slide_data = slide_from_regex(layout, match.group(2))
+    slide_data['heading'] = extract_heading_from_xml(section_xml)
+    return slide_data
+
+
+def split_complete_sections(buffer):
+    """
+    Split complete <SECTION>...</SECTION> elements off the front of a buffer
+    that is still being streamed. Returns (sections, rest of the buffer).
+    """
+    sections = []
+    position = 0
+    while True:
+        start = buffer.find("<SECTION", position)
+        if start == -1:
+            return sections, buffer[position:]
+        end = buffer.find(SECTION_END, start)
+        if end == -1:
+            return sections, buffer[start:]
+        position = end + len(SECTION_END)
+        sections.append(buffer[start:position])
+
+
 def parse_xml_with_fallback(xml_content, project_title):
     """
     Fallback parser for malformed XML using regex
@@ -109,50 +261,52 @@ def parse_xml_with_fallback(xml_content, project_title):
     slides_data = []
     
     # Extract sections using regex
-    section_pattern = r'<SECTION[^>]*?layout="([^"]*)"[^>]*?>(.*?)</SECTION>'
+    section_pattern = r'<SECTION[^>]*?layout=[\'"]([^\'"]*)[\'"][^>]*?>(.*?)</SECTION>'
     sections = re.findall(section_pattern, xml_content, re.DOTALL)
     
     for i, (layout, section_content) in enumerate(sections):
-        slide_data = {
-            'slide_number': i + 1,
-            'section_layout': layout,
-            'layout_type': None,
-            'content': {},
-            'img_queries': [],
-            'has_images': False,
-            'xml_content': f'<SECTION layout="{layout}">{section_content}</SECTION>'
-        }
-        
-        # Extract IMG queries
-        img_pattern = r'<IMG[^>]*?query="([^"]*)"[^>]*?/?>'
-        img_queries = re.findall(img_pattern, section_content)
-        if img_queries:
-            slide_data['img_queries'] = img_queries
-            slide_data['has_images'] = True
-        
-        # Detect layout type
-        layout_patterns = {
-            'bullets': r'<BULLETS>',
-            'columns': r'<COLUMNS>',
-            'icons': r'<ICONS>',
-            'timeline': r'<TIMELINE>',
-            'chart': r'<CHART',
-            'cycle': r'<CYCLE>',
-            'arrows': r'<ARROWS>',
-            'pyramid': r'<PYRAMID>',
-            'staircase': r'<STAIRCASE>'
-        }
-        
-        for layout_type, pattern in layout_patterns.items():
-            if re.search(pattern, section_content):
-                slide_data['layout_type'] = layout_type
-                slide_data['content'] = parse_layout_content_regex(section_content, layout_type)
-                break
-        
+        slide_data = slide_from_regex(layout, section_content)
+        slide_data['slide_number'] = i + 1
         slides_data.append(slide_data)
     
     return slides_data
 
+def slide_from_regex(layout, section_content):
+    """
+    Build a slide record from the inner text of a SECTION using regex
+    """
+    slide_data = new_slide_record(
+        layout, f'<SECTION layout="{layout}">{section_content}</SECTION>'
+    )
+    
+    # Extract IMG queries
+    img_pattern = r'<IMG[^>]*?query=[\'"]([^\'"]*)[\'"][^>]*?/?>'
+    img_queries = re.findall(img_pattern, section_content)
+    if img_queries:
+        slide_data['img_queries'] = img_queries
+        slide_data['has_images'] = True
+    
+    # Detect layout type
+    layout_patterns = {
+        'bullets': r'<BULLETS>',
+        'columns': r'<COLUMNS>',
+        'icons': r'<ICONS>',
+        'timeline': r'<TIMELINE>',
+        'chart': r'<CHART',
+        'cycle': r'<CYCLE>',
+        'arrows': r'<ARROWS>',
+        'pyramid': r'<PYRAMID>',
+        'staircase': r'<STAIRCASE>'
+    }
+    
+    for layout_type, pattern in layout_patterns.items():
+        if re.search(pattern, section_content):
+            slide_data['layout_type'] = layout_type
+            slide_data['content'] = parse_layout_content_regex(section_content, layout_type)
+            break
+    
+    return slide_data
+
 def parse_layout_content_regex(content, layout_type):
     """
     Parse layout content using regex for fallback
@@ -182,7 +336,7 @@ def parse_layout_content_regex(content, layout_type):
             
             # Extract ICON for icons layout
             if layout_type == 'icons':
-                icon_match = re.search(r'<ICON[^>]*?query="([^"]*)"', div)
+                icon_match = re.search(r'<ICON[^>]*?query=[\'"]([^\'"]*)[\'"]', div)
                 if icon_match:
                     item['icon'] = icon_match.group(1)
             
@@ -201,7 +355,7 @@ def parse_layout_content_regex(content, layout_type):
     
     elif layout_type == 'chart':
         # Extract chart data
-        chart_match = re.search(r'<CHART[^>]*?charttype="([^"]*)"', content)
+        chart_match = re.search(r'<CHART[^>]*?charttype=[\'"]([^\'"]*)[\'"]', content)
         if chart_match:
             parsed_content['chart_type'] = chart_match.group(1)
         
@@ -211,7 +365,7 @@ def parse_layout_content_regex(content, layout_type):
         
         data = []
         for tr in trs:
-            td_pattern = r'<TD[^>]*?type="([^"]*)"[^>]*?><VALUE>(.*?)</VALUE></TD>'
+            td_pattern = r'<TD[^>]*?type=[\'"]([^\'"]*)[\'"][^>]*?><VALUE>(.*?)</VALUE></TD>'
             tds = re.findall(td_pattern, tr)
             
             row_data = {}
@@ -2,6 +2,10 @@
 ASGI config for slides project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI worker so the async views under /api/async/ run on the
+event loop, e.g.
+
+    gunicorn slides.asgi:application -k uvicorn.workers.UvicornWorker
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -31,6 +31,7 @@ DEBUG = os.getenv("DEBUG", "True") == "True"
 ALLOWED_HOSTS = [".vercel.app", ".now.sh", "localhost", "127.0.0.1", ".onrender.com"]
 
 CORS_ALLOWED_ORIGINS = ["http://localhost:5173", "https://ai-slide-35nj.vercel.app"]
+CORS_EXPOSE_HEADERS = ["X-DB-Queries", "X-DB-Time"]
 # Application definition
 
 INSTALLED_APPS = [
@@ -65,8 +66,12 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "ai.middleware.QueryCountMiddleware",
 ]
 
+# Per-request SQL query count/time headers (see ai/middleware.py)
+QUERY_COUNT_HEADERS = os.getenv("QUERY_COUNT_HEADERS", str(DEBUG)) == "True"
+
 ROOT_URLCONF = "slides.urls"
 from datetime import timedelta
 
@@ -131,6 +136,9 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Take the write lock up front so background writers (slide
+        # rebalancing, generation jobs) wait instead of failing with "locked"
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
     }
 }
 
@@ -190,6 +198,13 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    # Per-user token buckets for the LLM endpoints (see ai/admission.py)
+    "DEFAULT_THROTTLE_RATES": {
+        "generation": os.getenv("THROTTLE_GENERATION", "10/hour"),
+        "add_slide": os.getenv("THROTTLE_ADD_SLIDE", "30/hour"),
+        "slide_titles": os.getenv("THROTTLE_SLIDE_TITLES", "30/hour"),
+        "outline": os.getenv("THROTTLE_OUTLINE", "20/hour"),
+    },
 }
 
 
@@ -201,3 +216,107 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
 # Static root for `collectstatic` to output files
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles_build")
+
+
+# Slide image enrichment (Pexels lookup + dominant color)
+IMAGE_ENRICHMENT_MAX_WORKERS = int(os.getenv("IMAGE_ENRICHMENT_MAX_WORKERS", "8"))
+IMAGE_ENRICHMENT_TIMEOUT = float(os.getenv("IMAGE_ENRICHMENT_TIMEOUT", "20"))
+# "inline" waits for the lookups before answering; "deferred" answers with
+# placeholder images and resolves them in the background (clients poll
+# /api/project/<id>/changes/?since= for the updated slides)
+IMAGE_ENRICHMENT_MODE = os.getenv("IMAGE_ENRICHMENT_MODE", "inline")
+IMAGE_ENRICHMENT_BACKGROUND_WORKERS = int(os.getenv("IMAGE_ENRICHMENT_BACKGROUND_WORKERS", "2"))
+COLOR_MAX_DOWNLOAD_BYTES = int(os.getenv("COLOR_MAX_DOWNLOAD_BYTES", str(5 * 1024 * 1024)))
+
+# Outbound HTTP (Pexels, image downloads, Google token verification)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.5"))
+# Longest wait between retries; a longer Retry-After fails the request instead
+HTTP_MAX_RETRY_WAIT = float(os.getenv("HTTP_MAX_RETRY_WAIT", "5"))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_MAX_CONCURRENCY_PER_HOST = int(os.getenv("HTTP_MAX_CONCURRENCY_PER_HOST", "10"))
+
+# Lookup caches (see ai/cache.py). BACKEND is one of "locmem", "django" or "db";
+# the "django" backend stores entries in CACHES[CACHE_ALIAS].
+LOOKUP_CACHES = {
+    "pexels": {
+        "BACKEND": os.getenv("PEXELS_CACHE_BACKEND", "db"),
+        "TTL": 7 * 24 * 3600,
+        "NEGATIVE_TTL": 3600,
+        "MAX_ENTRIES": 20000,
+    },
+    "dominant_color": {
+        "BACKEND": os.getenv("COLOR_CACHE_BACKEND", "tiered"),
+        "TTL": 30 * 24 * 3600,
+        "NEGATIVE_TTL": 600,  # Failed downloads are usually transient
+        "MAX_ENTRIES": 50000,
+        "FRONT_ENTRIES": 2000,
+    },
+    "llm_responses": {
+        "BACKEND": os.getenv("LLM_CACHE_BACKEND", "db"),
+        "TTL": 24 * 3600,
+        "MAX_ENTRIES": 5000,
+    },
+}
+
+# Serialized deck payloads served by ProjectsView (see ai/deck_cache.py)
+DECK_CACHE = {
+    "CACHE_ALIAS": os.getenv("DECK_CACHE_ALIAS", "default"),
+    "TIMEOUT": int(os.getenv("DECK_CACHE_TIMEOUT", str(3600))),
+}
+
+# Raw LLM output cache (see ai/llm_cache.py). ENDPOINTS switches caching per
+# call site; NEAR_DUPLICATE also ignores case when matching inputs.
+LLM_RESPONSE_CACHE = {
+    "ENDPOINTS": {
+        "outline": os.getenv("LLM_CACHE_OUTLINE", "True") == "True",
+        "presentation": os.getenv("LLM_CACHE_PRESENTATION", "True") == "True",
+    },
+    "NEAR_DUPLICATE": os.getenv("LLM_CACHE_NEAR_DUPLICATE", "False") == "True",
+}
+
+# Background deck generation jobs. "thread" runs them on an in-process pool,
+# "db" leaves them queued for `manage.py run_generation_jobs`.
+GENERATION_JOB_RUNNER = os.getenv("GENERATION_JOB_RUNNER", "thread")
+GENERATION_JOB_WORKERS = int(os.getenv("GENERATION_JOB_WORKERS", "4"))
+# Unfinished jobs whose runner went away are failed: queued jobs nobody
+# claimed within the queue timeout, running jobs without a heartbeat
+# (one per stage) within the stale timeout
+GENERATION_JOB_QUEUE_TIMEOUT = int(os.getenv("GENERATION_JOB_QUEUE_TIMEOUT", "900"))
+GENERATION_JOB_STALE_AFTER = int(os.getenv("GENERATION_JOB_STALE_AFTER", "600"))
+
+# Deck generation engine: "single" asks for the whole deck in one prompt,
+# "parallel" sends one prompt per slide and retries failed slides on their own
+GENERATION_ENGINE = os.getenv("GENERATION_ENGINE", "single")
+PARALLEL_GENERATION_MAX_WORKERS = int(os.getenv("PARALLEL_GENERATION_MAX_WORKERS", "6"))
+PARALLEL_GENERATION_RETRIES = int(os.getenv("PARALLEL_GENERATION_RETRIES", "2"))
+
+# How regenerated decks are stored: "replace" recreates every slide,
+# "reconcile" only writes (and fetches images for) the slides that changed
+GENERATION_SAVE_MODE = os.getenv("GENERATION_SAVE_MODE", "replace")
+
+# Sparse slide ordering keys (see ai/ordering.py)
+SLIDE_POSITION_GAP = int(os.getenv("SLIDE_POSITION_GAP", str(1 << 16)))
+SLIDE_POSITION_MIN_GAP = int(os.getenv("SLIDE_POSITION_MIN_GAP", "8"))
+
+# Admission control for the LLM endpoints (see ai/admission.py). STORE is
+# "locmem" (per process) or "django" (CACHES[CACHE_ALIAS], shared by all
+# processes). IN_FLIGHT_TTL frees slots a crashed process never released.
+ADMISSION_CONTROL = {
+    "STORE": os.getenv("ADMISSION_STORE", "locmem"),
+    "CACHE_ALIAS": os.getenv("ADMISSION_CACHE_ALIAS", "default"),
+    "MAX_IN_FLIGHT_PER_USER": int(os.getenv("MAX_GENERATIONS_PER_USER", "2")),
+    "IN_FLIGHT_TTL": int(os.getenv("GENERATION_SLOT_TTL", str(15 * 60))),
+    "IN_FLIGHT_RETRY_AFTER": int(os.getenv("GENERATION_RETRY_AFTER", "15")),
+}
+
+# Process-wide cap on concurrent Gemini requests, and how long a request may
+# wait for a free slot before failing. Generation endpoints answer a full cap
+# with a 429 carrying Retry-After: LLM_BUSY_RETRY_AFTER.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "2"))
+LLM_BUSY_RETRY_AFTER = int(os.getenv("LLM_BUSY_RETRY_AFTER", "10"))
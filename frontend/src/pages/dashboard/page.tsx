@@ -276,7 +276,6 @@ const Dashboard = () => {
                       dateTime={presentation.updated_at}
                       is_public={presentation.is_public}
                       is_favorite={presentation.is_favorite}
-                      xml_content={presentation.xml_content}
                     />
                   </div>
                 ))}